@@ -0,0 +1,323 @@
+""" JSON API over the statistics of the dashboard, for other services
+
+    python api.py [--port 8502] [--link LINK] [--sparse]
+
+All endpoints are GET requests with the selections in the query string:
+
+    /api/summary                                          Number of matches, players and games
+    /api/activity?top=5                                   Data Exploration: frequencies, breaks and streaks
+    /api/player?player=..[&game=..]                       Player Statistics
+    /api/game?game=..[&version=..]                        Game Statistics: distribution, frequency and top players
+    /api/headtohead?player_one=..&player_two=..[&game=..] Head to Head
+    /api/league                                           League table of two player matches
+    /api/ratings[?game=..]                                Elo ratings
+    /api/significance                                     Over- and underperformers
+
+The data is loaded, and refreshed when it changes, by the builds of `warmup`,
+which are started at boot. Until the first build is done, requests are answered
+with 503 and a Retry-After header.
+
+The version of the data is the hash of its raw bytes. It is the ETag of every
+response, such that a request with If-None-Match of the current version gets
+304 Not Modified without anything being computed. Other responses are cached
+per version, endpoint and query, up to API_CACHE_BYTES. Every request is handled
+in its own thread.
+"""
+import argparse
+import inspect
+import json
+import os
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+import downsample
+import warmup
+from pagecache import PageCache
+
+API_CACHE_BYTES = int(os.environ.get("BOARDGAME_API_CACHE_BYTES", 16 * 1024 ** 2))
+
+RESPONSES = PageCache(max_bytes=API_CACHE_BYTES)
+
+
+def summary_stats(data: Dict[str, Any]) -> Dict[str, Any]:
+    """ Number of matches and the players and games in the data """
+    matrix = data["matrix"]
+    return {"matches": len(matrix), "first_date": matrix.dates.min(), "last_date": matrix.dates.max(),
+            "players": data["player_list"], "games": data["index"].games}
+
+
+def activity_stats(data: Dict[str, Any], top: str = "5") -> Dict[str, Any]:
+    """ The statistics of the Data Exploration page, with the top longest breaks and streaks """
+    activity = data["activity"]
+    busiest_day = activity.table.Games.idxmax()
+    return {"matches_per_game": activity.game_counts(),
+            "average_games_per_day": round(np.mean(activity.table.Games), 2),
+            "longest_breaks": activity.gaps(int(top)),
+            "longest_streaks": activity.streaks(int(top)),
+            "most_games_on_one_day": {"date": busiest_day, "games": activity.table.Games.max(),
+                                      "players": activity.day_player_names(busiest_day)}}
+
+
+def player_stats(data: Dict[str, Any], player: str, game: str = None) -> Dict[str, Any]:
+    """ The statistics of the Player Statistics page, of one game if it is given """
+    matrix, index, ratings = data["matrix"], data["index"], data["ratings"]
+    _check(player in data["player_list"], "player", player)
+
+    # Matches with a score and a winner, as on the page
+    rows = index.player(player)
+    rows = rows[matrix.has_score[rows] & matrix.has_winner[rows]]
+    won = int(matrix.player_won(player)[rows].sum())
+    averages = pd.Series(matrix.player_scores(player)[rows]).groupby(matrix.games[rows]).mean()
+
+    table = ratings.table()
+    rating = None
+    if player in set(table.Player):
+        rank = table.index[table.Player == player][0]
+        per_game = ratings.history(player).Game.value_counts()
+        rating = {"rating": table.Rating[rank], "rank": rank + 1, "rated_players": len(table),
+                  "per_game": {game_name: {"rating": round(ratings.game_ratings[ratings.game_index[game_name],
+                                                                                ratings.player_index[player]]),
+                                           "matches": matches}
+                               for game_name, matches in per_game.items()}}
+
+    result = {"player": player, "matches": len(rows), "won": won,
+              "win_percentage": round(won / len(rows) * 100, 1) if len(rows) else None,
+              "average_score_per_game": averages, "rating": rating}
+
+    if game is not None:
+        _check(game in index.games, "game", game)
+        stats = data["cube"].player_game(player, game)
+        tests = data["tests"]
+        result["game"] = {"game": game,
+                          "min": int(stats.Min), "max": int(stats.Max), "median": stats.Median,
+                          "count": int(stats.Count),
+                          "mean": stats.Sum / stats.Count if stats.Count else None,
+                          "form": data["form"].current(player, game),
+                          "test": tests.loc[(player, game), :] if (player, game) in tests.index else None}
+    return result
+
+
+def game_stats(data: Dict[str, Any], game: str, version: str = None) -> Dict[str, Any]:
+    """ The statistics of the Game Statistics page, of one version if it is given """
+    matrix, index = data["matrix"], data["index"]
+    _check(game in index.games, "game", game)
+    if version is not None:
+        _check(version in index.versions(game), "version", version)
+
+    selected = matrix.take(index.game(game, version))
+    frequency = pd.Series(selected.played.sum(axis=0), index=selected.players)
+    scores = selected.scores[selected.scores.nonzero()]  # 0 means that no score was registered
+    return {"game": game, "version": version, "versions": index.versions(game), "matches": len(selected),
+            "matches_per_player": frequency[frequency > 0],
+            "distribution": downsample.histogram(scores, "Scores"),
+            "extremes": {name: {"player": row.Player, "score": row.Score}
+                         for name, row in data["cube"].extremes(game, version).iterrows()},
+            "ratings": data["ratings"].table(game)}
+
+
+def headtohead_stats(data: Dict[str, Any], player_one: str, player_two: str, game: str = None) -> Dict[str, Any]:
+    """ The statistics of the Head to Head page, of one game if it is given """
+    matrix, index, pairs = data["matrix"], data["index"], data["pairs"]
+    _check(player_one in data["player_list"], "player", player_one)
+    _check(player_two in data["player_list"], "player", player_two)
+
+    rows = index.pair(player_one, player_two)
+    rows = rows[matrix.nr_players[rows] == 2]
+    played, player_one_won, player_two_won, tied = pairs.record(player_one, player_two)
+    result = {"players": [player_one, player_two], "played": played, "tied": tied,
+              "won": {player_one: player_one_won, player_two: player_two_won},
+              "games": sorted(set(matrix.games[rows]))}
+
+    if game is not None:
+        _check(game in index.games, "game", game)
+        game_matrix = matrix.take(index.intersect(rows, index.game(game)), players=[player_one, player_two])
+        played, player_one_won, player_two_won, tied = pairs.record(player_one, player_two, game)
+        per_player = {}
+        for name in [player_one, player_two]:
+            scores = game_matrix.player_scores(name)[game_matrix.player_played(name)]
+            per_player[name] = {"won": player_one_won if name == player_one else player_two_won,
+                                "average": scores.mean() if len(scores) else None,
+                                "min": scores.min() if len(scores) else None,
+                                "max": scores.max() if len(scores) else None,
+                                "form": data["form"].current(name, game)}
+        result["game"] = {"game": game, "played": played, "tied": tied, "players": per_player}
+    return result
+
+
+def league_table(data: Dict[str, Any]) -> pd.DataFrame:
+    """ The league table of two player matches """
+    return data["pairs"].league_table()
+
+
+def rating_table(data: Dict[str, Any], game: str = None) -> pd.DataFrame:
+    """ The Elo ratings of all rated players, of one game if it is given """
+    if game is not None:
+        _check(game in data["index"].games, "game", game)
+    return data["ratings"].table(game)
+
+
+def significant_players(data: Dict[str, Any]) -> pd.DataFrame:
+    """ Players that score significantly higher or lower than the others in a game """
+    tests = data["tests"]
+    significant = tests.loc[tests.Significant, :].reset_index()
+    significant["Scores"] = np.where(significant.Mean > significant.Average, "Higher", "Lower")
+    return significant.sort_values(["Scores", "P_adjusted"])
+
+
+ENDPOINTS = {"/api/summary": summary_stats, "/api/activity": activity_stats, "/api/player": player_stats,
+             "/api/game": game_stats, "/api/headtohead": headtohead_stats, "/api/league": league_table,
+             "/api/ratings": rating_table, "/api/significance": significant_players}
+
+
+class ApiError(Exception):
+    """ A request that cannot be answered, with the status code of the response """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _check(condition: bool, kind: str, name: str) -> None:
+    """ Raise a 404 if a selected player, game or version does not exist """
+    if not condition:
+        raise ApiError(404, "Unknown {}: {}".format(kind, name))
+
+
+def to_json(value: Any) -> Any:
+    """ Convert frames, series and numpy values to lists, dicts and Python values, NaN to None """
+    if isinstance(value, pd.DataFrame):
+        return [to_json(record) for record in value.to_dict(orient="records")]
+    if isinstance(value, (pd.Series, dict)):
+        return {str(key): to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [to_json(item) for item in value]
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def respond(link: str, sparse: bool, path: str, query: str, etags: str = None) -> tuple:
+    """ Answer a request to the API
+
+    Parameters:
+    -----------
+
+    link : str
+        Link or path to the data
+
+    sparse : bool
+        Whether the data is stored in a sparse MatchStore
+
+    path : str
+        Path of the endpoint, see ENDPOINTS
+
+    query : str
+        Query string with the selections
+
+    etags : str
+        If-None-Match header of the request
+
+    Returns:
+    --------
+
+    status : int
+        HTTP status code
+
+    headers : dict
+        Headers of the response
+
+    body : bytes
+        JSON of the response, empty for 304
+    """
+    try:
+        endpoint = ENDPOINTS.get(path)
+        if endpoint is None:
+            raise ApiError(404, "Unknown endpoint: {}, use one of {}".format(path, ", ".join(ENDPOINTS)))
+        params = dict(urllib.parse.parse_qsl(query))
+        try:
+            inspect.signature(endpoint).bind(None, **params)
+        except TypeError:
+            raise ApiError(400, "Invalid parameters {} for {}".format(sorted(params), path))
+
+        build = warmup.BUILDS.start(link, sparse)
+        if not build.wait(0):
+            return 503, {"Retry-After": "5"}, _error("Loading the data: {}".format(build.description()))
+        if build.exception is not None:
+            return 503, {"Retry-After": "60"}, _error("Loading the data failed: {}".format(build.exception))
+
+        etag = '"{}"'.format(build.validator["sha256"][:32])
+        if etags is not None and etag in [tag.strip() for tag in etags.split(",")]:
+            return 304, {"ETag": etag}, b""
+
+        key = (build.validator["sha256"], path, tuple(sorted(params.items())))
+        try:
+            body = RESPONSES.get(key)
+        except KeyError:
+            result = endpoint(build.data._asdict(), **params)
+            body = json.dumps(to_json(result)).encode()
+            RESPONSES.put(key, body)
+        return 200, {"ETag": etag, "Cache-Control": "no-cache"}, body
+    except ApiError as error:
+        return error.status, {}, _error(str(error))
+    except ValueError as error:
+        return 400, {}, _error(str(error))
+    except Exception as error:
+        return 500, {}, _error("{}: {}".format(type(error).__name__, error))
+
+
+def _error(message: str) -> bytes:
+    return json.dumps({"error": message}).encode()
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """ Answers GET requests with `respond` """
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        status, headers, body = respond(self.server.link, self.server.sparse, url.path, url.query,
+                                        self.headers.get("If-None-Match"))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ApiServer(ThreadingMixIn, HTTPServer):
+    """ HTTP server that handles every request in its own thread, for the data of one link """
+    daemon_threads = True
+
+    def __init__(self, address: tuple, link: str, sparse: bool = False):
+        super().__init__(address, ApiHandler)
+        self.link = link
+        self.sparse = sparse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON API over the statistics of the board game matches")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--link", default=warmup.DEFAULT_LINK, help="Link or path to the data")
+    parser.add_argument("--sparse", action="store_true", help="Store the matches in a sparse MatchStore")
+    args = parser.parse_args()
+
+    warmup.start(args.link, args.sparse)
+    server = ApiServer((args.host, args.port), args.link, args.sparse)
+    print("Serving the API of {} on http://{}:{}/api/summary".format(args.link, args.host, args.port))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,83 @@
-from typing import List, Tuple
+import importlib
+from types import ModuleType
+from typing import TYPE_CHECKING, List, Tuple
 import streamlit as st
 import pandas as pd
 
-# Custom packages
-import playerstats
-import generalstats
-import headtohead
-import exploregames
-import preprocessing
+# Custom packages, only imported when they are used such that the app starts quickly
+if TYPE_CHECKING:
+    from dailyactivity import DailyActivity
+    from matchindex import MatchIndex
+    from matchstore import MatchData
+    from pairmatrix import PairMatrix
+    from ratings import RatingEngine
+    from rollingform import RollingForm
+    from statscube import StatsCube
+
+# Module of each page, imported when the page is selected for the first time
+PAGES = {"Data Exploration": "generalstats",
+         "Player Statistics": "playerstats",
+         "Game Statistics": "exploregames",
+         "Head to Head": "headtohead"}
 
 
 def main():
-    link_to_data, is_loaded_header = load_data_option()
-    df, player_list, exception = load_external_data(link_to_data)
+    link_to_data, sparse, is_loaded_header = load_data_option()
+    (df, player_list, matrix, index, pairs, cube, activity, tests, ratings, form,
+     exception) = load_external_data(link_to_data, sparse, is_loaded_header)
 
     if not exception:
-        create_layout(df, player_list, is_loaded_header)
+        create_layout(df, player_list, matrix, index, pairs, cube, activity, tests, ratings, form, is_loaded_header)
     else:
         st.sidebar.text(str(exception))
         st.title("⭕️The data was not correctly loaded")
         preprocessing_tips()
 
 
-def load_data_option() -> Tuple[str, st.DeltaGenerator.DeltaGenerator]:
+def load_data_option() -> Tuple[str, bool, st.DeltaGenerator.DeltaGenerator]:
     """ Prepare options for loading data"""
+    import warmup
+
     is_loaded_header = st.sidebar.subheader("⭕️ Data not loaded")
-    link_to_data = st.sidebar.text_input('Link to data',
-                                         "https://github.com/MaartenGr/boardgame/blob/master/files/matches.xlsx?raw=true")
+    link_to_data = st.sidebar.text_input('Link to data', warmup.DEFAULT_LINK)
+    sparse = st.sidebar.checkbox("Sparse storage (for many players)", False)
 
-    return link_to_data, is_loaded_header
+    return link_to_data, sparse, is_loaded_header
 
 
-@st.cache
-def load_external_data(link: str) -> Tuple[pd.DataFrame, List[str], Exception]:
+def load_external_data(link: str,
+                       sparse: bool = False,
+                       is_loaded_header: st.DeltaGenerator.DeltaGenerator = None) -> Tuple[pd.DataFrame, List[str], "MatchData", "MatchIndex", "PairMatrix",
+                                                      "StatsCube", "DailyActivity", pd.DataFrame, "RatingEngine",
+                                                      "RollingForm", Exception]:
     """ Load data from a link and preprocess it
 
+    The preprocessed data is also cached on disk by the content of the data
+    such that it does not need to be preprocessed again after a restart.
+    The MatchIndex, PairMatrix, StatsCube, DailyActivity, significance tests, ratings
+    and rolling form are built once here such that pages can look up matches, results and statistics
+    instead of filtering all rows on every rerun. They are only rebuilt when different data is loaded.
+
+    The data of a link is built once in a background thread, see `warmup`, which
+    all sessions wait for, and which can already be started when the server starts.
+    All of it is read-only and shared between sessions. The ratings are also kept on disk
+    such that only new matches are rated after a restart, see `datacache.load_ratings`. The computations of the pages on
+    them are memoized separately, see `pagecache`.
+
     Parameters:
     -----------
 
     link : str
         Link to the data (should be hosted online)
 
+    sparse : bool
+        Whether to store the scores, winners and players in a sparse MatchStore
+        instead of a column per player. This saves memory when there are many
+        distinct players.
+
+    is_loaded_header : streamlit.DeltaGenerator.DeltaGenerator
+        Sidebar subheader that shows the step of the build while waiting for it
+
     Returns:
     --------
 
@@ -54,17 +91,63 @@ def load_external_data(link: str) -> Tuple[pd.DataFrame, List[str], Exception]:
         If there is an issue with loading/preprocessing the data
         then it returns False instead.
 
+    matrix : MatchMatrix | MatchStore | False
+        Scores, winners and players per match.
+        If there is an issue with loading/preprocessing the data
+        then it returns False instead.
+
+    index : MatchIndex | False
+        Matches per player, game, game and version, and pair of players.
+        If there is an issue with loading/preprocessing the data
+        then it returns False instead.
+
+    pairs : PairMatrix | False
+        Two player matches played, won and tied by every pair of players.
+        If there is an issue with loading/preprocessing the data
+        then it returns False instead.
+
+    cube : StatsCube | False
+        Summary statistics of the scores per player, game and version.
+        If there is an issue with loading/preprocessing the data
+        then it returns False instead.
+
+    activity : DailyActivity | False
+        Number of matches, players and matches per game of every day that was played.
+        If there is an issue with loading/preprocessing the data
+        then it returns False instead.
+
+    tests : pandas.core.frame.DataFrame | False
+        Wilcoxon signed-rank tests of every player and game.
+        If there is an issue with loading/preprocessing the data
+        then it returns False instead.
+
+    ratings : RatingEngine | False
+        Elo ratings of every player, overall and per game.
+        If there is an issue with loading/preprocessing the data
+        then it returns False instead.
+
+    form : RollingForm | False
+        Moving average score, win rate and form of every player in every game.
+        If there is an issue with loading/preprocessing the data
+        then it returns False instead.
+
     exception : False | Exception
         If there is something wrong with preprocessing,
         return Exception, otherwise return False
     """
 
-    exception = False
-    try:
-        df, player_list = preprocessing.prepare_data(link)
-        return df, player_list, exception
-    except Exception as exception:
-        return False, False, exception
+    import warmup
+
+    build = warmup.BUILDS.start(link, sparse)
+    shown = None
+    while not build.wait(0.25):
+        if is_loaded_header is not None and build.description() != shown:
+            shown = build.description()
+            is_loaded_header.subheader("⏳ {}".format(shown))
+
+    if build.exception is not None:
+        return False, False, False, False, False, False, False, False, False, False, build.exception
+    return build.data + (False,)
 
 
 def load_homepage() -> None:
@@ -116,6 +199,14 @@ def load_homepage() -> None:
 
 def create_layout(df: pd.DataFrame,
                   player_list: List[str],
+                  matrix: "MatchData",
+                  index: "MatchIndex",
+                  pairs: "PairMatrix",
+                  cube: "StatsCube",
+                  activity: "DailyActivity",
+                  tests: pd.DataFrame,
+                  ratings: "RatingEngine",
+                  form: "RollingForm",
                   is_loaded_header: st.DeltaGenerator.DeltaGenerator) -> None:
     """ Create the layout after the data has succesfully loaded
 
@@ -135,6 +226,30 @@ def create_layout(df: pd.DataFrame,
     player_list : list of str
         List of players that participated in the board games
 
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
+
+    pairs : PairMatrix
+        Two player matches played, won and tied by every pair of players
+
+    cube : StatsCube
+        Summary statistics of the scores per player, game and version
+
+    activity : DailyActivity
+        Number of matches, players and matches per game of every day that was played
+
+    tests : pandas.core.frame.DataFrame
+        Wilcoxon signed-rank tests of every player and game, see `significance.test_all`
+
+    ratings : RatingEngine
+        Elo ratings of every player, overall and per game
+
+    form : RollingForm
+        Moving average score, win rate and form of every player in every game
+
     is_loaded_header : streamlit.DeltaGenerator.DeltaGenerator
         Sidebar subheader to be changed if Data is (not) loaded
 
@@ -142,31 +257,72 @@ def create_layout(df: pd.DataFrame,
 
     is_loaded_header.subheader("✔️Data is loaded")
     st.sidebar.title("Menu")
-    app_mode = st.sidebar.selectbox("Please select a page", ["Homepage",
-                                                             "Data Exploration",
-                                                             "Player Statistics",
-                                                             "Game Statistics",
-                                                             "Head to Head"])
+    app_mode = st.sidebar.selectbox("Please select a page", ["Homepage"] + list(PAGES))
     if app_mode == 'Homepage':
+        import preprocessing
+
         load_homepage()
+        show_score_errors(preprocessing.score_errors(df))
         preprocessing_tips()
     elif app_mode == "Instruction":
         body = " ".join(open("files/instructions.md", 'r').readlines())
         st.markdown(body, unsafe_allow_html=True)
     elif app_mode == "Data Exploration":
-        generalstats.load_page(df)
+        import_page(app_mode).load_page(activity)
     elif app_mode == "Player Statistics":
-        playerstats.load_page(df, player_list)
+        import_page(app_mode).load_page(df, player_list, matrix, index, cube, tests, ratings, form)
     elif app_mode == "Game Statistics":
-        exploregames.load_page(df, player_list)
+        import_page(app_mode).load_page(matrix, index, cube, activity)
     elif app_mode == "Head to Head":
-        headtohead.load_page(df, player_list)
+        import_page(app_mode).load_page(df, player_list, matrix, index, pairs, activity, form)
+
+
+def import_page(page: str) -> ModuleType:
+    """ The module of a page, which is only imported on the first selection of the page
+    such that starting the app does not wait for the dependencies of all pages
+
+    Parameters:
+    -----------
+
+    page : str
+        One of the pages in PAGES
+
+    Returns:
+    --------
+
+    module : module
+        The module with the load_page function of the page
+    """
+    return importlib.import_module(PAGES[page])
+
+
+def show_score_errors(errors: pd.DataFrame) -> None:
+    """ Show the matches whose scores could not be read
+
+    Parameters:
+    -----------
+
+    errors : pandas.core.frame.DataFrame
+        The matches whose scores could not be read, see `preprocessing.score_errors`
+    """
+
+    if len(errors) == 0:
+        return
+
+    st.sidebar.warning("⚠️ The scores of {} match(es) could not be read. "
+                       "These matches are loaded without scores.".format(len(errors)))
+    st.header("⚠️ Matches with unreadable scores")
+    st.write("Scores should be written as the name of a player followed by the score, "
+             "connected with a + symbol (e.g., Peter77+Mike-5). Fix the rows below in your data "
+             "to include their scores.")
+    st.table(errors.assign(Date=errors.Date.dt.strftime("%Y-%m-%d")))
 
 
 def preprocessing_tips() -> None:
     """ Description of how to process the data and in which format. """
     st.header("🎲 Tips for preparing your data")
-    st.write("Make sure your dataset is in a xlsx (excel) format.")
+    st.write("Make sure your dataset is in a xlsx (excel), csv, jsonl or parquet format. "
+             "Csv, jsonl and parquet files are loaded much faster than excel files.")
     st.write("Make sure it has the structure as seen below with the exact same column names"
              ", same structure for scoring points, same structure for players that participated, and "
              "make sure to use the same date format. Any changes to this structure will break the "
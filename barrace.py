@@ -0,0 +1,178 @@
+""" Cumulative number of matches per game over time, the frames of a bar chart race
+
+Only the number of matches per game on each day that was played is stored,
+as CSR arrays: `game_ids[day_offsets[i]:day_offsets[i+1]]` are the games that
+were played on day i and `counts` the number of matches of each. The cumulative
+totals of a frame are the sum of all days up to and including its bucket, which
+is computed when the frames are requested, for any size of bucket:
+
+    race = BarRace.from_data(matrix)
+    for date, totals in race.frames("3D"):
+        ...
+
+    table = race.table("1D")  # One column per day, as in files/output.csv
+
+New matches are added with `append`, which only regroups the days from the
+first new match onwards, such that appending the matches of a new day does not
+touch the earlier days.
+"""
+import numpy as np
+import pandas as pd
+from typing import Iterator, Tuple
+
+from matchmatrix import freeze_array
+from matchstore import MatchData, _offsets
+
+
+class BarRace:
+    """ Number of matches per game and day that was played
+
+    Attributes:
+    -----------
+
+    games : list of str
+        Sorted list of games
+
+    days : pandas.core.indexes.datetimes.DatetimeIndex
+        Sorted days on which at least one match was played
+
+    day_offsets : numpy.ndarray of int64
+        Start of the games of each day in game_ids and counts
+
+    game_ids, counts : numpy.ndarray of int64
+        Games played per day and their number of matches, sorted by day and game
+    """
+
+    def __init__(self, dates: np.ndarray, games: np.ndarray):
+        self.games = []
+        self.days = pd.DatetimeIndex([], name="Date")
+        self.day_offsets = freeze_array([0], np.int64)
+        self.game_ids = freeze_array([], np.int64)
+        self.counts = freeze_array([], np.int64)
+        self.append(dates, games)
+
+    @classmethod
+    def from_data(cls, matrix: MatchData) -> "BarRace":
+        """ Count the matches per game and day of a MatchMatrix or MatchStore
+
+        Parameters:
+        -----------
+
+        matrix : MatchMatrix | MatchStore
+            Scores, winners and players per match
+
+        Returns:
+        --------
+
+        race : BarRace
+        """
+        return cls(matrix.dates, matrix.games)
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes used by the counts """
+        return int(self.days.nbytes + self.day_offsets.nbytes + self.game_ids.nbytes + self.counts.nbytes)
+
+    def append(self, dates: np.ndarray, games: np.ndarray) -> None:
+        """ Add matches to the counts
+
+        The days before the first new match are kept as they are, the days from
+        then onwards are counted again together with the new matches.
+
+        Parameters:
+        -----------
+
+        dates : numpy.ndarray
+            Date of each new match
+
+        games : numpy.ndarray
+            Game of each new match
+        """
+        dates = pd.DatetimeIndex(np.asarray(dates, dtype="datetime64[ns]")).normalize()
+        games = np.asarray(games, dtype=object)
+        if len(dates) == 0:
+            return
+
+        # Games are kept sorted, the ids of the counts are remapped if new games are added
+        all_games = sorted(set(self.games).union(games))
+        if all_games != self.games:
+            remap = pd.Index(all_games).get_indexer(self.games)
+            self.game_ids = freeze_array(remap[self.game_ids] if len(self.game_ids) else [], np.int64)
+            self.games = all_games
+
+        # Days from the first new match onwards are merged with the new matches
+        kept = self.days.searchsorted(dates.min())
+        start = self.day_offsets[kept]
+        tail_days = np.repeat(self.days[kept:].values, np.diff(self.day_offsets[kept:]))
+        day_values = np.concatenate([tail_days, dates.values])
+        game_ids = np.concatenate([self.game_ids[start:], pd.Index(self.games).get_indexer(games)])
+        counts = np.concatenate([self.counts[start:], np.ones(len(dates), dtype=np.int64)])
+
+        day_ids, new_days = pd.factorize(day_values, sort=True)
+        keys, inverse = np.unique(day_ids * len(self.games) + game_ids, return_inverse=True)
+        new_counts = np.bincount(inverse.ravel(), weights=counts, minlength=len(keys)).astype(np.int64)
+
+        self.days = self.days[:kept].append(pd.DatetimeIndex(new_days)).rename("Date")
+        self.day_offsets = freeze_array(np.concatenate([self.day_offsets[:kept],
+                                                        start + _offsets(keys // len(self.games), len(new_days))]),
+                                        np.int64)
+        self.game_ids = freeze_array(np.concatenate([self.game_ids[:start], keys % len(self.games)]), np.int64)
+        self.counts = freeze_array(np.concatenate([self.counts[:start], new_counts]), np.int64)
+
+    def frames(self, freq: str = "1D") -> Iterator[Tuple[pd.Timestamp, pd.Series]]:
+        """ The cumulative number of matches per game at the end of every bucket of time
+
+        Only one frame is kept in memory at a time.
+
+        Parameters:
+        -----------
+
+        freq : str
+            Size of the buckets as a pandas frequency, e.g., 1D, 3D, 1W or 1M.
+            The buckets start at the first day that was played, buckets without
+            matches repeat the previous frame.
+
+        Returns:
+        --------
+
+        frames : iterator of (pandas.Timestamp, pandas.core.series.Series)
+            The start of each bucket and the number of matches of each game up
+            to and including it, indexed by the sorted games
+        """
+        labels, offsets = self._buckets(freq)
+        totals = np.zeros(len(self.games), dtype=np.int64)
+        for label, start, end in zip(labels, offsets[:-1], offsets[1:]):
+            totals += np.bincount(self.game_ids[start:end], weights=self.counts[start:end],
+                                  minlength=len(self.games)).astype(np.int64)
+            yield label, pd.Series(totals.copy(), index=pd.Index(self.games, name="Game"), name=label)
+
+    def table(self, freq: str = "1D") -> pd.DataFrame:
+        """ All frames in a single table
+
+        Parameters:
+        -----------
+
+        freq : str
+            Size of the buckets as a pandas frequency, see `frames`
+
+        Returns:
+        --------
+
+        table : pandas.core.frame.DataFrame
+            The cumulative number of matches with a row per game and a column
+            per start of a bucket, like the files/output.csv of the notebook
+        """
+        labels, offsets = self._buckets(freq)
+        bucket_ids = np.repeat(np.arange(len(labels)), np.diff(offsets))
+        deltas = np.zeros((len(labels), len(self.games)), dtype=np.int64)
+        np.add.at(deltas, (bucket_ids, self.game_ids), self.counts)
+        return pd.DataFrame(deltas.cumsum(axis=0).T, index=pd.Index(self.games, name="Game"), columns=labels)
+
+    def _buckets(self, freq: str) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+        """ Start of every bucket and the offsets of its counts """
+        if len(self.days) == 0:
+            return pd.DatetimeIndex([], name="Date"), np.zeros(1, dtype=np.int64)
+        days_per_bucket = pd.Series(np.ones(len(self.days), dtype=np.int64), index=self.days).resample(freq).sum()
+        ends = np.cumsum(days_per_bucket.to_numpy())
+        return days_per_bucket.index, np.append(0, self.day_offsets[ends])
+
@@ -0,0 +1,287 @@
+""" Benchmarks on a synthetic log of board game matches
+
+Preprocessing over an increasing number of processes:
+
+    python benchmark.py preprocessing --matches 1000000 --players 500 --workers 1 2 4 8
+
+Significance tests of every player and game over an increasing number of processes:
+
+    python benchmark.py significance --matches 1000000 --players 500 --workers 1 2 4 8
+
+Size of the data of the charts before and after reducing it to a budget of points:
+
+    python benchmark.py charts --matches 200000 --players 20 --points 500
+
+Time from a cold start until the homepage is shown, and to import each page on its first selection:
+
+    python benchmark.py startup --repeat 5 --link files/matches.xlsx
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from typing import List
+
+import downsample
+import preprocessing
+import significance
+from matchmatrix import MatchMatrix
+
+
+def synthetic_matches(nr_matches: int,
+                      nr_players: int,
+                      nr_games: int = 20,
+                      seed: int = 0) -> pd.DataFrame:
+    """ Create a raw log of matches in the format of `preprocessing.load_data`
+
+    Every match has two to four players with random scores and is won
+    by the player with the highest score. Twenty matches are played per day.
+
+    Parameters:
+    -----------
+
+    nr_matches : int
+        Number of matches
+
+    nr_players : int
+        Number of distinct players
+
+    nr_games : int
+        Number of distinct games
+
+    seed : int
+        Seed of the random number generator
+
+    Returns:
+    --------
+
+    df : pandas.core.frame.DataFrame
+        The raw data of played board game matches
+    """
+
+    rng = np.random.RandomState(seed)
+    players = np.array(["Player{}".format(idx) for idx in range(nr_players)], dtype=object)
+    games = np.array(["Game{}".format(idx) for idx in range(nr_games)], dtype=object)
+
+    nr_match_players = rng.randint(2, 5, nr_matches)
+    match_players = [players[rng.choice(nr_players, nr, replace=False)] for nr in nr_match_players]
+    match_scores = [rng.randint(1, 150, nr) for nr in nr_match_players]
+
+    return pd.DataFrame({
+        "Date": pd.Timestamp("2015-01-01") + pd.to_timedelta(np.arange(nr_matches) // 20, unit="D"),
+        "Players": ["+".join(names) for names in match_players],
+        "Game": games[rng.randint(nr_games, size=nr_matches)],
+        "Scores": ["+".join("{}{}".format(name, score) for name, score in zip(names, scores))
+                   for names, scores in zip(match_players, match_scores)],
+        "Winner": [names[scores.argmax()] for names, scores in zip(match_players, match_scores)],
+        "Version": "Normal"
+    })
+
+
+def benchmark_preprocessing(df: pd.DataFrame,
+                            workers: List[int],
+                            repeat: int = 3) -> pd.DataFrame:
+    """ Time `preprocessing.preprocess` for each number of workers
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The raw data of played board game matches
+
+    workers : list of int
+        Numbers of processes to compare
+
+    repeat : int
+        The best of this many runs is reported
+
+    Returns:
+    --------
+
+    results : pandas.core.frame.DataFrame
+        Seconds and speedup compared to the first number of workers
+    """
+
+    seconds = []
+    for nr_workers in workers:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            preprocessing.preprocess(df, workers=nr_workers)
+            timings.append(time.perf_counter() - start)
+        seconds.append(min(timings))
+
+    results = pd.DataFrame({"Workers": workers, "Seconds": seconds}).set_index("Workers")
+    results["Speedup"] = results.Seconds.iloc[0] / results.Seconds
+    return results.round(2)
+
+
+def benchmark_significance(df: pd.DataFrame,
+                           workers: List[int],
+                           repeat: int = 3) -> pd.DataFrame:
+    """ Time `significance.test_all` for each number of workers
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The raw data of played board game matches
+
+    workers : list of int
+        Numbers of processes to compare
+
+    repeat : int
+        The best of this many runs is reported
+
+    Returns:
+    --------
+
+    results : pandas.core.frame.DataFrame
+        Seconds and speedup compared to the first number of workers
+    """
+    df, player_list = preprocessing.preprocess(df)
+    matrix = MatchMatrix.from_frame(df, player_list)
+
+    seconds = []
+    for nr_workers in workers:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            significance.test_all(matrix, workers=nr_workers)
+            timings.append(time.perf_counter() - start)
+        seconds.append(min(timings))
+    results = pd.DataFrame({"Workers": workers, "Seconds": seconds}).set_index("Workers")
+    results["Speedup"] = results.Seconds.iloc[0] / results.Seconds
+    return results.round(2)
+
+
+def benchmark_charts(df: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """ Reduce the data of the charts of the most played game and its most frequent player
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The raw data of played board game matches
+
+    max_points : int
+        Maximum number of points per chart
+
+    Returns:
+    --------
+
+    results : pandas.core.frame.DataFrame
+        Rows and bytes of JSON before and after reducing, see `downsample.payload_stats`
+    """
+    downsample.MEASURE_JSON = True
+    df, player_list = preprocessing.preprocess(df)
+    matrix = MatchMatrix.from_frame(df, player_list)
+    game = pd.Series(matrix.games).value_counts().index[0]
+    game_matrix = matrix.take(matrix.games == game)
+    player = game_matrix.players[int(game_matrix.played.sum(axis=0).argmax())]
+
+    scores = game_matrix.player_scores(player)[game_matrix.player_played(player)]
+    lines = pd.DataFrame({"Score": scores, "Player": np.arange(len(scores))})
+    downsample.downsample_lines(lines, x="Player", y="Score", name="Scores over time", max_points=max_points)
+
+    values = game_matrix.scores[game_matrix.scores.nonzero()]
+    downsample.histogram(values, "Scores", name="Distribution of scores", max_bins=max_points)
+    return downsample.payload_stats()
+
+
+def benchmark_startup(link: str, repeat: int = 5) -> pd.DataFrame:
+    """ Time a cold start, each in a new interpreter with an empty cache
+
+    The app is imported and then run once, as streamlit does for the first visitor,
+    which loads the data of link and shows the homepage. This is followed by the
+    import of the module of each page, as on its first selection.
+
+    Parameters:
+    -----------
+
+    link : str
+        Link or path to the data, which is used as the default link of the app
+
+    repeat : int
+        The best of this many new interpreters is reported
+
+    Returns:
+    --------
+
+    results : pandas.core.frame.DataFrame
+        Seconds per step and the cumulative Seconds since the start
+    """
+    script = ("import importlib, json, time\n"
+              "start = time.perf_counter()\n"
+              "import app\n"
+              "timings = [['import app', time.perf_counter() - start]]\n"
+              "start = time.perf_counter()\n"
+              "app.main()\n"
+              "timings.append(['Homepage', time.perf_counter() - start])\n"
+              "for page, module in app.PAGES.items():\n"
+              "    start = time.perf_counter()\n"
+              "    importlib.import_module(module)\n"
+              "    timings.append([page, time.perf_counter() - start])\n"
+              "print(json.dumps(timings))\n")
+
+    runs = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            env = dict(os.environ, BOARDGAME_LINK=link, BOARDGAME_CACHE_DIR=cache_dir)
+            output = subprocess.run([sys.executable, "-c", script], stdout=subprocess.PIPE, check=True, env=env,
+                                    cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        runs.append(json.loads(output.decode().strip().splitlines()[-1]))
+
+    names = [name for name, _ in runs[0]]
+    seconds = np.min([[value for _, value in run] for run in runs], axis=0)
+    results = pd.DataFrame({"Step": names, "Seconds": seconds, "Cumulative": np.cumsum(seconds)})
+    return results.set_index("Step").round(3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks on a synthetic log of board game matches")
+    subparsers = parser.add_subparsers(dest="command")
+    preprocess = subparsers.add_parser("preprocessing", help="Preprocessing over an increasing number of processes")
+    preprocess.add_argument("--matches", type=int, default=200000)
+    preprocess.add_argument("--players", type=int, default=200)
+    preprocess.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    preprocess.add_argument("--repeat", type=int, default=3)
+    tests = subparsers.add_parser("significance", help="Significance tests over an increasing number of processes")
+    tests.add_argument("--matches", type=int, default=200000)
+    tests.add_argument("--players", type=int, default=200)
+    tests.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    tests.add_argument("--repeat", type=int, default=3)
+    charts = subparsers.add_parser("charts", help="Size of the data of the charts before and after reducing it")
+    charts.add_argument("--matches", type=int, default=200000)
+    charts.add_argument("--players", type=int, default=20)
+    charts.add_argument("--points", type=int, default=downsample.MAX_POINTS)
+    startup = subparsers.add_parser("startup", help="Time until the homepage is shown and to import each page")
+    startup.add_argument("--link", default=os.path.join("files", "matches.xlsx"))
+    startup.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "preprocessing":
+        df = synthetic_matches(args.matches, args.players)
+        print("{} matches, {} players, {} cores".format(len(df), args.players, os.cpu_count()))
+        print(benchmark_preprocessing(df, sorted(set(args.workers)), args.repeat))
+    elif args.command == "significance":
+        df = synthetic_matches(args.matches, args.players)
+        print("{} matches, {} players, {} cores".format(len(df), args.players, os.cpu_count()))
+        print(benchmark_significance(df, sorted(set(args.workers)), args.repeat))
+    elif args.command == "charts":
+        df = synthetic_matches(args.matches, args.players)
+        print("{} matches, {} players, {} points".format(len(df), args.players, args.points))
+        print(benchmark_charts(df, args.points))
+    elif args.command == "startup":
+        print(benchmark_startup(os.path.abspath(args.link), args.repeat))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
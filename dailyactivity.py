@@ -0,0 +1,240 @@
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+
+from matchmatrix import freeze_array
+from matchstore import MatchData, MatchStore, _offsets
+from pagecache import memoize
+
+
+class DailyActivity:
+    """ Number of matches, players and matches per game of every day that was played
+
+    The table is built once after loading such that the Data Exploration page
+    only looks up its statistics. Breaks and streaks are found on the sorted
+    days with `np.diff`: a break is the number of days between two subsequent
+    days that were played and a streak is a run of days that are one day apart.
+
+    The number of matches per day are also kept per game, per game and version
+    and per pair of players (of two player matches) such that the activity charts
+    of all pages are served by summing the days into buckets, see `series`.
+
+    The players of each day are stored as CSR arrays:
+    `day_players[player_offsets[i]:player_offsets[i+1]]` are the sorted player ids
+    that played on day i.
+
+    Attributes:
+    -----------
+
+    players : list of str
+        Sorted list of players
+
+    table : pandas.core.frame.DataFrame
+        The number of Games (matches) and distinct Players per day,
+        indexed by the sorted Date
+
+    per_game : pandas.core.series.Series
+        Number of matches per game and day, indexed by Game and Date
+
+    per_version : pandas.core.series.Series
+        Number of matches per game, version and day, indexed by Game, Version and Date
+
+    per_pair : pandas.core.series.Series
+        Number of two player matches per pair of players and day, indexed by
+        Player, Opponent and Date where Player is the first in the sorted players
+
+    day_players, player_offsets : numpy.ndarray of int64
+        Players per day in CSR format
+    """
+
+    def __init__(self,
+                 players: List[str],
+                 match_ids: np.ndarray,
+                 player_ids: np.ndarray,
+                 dates: np.ndarray,
+                 games: np.ndarray,
+                 versions: np.ndarray,
+                 nr_players: np.ndarray):
+        self.players = list(players)
+        day_ids, days = pd.factorize(np.asarray(dates, dtype="datetime64[ns]"), sort=True)
+        days = pd.DatetimeIndex(days, name="Date")
+        match_ids, player_ids = np.asarray(match_ids, dtype=np.int64), np.asarray(player_ids, dtype=np.int64)
+        nr_days, nr_ids = len(days), max(len(self.players), 1)
+
+        # Distinct players per day from the unique (day, player) keys
+        keys = np.unique(day_ids[match_ids] * nr_ids + player_ids)
+        self.day_players = freeze_array(keys % nr_ids, np.int64)
+        self.player_offsets = freeze_array(_offsets(keys // nr_ids, nr_days), np.int64)
+
+        self.table = pd.DataFrame({"Games": np.bincount(day_ids, minlength=nr_days),
+                                   "Players": np.diff(self.player_offsets)},
+                                  index=days, columns=["Games", "Players"])
+        self.per_version = _count_per_day([games, versions, days[day_ids]], ["Game", "Version", "Date"])
+        self.per_game = self.per_version.groupby(level=["Game", "Date"], sort=True).sum()
+
+        # Pairs of the two player matches that have both players in them
+        nr_played = np.bincount(match_ids, minlength=len(day_ids))
+        two_players = (np.asarray(nr_players)[match_ids] == 2) & (nr_played[match_ids] == 2)
+        order = np.lexsort((player_ids[two_players], match_ids[two_players]))
+        pairs = player_ids[two_players][order].reshape(-1, 2)
+        pair_matches = match_ids[two_players][order][::2]
+        player_names = np.array(self.players, dtype=object)
+        self.per_pair = _count_per_day([player_names[pairs[:, 0]], player_names[pairs[:, 1]],
+                                        days[day_ids[pair_matches]]], ["Player", "Opponent", "Date"])
+
+    @classmethod
+    def from_data(cls, matrix: MatchData) -> "DailyActivity":
+        """ Create the table from a MatchMatrix or MatchStore
+
+        Parameters:
+        -----------
+
+        matrix : MatchMatrix | MatchStore
+            Scores, winners and players per match
+
+        Returns:
+        --------
+
+        activity : DailyActivity
+        """
+        if isinstance(matrix, MatchStore):
+            match_ids, player_ids = matrix.match_ids[matrix.played], matrix.player_ids[matrix.played]
+        else:
+            match_ids, player_ids = np.nonzero(matrix.played)
+
+        return cls(players=matrix.players,
+                   match_ids=match_ids,
+                   player_ids=player_ids,
+                   dates=matrix.dates,
+                   games=matrix.games,
+                   versions=matrix.versions,
+                   nr_players=matrix.nr_players)
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes used by the table """
+        series = [self.per_game, self.per_version, self.per_pair]
+        return int(self.table.memory_usage(deep=True).sum() + sum(s.memory_usage(deep=True) for s in series)
+                   + self.day_players.nbytes + self.player_offsets.nbytes)
+
+    def day_player_names(self, date: pd.Timestamp) -> List[str]:
+        """ Sorted players that played on a day """
+        idx = self.table.index.get_loc(date)
+        return [self.players[player] for player in
+                self.day_players[self.player_offsets[idx]:self.player_offsets[idx + 1]]]
+
+    @memoize
+    def game_counts(self) -> pd.Series:
+        """ Number of matches per game, indexed by the sorted games """
+        return self.per_game.groupby(level="Game", sort=True).sum()
+
+    def gaps(self, top: int = 5) -> pd.DataFrame:
+        """ The longest breaks between two subsequent days that were played
+
+        Parameters:
+        -----------
+
+        top : int
+            Number of breaks to return
+
+        Returns:
+        --------
+
+        gaps : pandas.core.frame.DataFrame
+            The Start_date and End_date of the breaks and the Count of days
+            between them, longest first and earliest first for equal lengths
+        """
+        days = self.table.index
+        counts = (np.diff(days.values) // np.timedelta64(1, 'D')).astype(np.int64)
+        order = np.argsort(-counts, kind="mergesort")[:top]
+        return pd.DataFrame({"Start_date": days[:-1][order], "End_date": days[1:][order], "Count": counts[order]},
+                            columns=["Start_date", "End_date", "Count"])
+
+    def streaks(self, top: int = 1) -> pd.DataFrame:
+        """ The longest runs of subsequent days that were played
+
+        Parameters:
+        -----------
+
+        top : int
+            Number of streaks to return
+
+        Returns:
+        --------
+
+        streaks : pandas.core.frame.DataFrame
+            The Start_date and End_date of the streaks (both played) and the Count
+            of days in them, longest first and earliest first for equal lengths
+        """
+        days = self.table.index
+        if len(days) == 0:
+            return pd.DataFrame(columns=["Start_date", "End_date", "Count"])
+
+        # A streak ends wherever the next day that was played is not the day after
+        breaks = np.flatnonzero(np.diff(days.values) != np.timedelta64(1, 'D'))
+        starts = np.append(0, breaks + 1)
+        ends = np.append(breaks, len(days) - 1)
+        counts = ends - starts + 1
+        order = np.argsort(-counts, kind="mergesort")[:top]
+        return pd.DataFrame({"Start_date": days[starts[order]], "End_date": days[ends[order]],
+                             "Count": counts[order]},
+                            columns=["Start_date", "End_date", "Count"])
+
+    @memoize
+    def series(self,
+               freq: str = "3D",
+               game: str = None,
+               version: str = None,
+               pair: Tuple[str, str] = None) -> pd.DataFrame:
+        """ Number of matches per bucket of time
+
+        The results are memoized per data, frequency and selection,
+        see `pagecache.memoize`, and should therefore not be changed.
+
+        Parameters:
+        -----------
+
+        freq : str
+            Size of the buckets as a pandas frequency, e.g., 1D, 3D, 1W or 1M.
+            The buckets start at the first day of the selected matches.
+
+        game : str
+            If given, only count the matches of this game
+
+        version : str
+            If given with a game, only count the matches of this version of it
+
+        pair : tuple of str
+            If given, only count the two player matches of this pair of players
+
+        Returns:
+        --------
+
+        series : pandas.core.frame.DataFrame
+            The number of Games per Date, where the Date is the start of the bucket
+        """
+        if pair is not None:
+            counts = _select(self.per_pair, tuple(sorted(pair)))
+        elif game is not None and version is not None:
+            counts = _select(self.per_version, (game, version))
+        elif game is not None:
+            counts = _select(self.per_game, game)
+        else:
+            counts = self.table.Games
+
+        counts = counts.resample(freq).sum()
+        return pd.DataFrame({"Date": counts.index, "Games": counts.to_numpy()}, columns=["Date", "Games"])
+
+
+def _count_per_day(keys: List[np.ndarray], names: List[str]) -> pd.Series:
+    """ Number of matches per unique combination of keys, sorted by the keys """
+    counts = pd.Series(np.ones(len(keys[-1]), dtype=np.int64), index=pd.MultiIndex.from_arrays(keys, names=names))
+    return counts.groupby(level=names, sort=True).sum()
+
+
+def _select(counts: pd.Series, key) -> pd.Series:
+    """ Matches per day of one key of a series indexed by keys and Date """
+    try:
+        return counts.loc[key]
+    except KeyError:
+        return pd.Series([], index=pd.DatetimeIndex([], name="Date"), dtype=np.int64)
@@ -0,0 +1,463 @@
+""" Content-addressed on-disk cache of the preprocessed data
+
+The raw bytes of the data are hashed and the preprocessed data is stored as a
+numpy .npz file under that hash. When the same data is loaded again, for example
+after a restart of the server, the preprocessed data is loaded directly from disk
+and `pd.read_excel` and preprocessing are skipped entirely.
+
+When the data changed, only the rows that were appended since the last load of
+the same link are preprocessed and merged into the cached data. Everything is
+preprocessed again only if an earlier row was edited or removed.
+
+The cache is bounded in size and the least recently used files are removed first.
+It can be warmed up beforehand from the command line:
+
+    python datacache.py warm https://github.com/MaartenGr/boardgame/blob/master/files/matches.xlsx?raw=true
+
+Large logs can be preprocessed over several processes with `--workers`.
+
+The Elo ratings of each link are also kept on disk, such that only the matches
+that were appended since the last load are rated.
+
+Whether the data of a link changed since it was read can be checked without
+reading it again with `fetch_if_changed`, see `warmup` for the periodic refresh.
+"""
+import argparse
+import hashlib
+import io
+import os
+import tempfile
+import urllib.error
+import urllib.request
+import zipfile
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+import preprocessing
+from matchmatrix import MatchMatrix
+from matchstore import MatchData, MatchStore
+from ratings import RatingEngine
+
+# Increase whenever preprocessing changes such that old files are no longer used
+CACHE_VERSION = 4
+CACHE_DIR = os.environ.get("BOARDGAME_CACHE_DIR",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"))
+MAX_CACHE_BYTES = int(os.environ.get("BOARDGAME_CACHE_BYTES", 256 * 1024 ** 2))
+
+STORE_ARRAYS = ["match_ids", "player_ids", "scores", "won", "played"]
+
+
+def load_dataset(link: str,
+                 sparse: bool = False,
+                 cache_dir: str = CACHE_DIR,
+                 max_bytes: int = MAX_CACHE_BYTES,
+                 workers: int = 1,
+                 raw: bytes = None) -> Tuple[pd.DataFrame, List[str], MatchData]:
+    """ Load the preprocessed data from the cache or preprocess and cache it
+
+    Parameters:
+    -----------
+
+    link : str
+        Link or path to the data
+
+    sparse : bool
+        Whether to use a sparse MatchStore instead of a MatchMatrix
+
+    cache_dir : str
+        Directory in which the preprocessed data is stored
+
+    max_bytes : int
+        Maximum size of all files in cache_dir
+
+    workers : int
+        Number of processes over which the rows are preprocessed
+        on a cache miss, see `preprocessing.preprocess`
+
+    raw : bytes
+        The raw data of the link if it was already read, see `fetch_if_changed`
+
+    Returns:
+    --------
+
+    df : pandas.core.frame.DataFrame
+        The preprocessed data
+
+    player_list : list of str
+        List of players
+
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+    """
+    raw = fetch_source(link) if raw is None else raw
+    path = os.path.join(cache_dir, source_key(raw, sparse) + ".npz")
+
+    latest_path = os.path.join(cache_dir, link_key(link, sparse) + ".latest")
+
+    cached = try_read_cache(path, sparse)
+    if cached is not None:
+        os.utime(path)  # Mark as recently used
+        write_latest(latest_path, path)
+        return cached[:3]
+
+    raw_df = preprocessing.load_data(io.BytesIO(raw), preprocessing.detect_format(link, raw))
+    fingerprints = preprocessing.row_fingerprints(raw_df)
+    df, player_list, matrix = preprocess_incremental(raw_df, fingerprints, sparse, read_latest(latest_path, sparse),
+                                                      workers)
+
+    write_cache(path, df, player_list, fingerprints, matrix if sparse else None)
+    write_latest(latest_path, path)
+    evict(cache_dir, max_bytes)
+    return df, player_list, matrix
+
+
+def load_ratings(link: str,
+                 matrix: MatchData,
+                 sparse: bool = False,
+                 cache_dir: str = CACHE_DIR) -> RatingEngine:
+    """ Rate the matches of a link on top of the ratings of its previous load
+
+    Parameters:
+    -----------
+
+    link : str
+        Link or path to the data
+
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match of the link
+
+    sparse : bool
+        Whether matrix is a sparse MatchStore, the ratings of each storage type are kept apart
+
+    cache_dir : str
+        Directory in which the ratings are stored
+
+    Returns:
+    --------
+
+    ratings : RatingEngine
+        The ratings of all matches in matrix
+    """
+    path = os.path.join(cache_dir, link_key(link, sparse) + ".ratings.npz")
+
+    checkpoint = None
+    if os.path.exists(path):
+        try:
+            checkpoint = RatingEngine.load(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            os.remove(path)
+
+    rated = checkpoint.nr_matches if checkpoint is not None else None
+    ratings = RatingEngine.from_data(matrix, checkpoint)
+    if ratings is not checkpoint or ratings.nr_matches != rated:
+        ratings.save(path)
+    return ratings
+
+
+def preprocess_incremental(raw_df: pd.DataFrame,
+                           fingerprints: np.ndarray,
+                           sparse: bool,
+                           previous: tuple = None,
+                           workers: int = 1) -> Tuple[pd.DataFrame, List[str], MatchData]:
+    """ Preprocess only the rows that were appended since a previous load
+
+    Parameters:
+    -----------
+
+    raw_df : pandas.core.frame.DataFrame
+        The raw data as loaded by `preprocessing.load_data`
+
+    fingerprints : numpy.ndarray
+        Fingerprint of each row in raw_df
+
+    sparse : bool
+        Whether to use a sparse MatchStore instead of a MatchMatrix
+
+    previous : tuple | None
+        The df, player_list, matrix and fingerprints of a previous load of the same link
+
+    workers : int
+        Number of processes over which the dense data is preprocessed
+
+    Returns:
+    --------
+
+    df : pandas.core.frame.DataFrame
+        The preprocessed data
+
+    player_list : list of str
+        List of players
+
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+    """
+
+    if previous is not None:
+        df, player_list, matrix, previous_fingerprints = previous
+        nr_rows = len(previous_fingerprints)
+
+        # Earlier rows are unchanged, only new rows were added
+        if nr_rows <= len(fingerprints) and np.array_equal(fingerprints[:nr_rows], previous_fingerprints):
+            new_df = raw_df.iloc[nr_rows:]
+            if sparse:
+                return preprocessing.append_sparse_data(df, player_list, matrix, new_df)
+            df, player_list = preprocessing.append_data(df, player_list, new_df)
+            return df, player_list, MatchMatrix.from_frame(df, player_list)
+
+    if sparse:
+        return preprocessing.preprocess_sparse(raw_df)
+    df, player_list = preprocessing.preprocess(raw_df, workers=workers)
+    return df, player_list, MatchMatrix.from_frame(df, player_list)
+
+
+def fetch_source(link: str) -> bytes:
+    """ Read the raw bytes of a local file or download them """
+    if os.path.exists(link):
+        with open(link, "rb") as f:
+            return f.read()
+    with urllib.request.urlopen(link) as response:
+        return response.read()
+
+
+def fetch_if_changed(link: str, validator: Dict[str, str] = None) -> Tuple[bytes, Dict[str, str]]:
+    """ Read the raw bytes of a local file or download them, unless they did not change
+
+    A local file is unchanged if its modification time and size are the same.
+    A download is requested with the ETag and Last-Modified of the previous
+    response, such that the server answers 304 Not Modified without the data.
+    If the file was touched or the server does not support either header,
+    the data is read and compared by its hash instead.
+
+    Parameters:
+    -----------
+
+    link : str
+        Link or path to the data
+
+    validator : Dict[str, str]
+        The validator returned by the previous call for the same link,
+        or None to read the data
+
+    Returns:
+    --------
+
+    raw : bytes
+        The raw data, or None if it did not change
+
+    validator : Dict[str, str]
+        The validator of the data that is read now
+    """
+    validator = validator if validator is not None else {}
+
+    if os.path.exists(link):
+        stat = os.stat(link)
+        current = {"mtime": str(stat.st_mtime_ns), "size": str(stat.st_size)}
+        if all(validator.get(key) == value for key, value in current.items()):
+            return None, validator
+        raw = fetch_source(link)
+    else:
+        request = urllib.request.Request(link)
+        if "etag" in validator:
+            request.add_header("If-None-Match", validator["etag"])
+        if "last_modified" in validator:
+            request.add_header("If-Modified-Since", validator["last_modified"])
+        try:
+            with urllib.request.urlopen(request) as response:
+                raw = response.read()
+                headers = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+        except urllib.error.HTTPError as error:
+            if error.code == 304:
+                return None, validator
+            raise
+        current = {key: value for key, value in headers.items() if value is not None}
+
+    current["sha256"] = hashlib.sha256(raw).hexdigest()
+    if current["sha256"] == validator.get("sha256"):
+        return None, current
+    return raw, current
+
+
+def link_key(link: str, sparse: bool = False) -> str:
+    """ Hash of the link, the storage type and the cache version """
+    return source_key(link.encode(), sparse)
+
+
+def source_key(raw: bytes, sparse: bool = False) -> str:
+    """ Hash of the raw data, the storage type and the cache version """
+    digest = hashlib.sha256(raw)
+    digest.update("{}-{}".format(CACHE_VERSION, "sparse" if sparse else "dense").encode())
+    return digest.hexdigest()
+
+
+def write_latest(latest_path: str, path: str) -> None:
+    """ Remember which file contains the latest data of a link """
+    os.makedirs(os.path.dirname(latest_path), exist_ok=True)
+    with open(latest_path, "w") as f:
+        f.write(os.path.basename(path))
+
+
+def read_latest(latest_path: str, sparse: bool = False) -> tuple:
+    """ Read the latest data of a link, or None if it is not (or no longer) cached """
+    try:
+        with open(latest_path) as f:
+            path = os.path.join(os.path.dirname(latest_path), f.read().strip())
+    except OSError:
+        return None
+    return try_read_cache(path, sparse)
+
+
+def write_cache(path: str,
+                df: pd.DataFrame,
+                player_list: List[str],
+                fingerprints: np.ndarray,
+                store: MatchStore = None) -> None:
+    """ Atomically write the preprocessed data, the fingerprints of the raw rows
+    and optionally a MatchStore to path """
+    arrays = frame_to_arrays(df)
+    arrays["player_list"] = np.array(player_list, dtype=str)
+    arrays["fingerprints"] = fingerprints
+    if store is not None:
+        arrays.update({"store_" + name: getattr(store, name) for name in STORE_ARRAYS})
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A unique temporary file, such that concurrent writes of the same entry do not collide
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def try_read_cache(path: str, sparse: bool = False) -> tuple:
+    """ Read the cache if it exists, remove it if it cannot be read """
+    if not os.path.exists(path):
+        return None
+    try:
+        return read_cache(path, sparse)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        os.remove(path)
+        return None
+
+
+def read_cache(path: str, sparse: bool = False) -> Tuple[pd.DataFrame, List[str], MatchData, np.ndarray]:
+    """ Read the preprocessed data and fingerprints written by `write_cache` """
+    with np.load(path, allow_pickle=False) as arrays:
+        arrays = dict(arrays)
+
+    df = arrays_to_frame(arrays)
+    player_list = list(arrays["player_list"])
+
+    if sparse:
+        matrix = MatchStore(players=player_list,
+                            dates=df.Date.to_numpy(),
+                            games=df.Game.to_numpy(),
+                            versions=df.Version.to_numpy(),
+                            nr_players=df.Nr_players.to_numpy(),
+                            **{name: arrays["store_" + name] for name in STORE_ARRAYS})
+    else:
+        matrix = MatchMatrix.from_frame(df, player_list)
+
+    return df, player_list, matrix, arrays["fingerprints"]
+
+
+def evict(cache_dir: str, max_bytes: int) -> None:
+    """ Remove the least recently used files until the cache is at most max_bytes """
+    if not os.path.isdir(cache_dir):
+        return
+
+    paths = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(".npz")]
+    paths.sort(key=os.path.getmtime, reverse=True)
+
+    total = 0
+    for path in paths:
+        total += os.path.getsize(path)
+        if total > max_bytes:
+            os.remove(path)
+
+
+def frame_to_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """ Convert a DataFrame to numpy arrays that can be stored without pickle
+
+    Categorical columns are stored as codes and categories and object columns
+    as strings with a mask of missing values. Other columns are stacked into one
+    block per dtype since reading many small arrays from a .npz file is slow.
+    """
+
+    arrays = {"columns": np.array(df.columns, dtype=str)}
+    kinds = []
+    blocks = {}
+
+    for idx, column in enumerate(df.columns):
+        values = df[column]
+        if isinstance(values.dtype, pd.api.types.CategoricalDtype):
+            kinds.append("category")
+            arrays["c{}_codes".format(idx)] = values.cat.codes.to_numpy()
+            arrays["c{}_categories".format(idx)] = np.array(values.cat.categories.astype(str), dtype=str)
+        elif values.dtype == object:
+            kinds.append("object")
+            missing = values.isnull().to_numpy()
+            arrays["c{}_missing".format(idx)] = missing
+            arrays["c{}".format(idx)] = np.array(values.where(~missing, "").astype(str), dtype=str)
+        else:
+            kinds.append("values")
+            blocks.setdefault(values.dtype.str, []).append(idx)
+
+    for block, indices in enumerate(blocks.values()):
+        arrays["b{}".format(block)] = np.stack([df.iloc[:, idx].to_numpy() for idx in indices])
+        arrays["b{}_columns".format(block)] = np.array(indices)
+
+    arrays["kinds"] = np.array(kinds, dtype=str)
+    return arrays
+
+
+def arrays_to_frame(arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """ Convert the arrays created by `frame_to_arrays` back to a DataFrame """
+
+    columns = arrays["columns"]
+    data = {}
+
+    block = 0
+    while "b{}".format(block) in arrays:
+        for values, idx in zip(arrays["b{}".format(block)], arrays["b{}_columns".format(block)]):
+            data[columns[idx]] = values
+        block += 1
+
+    for idx, (column, kind) in enumerate(zip(columns, arrays["kinds"])):
+        if kind == "category":
+            data[column] = pd.Categorical.from_codes(arrays["c{}_codes".format(idx)],
+                                                     categories=arrays["c{}_categories".format(idx)].astype(object))
+        elif kind == "object":
+            values = arrays["c{}".format(idx)].astype(object)
+            values[arrays["c{}_missing".format(idx)]] = np.nan
+            data[column] = values
+
+    return pd.DataFrame(data, columns=list(columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the cache of preprocessed board game data")
+    subparsers = parser.add_subparsers(dest="command")
+    warm = subparsers.add_parser("warm", help="Preprocess the data and store it in the cache")
+    warm.add_argument("links", nargs="+", help="Links or paths to the data")
+    warm.add_argument("--sparse", action="store_true", help="Also cache the sparse MatchStore")
+    warm.add_argument("--cache-dir", default=CACHE_DIR)
+    warm.add_argument("--workers", type=int, default=1, help="Number of processes used for preprocessing")
+    args = parser.parse_args()
+
+    if args.command == "warm":
+        for link in args.links:
+            for sparse in ([False, True] if args.sparse else [False]):
+                df, player_list, _ = load_dataset(link, sparse=sparse, cache_dir=args.cache_dir,
+                                                  workers=args.workers)
+                print("Cached {} matches and {} players from {} ({})".format(len(df), len(player_list), link,
+                                                                             "sparse" if sparse else "dense"))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+""" Reduce the data of the charts before it is sent to the browser
+
+Altair embeds every row of a chart into its Vega-Lite spec, which is sent over
+the websocket and rendered in the browser. For games with thousands of matches
+this is slower than all computations of the page. The data of the charts is
+therefore reduced to at most MAX_POINTS points:
+
+    * Lines are reduced with Largest-Triangle-Three-Buckets (LTTB), which keeps
+      the first and last point and, per bucket, the point that forms the
+      largest triangle with its neighbours such that peaks and dips remain.
+    * Distributions are counted per distinct value, or in MAX_POINTS bins of
+      equal width if there are more distinct values, instead of sending every
+      value to be counted by Vega-Lite.
+
+Data with fewer points is sent as it is. The number of rows and bytes before
+and after are kept per chart, see `payload_stats`. The bytes are the size of
+the frames in memory, which costs nothing to compute. The size of their JSON is
+measured instead if MEASURE_JSON is set, as the benchmark does, since that
+serializes the full data that reducing it avoids.
+"""
+import os
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+
+MAX_POINTS = int(os.environ.get("BOARDGAME_CHART_POINTS", 500))
+MEASURE_JSON = bool(int(os.environ.get("BOARDGAME_CHART_JSON", 0)))
+
+_PAYLOADS = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int = MAX_POINTS) -> np.ndarray:
+    """ Positions of the points to keep of a line with Largest-Triangle-Three-Buckets
+
+    Parameters:
+    -----------
+
+    x, y : numpy.ndarray
+        Coordinates of the points, sorted by x
+
+    max_points : int
+        Maximum number of points to keep, at least 3
+
+    Returns:
+    --------
+
+    positions : numpy.ndarray of int64
+        Sorted positions of the points to keep, all points if there are at most max_points
+    """
+    nr_points = len(x)
+    if nr_points <= max_points or max_points < 3:
+        return np.arange(nr_points)
+
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+
+    # The points between the first and the last are divided over max_points - 2 buckets
+    bounds = np.linspace(1, nr_points - 1, max_points - 1).astype(np.int64)
+    positions = np.empty(max_points, dtype=np.int64)
+    positions[0], positions[-1] = 0, nr_points - 1
+
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+
+        # Average of the next bucket, or the last point for the last bucket
+        next_end = bounds[bucket + 2] if bucket + 2 < len(bounds) else nr_points
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        positions[bucket + 1] = previous
+
+    return positions
+
+
+def downsample_lines(df: pd.DataFrame,
+                     x: str,
+                     y: str,
+                     series: str = None,
+                     name: str = None,
+                     max_points: int = MAX_POINTS) -> pd.DataFrame:
+    """ Reduce the rows of one or more lines with LTTB
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The data of the chart, sorted by x within each line
+
+    x, y : str
+        Columns of the coordinates. The points are selected on y, the other
+        columns are kept for the same rows.
+
+    series : str
+        Column that separates the lines, the budget is divided over them
+
+    name : str
+        Name under which the payload is reported, see `payload_stats`
+
+    max_points : int
+        Maximum number of rows of all lines together
+
+    Returns:
+    --------
+
+    reduced : pandas.core.frame.DataFrame
+        The selected rows, in the same order
+    """
+    if series is None:
+        reduced = df.iloc[lttb(df[x].to_numpy(), df[y].to_numpy(), max_points)]
+    else:
+        lines = [rows for _, rows in df.groupby(series, sort=False)]
+        budget = max(max_points // max(len(lines), 1), 3)
+        rows = [line.index[lttb(line[x].to_numpy(), line[y].to_numpy(), budget)] for line in lines]
+        reduced = df.loc[df.index.isin(np.concatenate(rows) if rows else [])]
+
+    _report(name, df, reduced)
+    return reduced
+
+
+def histogram(values: np.ndarray,
+              column: str = "Scores",
+              name: str = None,
+              max_bins: int = MAX_POINTS) -> pd.DataFrame:
+    """ Count the values per distinct value, or per bin if there are too many
+
+    Parameters:
+    -----------
+
+    values : numpy.ndarray
+        The values of the distribution
+
+    column : str
+        Name of the column of the values
+
+    name : str
+        Name under which the payload is reported, see `payload_stats`
+
+    max_bins : int
+        Maximum number of rows
+
+    Returns:
+    --------
+
+    counts : pandas.core.frame.DataFrame
+        The start (column) and end (column + "_end") of each bin and its Count.
+        Distinct values are bins with an equal start and end.
+    """
+    values = np.asarray(values)
+    distinct, counts = np.unique(values, return_counts=True)
+    if len(distinct) <= max_bins:
+        starts, ends = distinct, distinct
+    else:
+        counts, edges = np.histogram(values, bins=max_bins)
+        starts, ends = edges[:-1], edges[1:]
+
+    binned = pd.DataFrame({column: starts, column + "_end": ends, "Count": counts},
+                          columns=[column, column + "_end", "Count"])
+    _report(name, pd.DataFrame({column: values}), binned)
+    return binned
+
+
+def payload_stats() -> pd.DataFrame:
+    """ Rows and bytes of the last data of each chart, before and after reducing it, see MEASURE_JSON """
+    with _LOCK:
+        return pd.DataFrame(list(_PAYLOADS.values()),
+                            index=pd.Index(list(_PAYLOADS.keys()), name="Chart"),
+                            columns=["Rows", "Bytes", "Sent rows", "Sent bytes"])
+
+
+def _report(name: str, raw: pd.DataFrame, sent: pd.DataFrame) -> None:
+    """ Keep the size of the data of a chart before and after reducing it """
+    if name is None:
+        return
+
+    size = _json_bytes if MEASURE_JSON else _memory_bytes
+    sizes = [len(raw), size(raw), len(sent), size(sent)]
+    with _LOCK:
+        _PAYLOADS[name] = sizes
+        _PAYLOADS.move_to_end(name)
+
+
+def _memory_bytes(df: pd.DataFrame) -> int:
+    """ Number of bytes of the columns of a frame in memory, without following object references """
+    return int(df.memory_usage(index=False).sum())
+
+
+def _json_bytes(df: pd.DataFrame) -> int:
+    """ Number of bytes of the rows of a frame in JSON, as they are embedded in the spec """
+    return len(df.to_json(orient="records", date_format="iso").encode())
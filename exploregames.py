@@ -1,14 +1,23 @@
-from typing import List, Tuple
+from typing import Tuple
 import streamlit as st
 import altair as alt
 import pandas as pd
-import numpy as np
+
+import downsample
+from dailyactivity import DailyActivity
+from matchindex import MatchIndex
+from matchmatrix import MatchMatrix
+from matchstore import MatchData
+from pagecache import memoize
+from statscube import StatsCube
 
 SPACES = '&nbsp;' * 10
 
 
-def load_page(df: pd.DataFrame,
-              player_list: List[str]) -> None:
+def load_page(matrix: MatchData,
+              index: MatchIndex,
+              cube: StatsCube,
+              activity: DailyActivity) -> None:
     """ In this section you can compare explore data for specific games.
 
     Sections
@@ -21,37 +30,44 @@ def load_page(df: pd.DataFrame,
     Parameters:
     -----------
 
-    df : pandas.core.frame.DataFrame
-        The data to be used for the analyses of played board game matches.
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
 
-    player_list : list of str
-        List of players that participated in the board games
+    cube : StatsCube
+        Summary statistics of the scores per player, game and version
+
+    activity : DailyActivity
+        Number of matches, players and matches per game of every day that was played
     """
 
-    selected_game_df, selected_game = prepare_layout(df)
-    plot_distribution(selected_game_df)
-    plot_frequent_players(selected_game_df, player_list)
-    show_min_max_stats(selected_game_df, selected_game)
-    sidebar_activity_plot(selected_game_df)
+    selected_game, selected_version = prepare_layout(index)
+    selected_matrix = game_matches(matrix, index, selected_game, selected_version)
+    plot_distribution(selected_matrix)
+    plot_frequent_players(selected_matrix)
+    show_min_max_stats(cube, selected_game, selected_version)
+    sidebar_activity_plot(activity, selected_game, selected_version)
 
 
-def prepare_layout(df: pd.DataFrame) -> Tuple[pd.DataFrame, str]:
+def prepare_layout(index: MatchIndex) -> Tuple[str, str]:
     """ Prepare layout and widgets
 
     Parameters:
     -----------
 
-    df : pandas.core.frame.DataFrame
-        The data to be used for the analyses of played board game matches.
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
 
     Returns:
     --------
 
-    selected_game_df : pandas.core.frame.DataFrame
-        Data filtered by the selected game
-
     selected_game : str
         The selected game
+
+    selected_version : str | None
+        The selected version, None if the game has a single version
     """
 
     st.title("🎲 Explore games")
@@ -65,96 +81,99 @@ def prepare_layout(df: pd.DataFrame) -> Tuple[pd.DataFrame, str]:
     st.markdown("{}🔹 The **frequency** of matches for each player. ".format(SPACES))
     st.markdown("{}🔹 The **top** and **bottom** players for the selected game.".format(SPACES))
 
-    # Prepare ordered selection of games
-    games = list(df.Game.unique())
-    games.sort()
-
     # Select game and possibly a version of it
-    selected_game = st.selectbox("Select a game to explore.", games)
-    selected_game_df = df.loc[(df.Game == selected_game), :]
-    versions = list(selected_game_df.Version.unique())
-    versions.sort()
+    selected_game = st.selectbox("Select a game to explore.", index.games)
+    selected_version = None
+    versions = index.versions(selected_game)
     if len(versions) > 1:
-        version = st.selectbox("Select a game to explore.", versions)
-        selected_game_df = selected_game_df.loc[selected_game_df.Version == version, :]
+        selected_version = st.selectbox("Select a game to explore.", versions)
+
+    return selected_game, selected_version
+
+
+@memoize
+def game_matches(matrix: MatchData,
+                 index: MatchIndex,
+                 selected_game: str,
+                 selected_version: str = None) -> MatchMatrix:
+    """ Matches of a game, optionally of only one version of it
+
+    Parameters:
+    -----------
+
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
+
+    selected_game : str
+        The selected game
+
+    selected_version : str
+        The selected version, None for all versions of the game
+
+    Returns:
+    --------
 
-    return selected_game_df, selected_game
+    selected_matrix : MatchMatrix
+        Matches filtered by the selected game
+    """
+    return matrix.take(index.game(selected_game, selected_version))
 
 
-def plot_distribution(selected_game_df: pd.DataFrame) -> None:
+def plot_distribution(selected_matrix: MatchMatrix) -> None:
     """ Plot distribution of scores for a single board game
 
     Parameters:
     -----------
 
-    selected_game_df : pandas.core.frame.DataFrame
-        Data filtered by the selected game
+    selected_matrix : MatchMatrix
+        Matches filtered by the selected game
     """
 
-    if sum(selected_game_df.has_score.values) > 0:
+    if selected_matrix.has_score.any():
         st.header("**♟** Distribution of Scores **♟**")
         st.write("Here, you can see the distribution of all scores that were achieved in the game. ")
 
-        score_selection_df = selected_game_df.loc[:, [column for column in selected_game_df.columns
-                                                      if ('score' in column) & ('has_score' not in column)]]
-        game_scores = np.array(score_selection_df)
-        game_scores = pd.DataFrame(game_scores[game_scores.nonzero()], columns=['Scores'])
+        game_scores = selected_matrix.scores
+        counts = downsample.histogram(game_scores[game_scores.nonzero()], "Scores", name="Distribution of scores")
 
-        chart = alt.Chart(game_scores).mark_bar().encode(
+        chart = alt.Chart(counts).mark_bar().encode(
             alt.X("Scores:Q"),
-            y='count()',
+            y=alt.Y("Count:Q", title="Count of Records"),
         )
+        if (counts.Scores != counts.Scores_end).any():
+            chart = chart.encode(alt.X("Scores:Q", bin="binned"), x2="Scores_end:Q")
 
         st.altair_chart(chart)
 
 
-def show_min_max_stats(selected_game_df: pd.DataFrame,
-                       selected_game: str) -> None:
+def show_min_max_stats(cube: StatsCube,
+                       selected_game: str,
+                       selected_version: str = None) -> None:
     """ Show statistics for the worst and best players
 
     Parameters:
     -----------
 
-    selected_game_df : pandas.core.frame.DataFrame
-        Data filtered by the selected game
+    cube : StatsCube
+        Summary statistics of the scores per player, game and version
 
     selected_game : str
         The selected game
+
+    selected_version : str
+        The selected version, None for all versions of the game
     """
 
-    score_selection = selected_game_df.loc[:, [column for column in selected_game_df.columns
-                                               if ('score' in column) & ('has_score' not in column)]]
-    score_matrix = np.array(score_selection)
-
-    # Calculate average scores per player
-    averages = []
-    for column in score_selection.columns:
-        vals = score_selection[column].to_numpy()
-        average_nonzero = np.mean(vals[vals.nonzero()])
-        averages.append(average_nonzero)
-
-    if not all(np.isnan(averages)):
-        # Extract player with lowest average score
-        low_avg_player_idx = np.nanargmin(averages)
-        low_avg_player_val = averages[low_avg_player_idx]
-        low_avg_player = score_selection.columns[low_avg_player_idx].split("_")[0]
-
-        # Extract player with highest average score
-        high_avg_player_idx = np.nanargmax(averages)
-        high_avg_player_val = averages[high_avg_player_idx]
-        high_avg_player = score_selection.columns[high_avg_player_idx].split("_")[0]
-
-        # Get max score
-        max_x, max_y = np.unravel_index(np.argmax(score_matrix, axis=None), score_matrix.shape)
-        max_player = score_selection.columns[max_y].split("_")[0]
-        max_score = score_selection[score_selection.columns[max_y]].values[max_x]
-
-        # Get min score
-        min_x, min_y = np.where(
-                                score_matrix == np.min(
-                                    score_matrix[np.nonzero(score_matrix)]))  # get indices of non-zero minimum
-        min_player = score_selection.columns[min_y[0]].split("_")[0]
-        min_score = score_matrix[min_x[0]][min_y[0]]
+    extremes = cube.extremes(selected_game, selected_version)
+
+    if len(extremes) > 0:
+        max_player, max_score = extremes.loc["Highest score"]
+        high_avg_player, high_avg_player_val = extremes.loc["Highest average"]
+        min_player, min_score = extremes.loc["Lowest score"]
+        low_avg_player, low_avg_player_val = extremes.loc["Lowest average"]
 
         # Top players
         st.header("**♟** Top players **♟**")
@@ -171,26 +190,22 @@ def show_min_max_stats(selected_game_df: pd.DataFrame,
         st.write("{}🔸 Lowest average score by **{}** with {} points".format(SPACES, low_avg_player, low_avg_player_val))
 
 
-def plot_frequent_players(selected_game_df: pd.DataFrame,
-                          player_list: List[str]) -> None:
+def plot_frequent_players(selected_matrix: MatchMatrix) -> None:
     """ Show frequency of played games
 
     Parameters:
     -----------
 
-    selected_game_df : pandas.core.frame.DataFrame
-        Data filtered by the selected game
-
-    selected_game : str
-        The selected game
+    selected_matrix : MatchMatrix
+        Matches filtered by the selected game
     """
 
     st.header("**♟** Frequency of Matches **♟**")
     st.write("For each player, their total number of matches is displayed below.")
 
     # Calculate Frequencies
-    frequency = [len(selected_game_df.loc[selected_game_df[player + "_played"] == 1, :]) for player in player_list]
-    frequency = pd.DataFrame(np.array([player_list, frequency]).T, columns=['Player', 'Frequency'])
+    frequency = pd.DataFrame({'Player': selected_matrix.players,
+                              'Frequency': selected_matrix.played.sum(axis=0)}, columns=['Player', 'Frequency'])
 
     # Visualize Results
     bars = alt.Chart(frequency,
@@ -210,23 +225,31 @@ def plot_frequent_players(selected_game_df: pd.DataFrame,
     st.altair_chart(bars + text)
 
 
-def sidebar_activity_plot(selected_game_df: pd.DataFrame) -> None:
+def sidebar_activity_plot(activity: DailyActivity,
+                          game: str,
+                          version: str = None) -> None:
     """ Show frequency of played games over time
 
     Parameters:
     -----------
 
-    selected_game_df : pandas.core.frame.DataFrame
-        Data filtered by the selected game
+    activity : DailyActivity
+        Number of matches, players and matches per game of every day that was played
+
+    game : str
+        The selected game
+
+    version : str | None
+        The selected version, None if the game has a single version
     """
 
-    selected_game_df = selected_game_df.sort_values("Date").set_index("Date").resample("3D").count().reset_index()
-    chart = alt.Chart(selected_game_df).mark_area(
+    to_plot = activity.series("3D", game=game, version=version)
+    chart = alt.Chart(to_plot).mark_area(
         color='goldenrod',
         opacity=1
     ).encode(
         x='Date',
-        y=alt.Y('Players', title='Number of Games'),
+        y=alt.Y('Games', title='Number of Games'),
     ).properties(background='transparent')
 
     st.sidebar.altair_chart(chart)
@@ -1,12 +1,13 @@
 import numpy as np
-import pandas as pd
 import altair as alt
 import streamlit as st
 
+from dailyactivity import DailyActivity
+
 SPACES = '&nbsp;' * 10
 
 
-def load_page(df: pd.DataFrame) -> None:
+def load_page(activity: DailyActivity) -> None:
     """ The Data Exploration Page
 
     Sections:
@@ -19,35 +20,35 @@ def load_page(df: pd.DataFrame) -> None:
     Parameters:
     -----------
 
-    df : pandas.core.frame.DataFrame
-        The data to be used for the analyses of played board game matches.
+    activity : DailyActivity
+        Number of matches, players and matches per game of every day that was played
     """
 
     prepare_layout()
-    sidebar_activity_plot(df)
-    plot_play_count_graph(df)
-    longest_break_between_games(df)
-    most_subsequent_days_played(df)
-    most_games_on_one_day(df)
+    sidebar_activity_plot(activity)
+    plot_play_count_graph(activity)
+    longest_break_between_games(activity)
+    most_subsequent_days_played(activity)
+    most_games_on_one_day(activity)
 
 
-def sidebar_activity_plot(df: pd.DataFrame) -> None:
+def sidebar_activity_plot(activity: DailyActivity) -> None:
     """ Show the frequency of played games in the sidebar
 
     Parameters:
     -----------
 
-    df : pandas.core.frame.DataFrame
-        The data to be used for the analyses of played board game matches.
+    activity : DailyActivity
+        Number of matches, players and matches per game of every day that was played
     """
 
-    to_plot = df.sort_values("Date").set_index("Date").resample("3D").count().reset_index()
+    to_plot = activity.series("3D")
     chart = alt.Chart(to_plot).mark_area(
         color='goldenrod',
         opacity=1
     ).encode(
         x='Date',
-        y=alt.Y('Players', title='Number of Games'),
+        y=alt.Y('Games', title='Number of Games'),
     ).properties(background='transparent')
 
     st.sidebar.altair_chart(chart)
@@ -68,21 +69,21 @@ def prepare_layout() -> None:
     st.write(" ")
 
 
-def plot_play_count_graph(df: pd.DataFrame) -> None:
+def plot_play_count_graph(activity: DailyActivity) -> None:
     """ Shows how often games were played
 
     Parameters:
     -----------
 
-    df : pandas.core.frame.DataFrame
-        The data to be used for the analyses of played board game matches.
+    activity : DailyActivity
+        Number of matches, players and matches per game of every day that was played
     """
 
     st.header("**♟** Board Game Frequency **♟**")
     st.write("Below you can see the total amount of time a game has been played. I should note that these games "
              "can also be played with different number of people.")
 
-    grouped_by_game = df.groupby("Game").count().reset_index()
+    grouped_by_game = activity.game_counts().rename("Players").reset_index()
 
     order_by = st.selectbox("Order by:", ["Amount", "Name"])
     if order_by == "Amount":
@@ -113,29 +114,22 @@ def plot_play_count_graph(df: pd.DataFrame) -> None:
 
     st.write(bars + text)
 
-    average_nr_games_per_day = round(np.mean(df.groupby('Date').count().has_score), 2)
+    average_nr_games_per_day = round(np.mean(activity.table.Games), 2)
     st.write("On average {} games per day were played on days "
              "that there were board game matches".format(average_nr_games_per_day))
 
 
-def longest_break_between_games(df: pd.DataFrame) -> None:
+def longest_break_between_games(activity: DailyActivity) -> None:
     """ Extract the longest nr of days between games
 
     Parameters:
     -----------
 
-    df : pandas.core.frame.DataFrame
-        The data to be used for the analyses of played board game matches.
+    activity : DailyActivity
+        Number of matches, players and matches per game of every day that was played
     """
 
-    dates = df.groupby("Date").count().index
-    differences = [(dates[i],
-                    dates[i + 1],
-                    int((dates[i + 1] - dates[i]) / np.timedelta64(1, 'D')))
-                   for i in range(len(dates) - 1)]
-    differences = pd.DataFrame(differences, columns=['Start_date',
-                                                     'End_date',
-                                                     'Count']).sort_values('Count', ascending=False).head(5)
+    differences = activity.gaps(5)
 
     st.header("**♟** Longest Break between Games **♟**")
     st.write("The longest breaks between games were:")
@@ -147,36 +141,21 @@ def longest_break_between_games(df: pd.DataFrame) -> None:
     st.write(" ")
 
 
-def most_subsequent_days_played(df: pd.DataFrame) -> None:
+def most_subsequent_days_played(activity: DailyActivity) -> None:
     """ The largest number of subsequent days that games were played.
 
     Parameters:
     -----------
 
-    df : pandas.core.frame.DataFrame
-        The data to be used for the analyses of played board game matches.
+    activity : DailyActivity
+        Number of matches, players and matches per game of every day that was played
 
     """
 
-    count = 0
-    dates = df.Date.unique()
-    most_subsequent_days = 0
-    day_previous = ""
-    day_next = ""
-
-    for i in range(len(dates) - 1):
-        days = dates[i + 1] - dates[i]
-        days = days.astype('timedelta64[D]') / np.timedelta64(1, 'D')
-
-        if days == 1:
-            count += 1
-        else:
-            if count > most_subsequent_days:
-                most_subsequent_days = count + 1  # Needed because it counts the days between and not the actual days
-
-                day_next = str(dates[i + 1]).split("T")[0]
-                day_previous = str(dates[i + 1] - np.timedelta64(count, 'D')).split("T")[0]
-            count = 0
+    streak = activity.streaks(1)
+    most_subsequent_days = streak.Count.iloc[0] if len(streak) else 0
+    day_previous = str(streak.Start_date.iloc[0]).split(" ")[0] if len(streak) else ""
+    day_next = str(streak.End_date.iloc[0]).split(" ")[0] if len(streak) else ""
 
     st.header("**♟** Longest Chain of Games Played **♟**")
     st.write("The longest number of subsequent days we played games was:")
@@ -185,27 +164,23 @@ def most_subsequent_days_played(df: pd.DataFrame) -> None:
     st.markdown("<br>", unsafe_allow_html=True)
 
 
-def most_games_on_one_day(df: pd.DataFrame) -> None:
+def most_games_on_one_day(activity: DailyActivity) -> None:
     """ Extract when the most games have been played on one day and how many
 
     Parameters:
     -----------
 
-    df : pandas.core.frame.DataFrame
-        The data to be used for the analyses of played board game matches.
+    activity : DailyActivity
+        Number of matches, players and matches per game of every day that was played
     """
 
     # Extract on which day the most games have been played
-    grouped_date = df.groupby("Date").count()
-    most_games_idx = grouped_date.Players.to_numpy().argmax()
-    nr_games = grouped_date.Players.to_numpy().max()
-    date = str(grouped_date.index[most_games_idx]).split(" ")[0]
+    most_games_date = activity.table.Games.idxmax()
+    nr_games = activity.table.Games.max()
+    date = str(most_games_date).split(" ")[0]
 
     # Extract players in these games
-    played = [column for column in df.columns if "_played" in column]
-    played = df.loc[df.Date == date, played]
-    played_idx = np.where(played.any(axis=0))[0]
-    players = [player.split("_")[0] for player in played.columns[played_idx]]
+    players = activity.day_player_names(most_games_date)
 
     # Write results to streamlit
     st.header("**♟** Most Games Played in One Day **♟**")
@@ -4,11 +4,25 @@ import altair as alt
 import streamlit as st
 from typing import List, Tuple
 
+import downsample
+from dailyactivity import DailyActivity
+from matchindex import MatchIndex
+from matchmatrix import MatchMatrix
+from matchstore import MatchData
+from pagecache import memoize
+from pairmatrix import PairMatrix
+from rollingform import RollingForm
+
 SPACES = '&nbsp;' * 10
 
 
 def load_page(df: pd.DataFrame,
-              player_list: List[str]) -> None:
+              player_list: List[str],
+              matrix: MatchData,
+              index: MatchIndex,
+              pairs: PairMatrix,
+              activity: DailyActivity,
+              form: RollingForm) -> None:
     """ In this section you can compare two players against each other based on their respective performances.
 
     Please note that the Head to Head section is meant for games that were played with 2 players against each other.
@@ -16,6 +30,7 @@ def load_page(df: pd.DataFrame,
     Sections:
         * The Winner
         * Stats per Game
+        * League Table
 
     Parameters:
     -----------
@@ -25,20 +40,37 @@ def load_page(df: pd.DataFrame,
 
     player_list : list of str
         List of players that participated in the board games
+
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
+
+    pairs : PairMatrix
+        Two player matches played, won and tied by every pair of players
+
+    activity : DailyActivity
+        Number of matches, players and matches per game of every day that was played
+
+    form : RollingForm
+        Moving average score, win rate and form of every player in every game
     """
 
     player_one, player_two = prepare_layout(player_list)
-    two_player_matches, matches_df = check_if_two_player_matches_exist(df, player_one, player_two)
+    two_player_matches, matches_df = check_if_two_player_matches_exist(df, player_one, player_two, matrix, index)
 
     if two_player_matches:
-        sidebar_frequency_graph(matches_df)
-        extract_winner(df, player_one, player_two)
-        stats_per_game(matches_df, player_one, player_two)
+        sidebar_frequency_graph(activity, player_one, player_two)
+        extract_winner(player_one, player_two, pairs)
+        stats_per_game(matches_df, player_one, player_two, matrix, index, form)
     else:
         st.header("🏳️ Error")
         st.write("No two player matches were played with **{}** and **{}**. "
                  "Please select different players".format(player_one, player_two))
 
+    league_table(pairs)
+
 
 def prepare_layout(player_list: List[str]) -> Tuple[str, str]:
     """ Create the layout for the page including general selection options
@@ -62,9 +94,12 @@ def prepare_layout(player_list: List[str]) -> Tuple[str, str]:
     return player_one, player_two
 
 
+@memoize
 def check_if_two_player_matches_exist(df: pd.DataFrame,
                                       player_one: str,
-                                      player_two: str) -> Tuple[bool, pd.DataFrame]:
+                                      player_two: str,
+                                      matrix: MatchData,
+                                      index: MatchIndex) -> Tuple[bool, pd.DataFrame]:
     """ Checks if player_one and player_two have played against each other in two player games
 
 
@@ -80,6 +115,12 @@ def check_if_two_player_matches_exist(df: pd.DataFrame,
     player_two : str
         One of the players in the game
 
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
+
     Returns:
     --------
 
@@ -91,9 +132,8 @@ def check_if_two_player_matches_exist(df: pd.DataFrame,
         Data with only the two players selected and where two player games have been played
     """
 
-    matches_df = df.loc[(df[player_one + "_played"] == 1) &
-                        (df[player_two + "_played"] == 1) &
-                        (df["Nr_players"] == 2), :]
+    rows = index.pair(player_one, player_two)
+    matches_df = df.iloc[rows[matrix.nr_players[rows] == 2]]
 
     if (len(matches_df) == 0) | (player_one == player_two):
         return False, matches_df
@@ -101,68 +141,71 @@ def check_if_two_player_matches_exist(df: pd.DataFrame,
         return True, matches_df
 
 
-def sidebar_frequency_graph(matches_df: pd.DataFrame) -> None:
+def sidebar_frequency_graph(activity: DailyActivity,
+                            player_one: str,
+                            player_two: str) -> None:
     """ Extracts and visualizes the frequency of games
 
     Parameters:
     -----------
 
-    matches_df: pandas.core.frame.DataFrame
-        Data with only the two players selected and where two player games have been played
+    activity : DailyActivity
+        Number of matches, players and matches per game of every day that was played
+
+    player_one : str
+        One of the players in the game
+
+    player_two : str
+        One of the players in the game
     """
 
-    to_plot = matches_df.sort_values("Date").set_index("Date").resample("3D").count().reset_index()
+    to_plot = activity.series("3D", pair=(player_one, player_two))
     chart = alt.Chart(to_plot).mark_area(
         color='goldenrod',
         opacity=1
     ).encode(
         x='Date',
-        y=alt.Y('Players', title='Number of Games'),
+        y=alt.Y('Games', title='Number of Games'),
     ).properties(background='transparent')
 
     if len(to_plot) > 0:
         st.sidebar.altair_chart(chart)
 
 
-def extract_winner(df: pd.DataFrame,
-                   player_one: str,
-                   player_two: str) -> None:
+def extract_winner(player_one: str,
+                   player_two: str,
+                   pairs: PairMatrix) -> None:
     """ Extract the winner of the two players
 
     Parameters:
     -----------
 
-    df : pandas.core.frame.DataFrame
-        The data to be used for the analyses of played board game matches.
-
     player_one : str
         One of the players in the game
 
     player_two : str
         One of the players in the game
+
+    pairs : PairMatrix
+        Two player matches played, won and tied by every pair of players
     """
 
-    # Extract common games
-    games = df.loc[(df[player_one + "_played"] == 1) &
-                   (df[player_two + "_played"] == 1) &
-                   (df["Nr_players"] == 2), :]
-    player_one_won = len(games[games[player_one + "_winner"] == 1])
-    player_two_won = len(games[games[player_two + "_winner"] == 1])
+    nr_games, player_one_won, player_two_won, _ = pairs.record(player_one, player_two)
     to_plot = pd.DataFrame([[player_one_won, player_one],
                             [player_two_won, player_two]], columns=['Results', 'Player'])
 
     if player_one_won != player_two_won:
         if player_one_won > player_two_won:
-            percentage = round(player_one_won / len(games) * 100, 2)
+            percentage = round(player_one_won / nr_games * 100, 2)
             winner = player_one
         else:
-            percentage = round(player_two_won / len(games) * 100, 2)
+            percentage = round(player_two_won / nr_games * 100, 2)
             winner = player_two
 
         st.header("**♟** The Winner - {}**♟**".format(winner))
         st.write("The winner is decided simply by the amount of games won one by either player.")
         st.write("{}🔹 Out of {} games, {} games were won by **{}** "
-                 "whereas {} games were won by **{}**".format(SPACES, len(games), player_one_won, player_one,
+                 "whereas {} games were won by **{}**".format(SPACES, nr_games, player_one_won, player_one,
                                                               player_two_won, player_two))
 
         st.write("{}🔹 In other words, {}% of games were won by **{}** who is the clear winner!".format(SPACES,
@@ -173,7 +216,7 @@ def extract_winner(df: pd.DataFrame,
         st.header("**♟** The Winners - {}**♟**".format(winner))
         st.write("The winner is decided simply by the amount of games won one by either player.")
         st.write("{}🔹 Out of {} games, {} games were won by **{}** "
-                 "whereas {} games were won by **{}**".format(SPACES, len(games), player_one_won, player_one,
+                 "whereas {} games were won by **{}**".format(SPACES, nr_games, player_one_won, player_one,
                                                               player_two_won, player_two))
         st.write("{}🔹 In other words, it is a **tie**!".format(SPACES))
 
@@ -196,7 +239,10 @@ def extract_winner(df: pd.DataFrame,
 
 def stats_per_game(matches_df: pd.DataFrame,
                    player_one: str,
-                   player_two: str) -> None:
+                   player_two: str,
+                   matrix: MatchData,
+                   index: MatchIndex,
+                   form: RollingForm) -> None:
     """ Show statistics per game
 
 
@@ -211,17 +257,28 @@ def stats_per_game(matches_df: pd.DataFrame,
 
     player_two : str
         One of the players in the game
+
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
+
+    form : RollingForm
+        Moving average score, win rate and form of every player in every game
     """
 
     st.header("**♟** Stats per Game **♟**")
     st.write("Please select a game below to see the statistics for both players.")
-    game_selection_df = game_selection(matches_df)
-    scores_over_time(player_one, player_two, game_selection_df)
-    general_stats_game(player_one, player_two, game_selection_df)
+    selected_game = game_selection(matches_df)
+    game_matrix = pair_game_matches(matrix, index, player_one, player_two, selected_game)
+    scores_over_time(player_one, player_two, game_matrix)
+    general_stats_game(player_one, player_two, game_matrix)
+    recent_form(player_one, player_two, selected_game, form)
 
 
-def game_selection(matches_df: pd.DataFrame) -> pd.DataFrame:
-    """ Select game and filter data based on the game
+def game_selection(matches_df: pd.DataFrame) -> str:
+    """ Select a game of the matches between the players
 
     Parameters:
     -----------
@@ -232,20 +289,54 @@ def game_selection(matches_df: pd.DataFrame) -> pd.DataFrame:
     Returns:
     --------
 
-    game_selection_df : pandas.core.frame.DataFrame
-        Filtered data based on the selected game
+    game : str
+        The selected game
 
     """
     games = list(matches_df.Game.unique())
     games.sort()
-    game = st.selectbox("Select a game", games)
-    game_selection_df = matches_df.loc[(matches_df.Game == game), :]
-    return game_selection_df
+    return st.selectbox("Select a game", games)
+
+
+@memoize
+def pair_game_matches(matrix: MatchData,
+                      index: MatchIndex,
+                      player_one: str,
+                      player_two: str,
+                      game: str) -> MatchMatrix:
+    """ Two player matches of a game between two players
+
+    Parameters:
+    -----------
+
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
+
+    player_one : str
+        One of the players in the game
+
+    player_two : str
+        One of the players in the game
+
+    game : str
+        The selected game
+
+    Returns:
+    --------
+
+    game_matrix : MatchMatrix
+        Matches of the selected game
+    """
+    rows = index.intersect(index.pair(player_one, player_two), index.game(game))
+    return matrix.take(rows[matrix.nr_players[rows] == 2], players=[player_one, player_two])
 
 
 def scores_over_time(player_one: str,
                      player_two: str,
-                     game_selection_df: pd.DataFrame) -> None:
+                     game_matrix: MatchMatrix) -> None:
     """ Visualize scores over time for a specific game for two players
 
     Parameters:
@@ -257,12 +348,12 @@ def scores_over_time(player_one: str,
     player_two : str
         One of the players in the game
 
-    game_selection_df : pandas.core.frame.DataFrame
-        Filtered data based on the selected game
+    game_matrix : MatchMatrix
+        Matches of the selected game
     """
 
-    player_one_vals = list(game_selection_df[player_one + '_score'].values)
-    player_two_vals = list(game_selection_df[player_two + '_score'].values)
+    player_one_vals = list(game_matrix.player_scores(player_one))
+    player_two_vals = list(game_matrix.player_scores(player_two))
     vals = player_one_vals + player_two_vals
     player_indices = [player_one if i < len(player_one_vals) else player_two for i, _ in enumerate(vals)]
     indices = list(np.arange(len(vals) / 2))
@@ -271,6 +362,8 @@ def scores_over_time(player_one: str,
     to_plot = pd.DataFrame(np.array([indices, vals, player_indices]).T, columns=['Indices', 'Scores', 'Players'])
     to_plot.Indices = to_plot.Indices.astype(float)
     to_plot.Scores = to_plot.Scores.astype(float)
+    to_plot = downsample.downsample_lines(to_plot, x="Indices", y="Scores", series="Players",
+                                          name="Head to head scores over time")
 
     st.write("Here you can see how games have progressed since the beginning. There is purposefully"
              " no time displayed as that might clutter the visualization. All scores on the left hand side"
@@ -291,7 +384,7 @@ def scores_over_time(player_one: str,
 
 def general_stats_game(player_one: str,
                        player_two: str,
-                       game_selection_df: pd.DataFrame) -> None:
+                       game_matrix: MatchMatrix) -> None:
     """ Show general statistics of a specific game for two players
 
     Parameters:
@@ -303,16 +396,15 @@ def general_stats_game(player_one: str,
     player_two : str
         One of the players in the game
 
-    game_selection_df : pandas.core.frame.DataFrame
-        Filtered data based on the selected game
+    game_matrix : MatchMatrix
+        Matches of the selected game
     """
 
-    result = pd.DataFrame(columns=['Player', 'Avg', 'Min', 'Max', 'Number'])
-
+    result = []
     for player in [player_one, player_two]:
-        values = game_selection_df.loc[(game_selection_df[player + "_played"] == 1), player + "_score"].values
-        result.loc[len(result), :] = [player, round(np.mean(values)), min(values),
-                                      max(values), len(values)]
+        values = game_matrix.player_scores(player)[game_matrix.player_played(player)]
+        result.append([player, round(np.mean(values)), values.min(), values.max(), len(values)])
+    result = pd.DataFrame(result, columns=['Player', 'Avg', 'Min', 'Max', 'Number'])
 
     st.write("You can see the average statistics for each player such that comparison is possible.")
     bars = alt.Chart(result).mark_bar().encode(
@@ -332,3 +424,70 @@ def general_stats_game(player_one: str,
     )
 
     st.write(bars + text)
+
+
+def recent_form(player_one: str,
+                player_two: str,
+                selected_game: str,
+                form: RollingForm) -> None:
+    """ Show the form of both players in their last matches of a game
+
+    Parameters:
+    -----------
+
+    player_one : str
+        One of the players in the game
+
+    player_two : str
+        One of the players in the game
+
+    selected_game : str
+        The selected game
+
+    form : RollingForm
+        Moving average score, win rate and form of every player in every game
+    """
+
+    result = pd.DataFrame([form.current(player, selected_game) for player in [player_one, player_two]],
+                          index=pd.Index([player_one, player_two], name="Player"))
+    result["Win rate"] = result["Win rate"] * 100
+    if result.Average.isna().all():
+        return
+
+    st.write("Below is the form of both players over their last {} matches of this game against anyone: "
+             "the average score, the percentage of matches won and how much the average "
+             "is above or below their usual average.".format(form.window))
+    st.table(result.round(1))
+
+
+def league_table(pairs: PairMatrix) -> None:
+    """ Show the results of all players in two player matches
+
+    Parameters:
+    -----------
+
+    pairs : PairMatrix
+        Two player matches played, won and tied by every pair of players
+    """
+
+    table = pairs.league_table()
+    if len(table) == 0:
+        return
+
+    st.header("**♟** League Table **♟**")
+    st.write("The results of all players in two player matches, sorted by the percentage of matches won. "
+             "Ties are counted separately.")
+    st.table(table)
+
+    # Only compare the most active players to keep the chart readable
+    players = list(table.sort_values("Played", ascending=False).Player[:20])
+    percentages = pairs.win_percentages(players)
+    st.write("Below you can see, for the {} most active players, the percentage of two player "
+             "matches each player won against each opponent.".format(len(players)))
+    chart = alt.Chart(percentages, title="Win % against each opponent").mark_rect().encode(
+        x=alt.X('Opponent:O', sort=players),
+        y=alt.Y('Player:O', sort=players),
+        color=alt.Color('Win %:Q', scale=alt.Scale(domain=(0, 100), scheme='tealblues')),
+        tooltip=['Player', 'Opponent', 'Played', 'Win %']
+    )
+    st.altair_chart(chart)
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+from functools import reduce
+from typing import Dict, List, Tuple
+
+from matchmatrix import freeze_array
+from matchstore import MatchData, MatchStore, _offsets
+
+
+class MatchIndex:
+    """ Posting lists of the matches per player, game, game and version, and pair of players
+
+    Every posting list is a sorted array of the row positions of the matches,
+    which can directly be used with `df.iloc` and `MatchMatrix.take`. It is built
+    once after loading such that pages look up their matches in time proportional
+    to the number of matches found instead of comparing every row of the data.
+
+    The posting lists of players and pairs are stored as CSR arrays:
+    `player_rows[player_offsets[j]:player_offsets[j+1]]` are the matches of player j
+    and `pair_rows[pair_offsets[i]:pair_offsets[i+1]]` the matches of the pair
+    `pair_keys[i]`, a key of the two player ids (see `pair_key`).
+
+    Attributes:
+    -----------
+
+    players : list of str
+        Sorted list of players
+
+    player_index : dict
+        Mapping of player to player id
+
+    games : list of str
+        Sorted list of games
+
+    game_rows : dict
+        Mapping of game to its matches
+
+    version_rows : dict
+        Mapping of (game, version) to its matches
+
+    game_versions : dict
+        Mapping of game to its sorted versions
+
+    player_rows, player_offsets : numpy.ndarray of int64
+        Matches per player in CSR format
+
+    pair_keys, pair_rows, pair_offsets : numpy.ndarray of int64
+        Matches per pair of players that played in the same match in CSR format
+    """
+
+    def __init__(self,
+                 players: List[str],
+                 match_ids: np.ndarray,
+                 player_ids: np.ndarray,
+                 games: np.ndarray,
+                 versions: np.ndarray):
+        self.players = list(players)
+        self.player_index = {player: idx for idx, player in enumerate(self.players)}
+        match_ids = np.asarray(match_ids, dtype=np.int64)
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+
+        info = pd.DataFrame({"Game": games, "Version": versions})
+        self.game_rows = _freeze_rows(info.groupby("Game", sort=True).indices)
+        self.version_rows = _freeze_rows(info.groupby(["Game", "Version"], sort=True).indices)
+        self.games = sorted(self.game_rows)
+        self.game_versions = {game: [] for game in self.games}
+        for game, version in sorted(self.version_rows):
+            self.game_versions[game].append(version)
+
+        # Group the matches per player
+        order = np.lexsort((match_ids, player_ids))
+        self.player_rows = freeze_array(match_ids[order], np.int64)
+        self.player_offsets = freeze_array(_offsets(player_ids[order], len(self.players)), np.int64)
+
+        # Pair every player with the players after it in the same match
+        order = np.lexsort((player_ids, match_ids))
+        match_ids, player_ids = match_ids[order], player_ids[order]
+        keys, rows = [], []
+        for distance in range(1, len(match_ids)):
+            same_match = match_ids[distance:] == match_ids[:-distance]
+            if not same_match.any():
+                break
+            keys.append(self.pair_key(player_ids[:-distance][same_match], player_ids[distance:][same_match]))
+            rows.append(match_ids[distance:][same_match])
+
+        keys = np.concatenate(keys) if keys else np.array([], dtype=np.int64)
+        rows = np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+        order = np.lexsort((rows, keys))
+        pair_keys, starts = np.unique(keys[order], return_index=True)
+        self.pair_keys = freeze_array(pair_keys, np.int64)
+        self.pair_rows = freeze_array(rows[order], np.int64)
+        self.pair_offsets = freeze_array(np.append(starts, len(rows)), np.int64)
+
+    @classmethod
+    def from_data(cls, matrix: MatchData) -> "MatchIndex":
+        """ Create the index from a MatchMatrix or MatchStore
+
+        Parameters:
+        -----------
+
+        matrix : MatchMatrix | MatchStore
+            Scores, winners and players per match
+
+        Returns:
+        --------
+
+        index : MatchIndex
+        """
+        if isinstance(matrix, MatchStore):
+            match_ids, player_ids = matrix.match_ids[matrix.played], matrix.player_ids[matrix.played]
+        else:
+            match_ids, player_ids = np.nonzero(matrix.played)
+
+        return cls(players=matrix.players,
+                   match_ids=match_ids,
+                   player_ids=player_ids,
+                   games=matrix.games,
+                   versions=matrix.versions)
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes used by the posting lists """
+        arrays = [self.player_rows, self.player_offsets, self.pair_keys, self.pair_rows, self.pair_offsets]
+        arrays += list(self.game_rows.values()) + list(self.version_rows.values())
+        return sum(values.nbytes for values in arrays)
+
+    def pair_key(self, player_one_ids: np.ndarray, player_two_ids: np.ndarray) -> np.ndarray:
+        """ Key of unordered pairs of player ids """
+        low, high = np.minimum(player_one_ids, player_two_ids), np.maximum(player_one_ids, player_two_ids)
+        return low * len(self.players) + high
+
+    def player(self, player: str) -> np.ndarray:
+        """ Matches played by a player """
+        if player not in self.player_index:
+            return np.array([], dtype=np.int64)
+        idx = self.player_index[player]
+        return self.player_rows[self.player_offsets[idx]:self.player_offsets[idx + 1]]
+
+    def pair(self, player_one: str, player_two: str) -> np.ndarray:
+        """ Matches in which both players played """
+        if player_one == player_two:
+            return self.player(player_one)
+        if player_one not in self.player_index or player_two not in self.player_index:
+            return np.array([], dtype=np.int64)
+
+        key = self.pair_key(self.player_index[player_one], self.player_index[player_two])
+        idx = np.searchsorted(self.pair_keys, key)
+        if idx == len(self.pair_keys) or self.pair_keys[idx] != key:
+            return np.array([], dtype=np.int64)
+        return self.pair_rows[self.pair_offsets[idx]:self.pair_offsets[idx + 1]]
+
+    def game(self, game: str, version: str = None) -> np.ndarray:
+        """ Matches of a game, optionally of only one version of it """
+        rows = self.game_rows if version is None else self.version_rows
+        return rows.get(game if version is None else (game, version), np.array([], dtype=np.int64))
+
+    def versions(self, game: str) -> List[str]:
+        """ Sorted versions of a game """
+        return self.game_versions.get(game, [])
+
+    @staticmethod
+    def intersect(*rows: np.ndarray) -> np.ndarray:
+        """ Matches that are in all of the given posting lists """
+        return reduce(lambda left, right: np.intersect1d(left, right, assume_unique=True),
+                      [np.asarray(values, dtype=np.int64) for values in rows])
+
+
+def _freeze_rows(rows: Dict[Tuple, np.ndarray]) -> Dict[Tuple, np.ndarray]:
+    """ Make the posting lists of a groupby read-only """
+    return {key: freeze_array(values, np.int64) for key, values in rows.items()}
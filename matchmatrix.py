@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+from typing import List
+
+
+class MatchMatrix:
+    """ Dense representation of all played board game matches
+
+    Instead of searching for columns such as "Peter_score" in the preprocessed
+    DataFrame, each statistic is stored as a contiguous matrix of shape
+    (matches, players). A player can be found through `player_index` and
+    the rows are aligned with the positions of the preprocessed DataFrame.
+
+    All arrays are read-only such that pages can safely take views of
+    them without copying.
+
+    Attributes:
+    -----------
+
+    players : list of str
+        Sorted list of players, one for each column of the matrices
+
+    player_index : dict
+        Mapping of player to column index
+
+    scores : numpy.ndarray of int32
+        Score of each player per match, 0 if no score was registered
+
+    won : numpy.ndarray of bool
+        Whether a player won a match
+
+    played : numpy.ndarray of bool
+        Whether a player played in a match
+
+    dates, games, versions : numpy.ndarray
+        Date, Game and Version of each match
+
+    nr_players : numpy.ndarray of int32
+        Number of players per match
+
+    has_score, has_winner : numpy.ndarray of bool
+        Whether a match has at least one (nonzero, possibly negative) score or winner
+    """
+
+    def __init__(self,
+                 players: List[str],
+                 scores: np.ndarray,
+                 won: np.ndarray,
+                 played: np.ndarray,
+                 dates: np.ndarray,
+                 games: np.ndarray,
+                 versions: np.ndarray,
+                 nr_players: np.ndarray):
+        self.players = list(players)
+        self.player_index = {player: idx for idx, player in enumerate(self.players)}
+
+        self.scores = freeze_array(scores, np.int32)
+        self.won = freeze_array(won, bool)
+        self.played = freeze_array(played, bool)
+        self.dates = freeze_array(dates, "datetime64[ns]")
+        self.games = freeze_array(games, object)
+        self.versions = freeze_array(versions, object)
+        self.nr_players = freeze_array(nr_players, np.int32)
+
+        self.has_score = freeze_array((self.scores != 0).any(axis=1), bool)
+        self.has_winner = freeze_array(self.won.any(axis=1), bool)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, player_list: List[str]) -> "MatchMatrix":
+        """ Create the matrices from the output of preprocessing.prepare_data
+
+        Parameters:
+        -----------
+
+        df : pandas.core.frame.DataFrame
+            The preprocessed data of played board game matches
+
+        player_list : list of str
+            List of players
+
+        Returns:
+        --------
+
+        matrix : MatchMatrix
+        """
+        return cls(players=player_list,
+                   scores=df[[player + "_score" for player in player_list]].to_numpy(),
+                   won=df[[player + "_winner" for player in player_list]].to_numpy(),
+                   played=df[[player + "_played" for player in player_list]].to_numpy(),
+                   dates=df.Date.to_numpy(),
+                   games=df.Game.to_numpy(),
+                   versions=df.Version.to_numpy(),
+                   nr_players=df.Nr_players.to_numpy())
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes used by the arrays of the matrix """
+        return sum(values.nbytes for values in vars(self).values() if isinstance(values, np.ndarray))
+
+    def column(self, player: str) -> int:
+        """ Column index of a player """
+        return self.player_index[player]
+
+    def player_scores(self, player: str) -> np.ndarray:
+        """ View on the scores of a single player """
+        return self.scores[:, self.player_index[player]]
+
+    def player_won(self, player: str) -> np.ndarray:
+        """ View on whether a single player won """
+        return self.won[:, self.player_index[player]]
+
+    def player_played(self, player: str) -> np.ndarray:
+        """ View on whether a single player played """
+        return self.played[:, self.player_index[player]]
+
+    def take(self, rows: np.ndarray, players: List[str] = None) -> "MatchMatrix":
+        """ Select a subset of matches
+
+        Parameters:
+        -----------
+
+        rows : numpy.ndarray
+            Row positions or a boolean mask of the matches to select.
+            A pandas index of the preprocessed data can also be used
+            as its labels correspond to the row positions.
+
+        players : list of str
+            Players that are looked up in the selected matches, see `MatchStore.take`.
+            All players are kept in a MatchMatrix.
+
+        Returns:
+        --------
+
+        matrix : MatchMatrix
+            The selected matches
+        """
+        rows = np.asarray(rows)
+        return MatchMatrix(players=self.players,
+                           scores=self.scores[rows],
+                           won=self.won[rows],
+                           played=self.played[rows],
+                           dates=self.dates[rows],
+                           games=self.games[rows],
+                           versions=self.versions[rows],
+                           nr_players=self.nr_players[rows])
+
+
+def freeze_array(values: np.ndarray, dtype) -> np.ndarray:
+    """ Copy into a contiguous array of the given dtype and make it read-only
+
+    A copy is always made such that the arrays of the source (e.g., a DataFrame)
+    are not made read-only as well.
+    """
+    values = np.array(values, dtype=dtype, order="C")
+    values.setflags(write=False)
+    return values
@@ -0,0 +1,285 @@
+import numpy as np
+import pandas as pd
+from typing import List, Union
+
+from matchmatrix import MatchMatrix, freeze_array
+
+
+class MatchStore:
+    """ Sparse representation of all played board game matches
+
+    Whereas MatchMatrix stores a value for every match x player, MatchStore
+    only keeps a record for each player that participated in, scored or won a
+    match. Memory therefore scales with the number of participations which is
+    typically 2-4 per match regardless of how many distinct players there are.
+
+    The records are sorted by match such that `match_offsets[i]:match_offsets[i+1]`
+    are the records of match i (CSR). `player_order[player_offsets[j]:player_offsets[j+1]]`
+    are the records of player j, in order of the matches.
+
+    It exposes the same per-player accessors and `take` as MatchMatrix such that
+    pages can run on either of them. `take` returns a (small) dense MatchMatrix of
+    the selected matches.
+
+    Attributes:
+    -----------
+
+    players : list of str
+        Sorted list of players
+
+    player_index : dict
+        Mapping of player to player id
+
+    match_ids, player_ids : numpy.ndarray of int32
+        The match and player of each record
+
+    scores : numpy.ndarray of int32
+        Score of each record, 0 if no score was registered
+
+    won, played : numpy.ndarray of bool
+        Whether the player of a record won or played the match
+
+    match_offsets, player_offsets : numpy.ndarray of int64
+        Offsets of the records per match and per player
+
+    player_order : numpy.ndarray of int64
+        Record indices sorted by player
+
+    dates, games, versions, nr_players, has_score, has_winner : numpy.ndarray
+        Information per match, see MatchMatrix
+    """
+
+    def __init__(self,
+                 players: List[str],
+                 match_ids: np.ndarray,
+                 player_ids: np.ndarray,
+                 scores: np.ndarray,
+                 won: np.ndarray,
+                 played: np.ndarray,
+                 dates: np.ndarray,
+                 games: np.ndarray,
+                 versions: np.ndarray,
+                 nr_players: np.ndarray):
+        self.players = list(players)
+        self.player_index = {player: idx for idx, player in enumerate(self.players)}
+        nr_matches = len(dates)
+
+        # Sort records by match and player
+        order = np.lexsort((player_ids, match_ids))
+        self.match_ids = freeze_array(np.asarray(match_ids)[order], np.int32)
+        self.player_ids = freeze_array(np.asarray(player_ids)[order], np.int32)
+        self.scores = freeze_array(np.asarray(scores)[order], np.int32)
+        self.won = freeze_array(np.asarray(won)[order], bool)
+        self.played = freeze_array(np.asarray(played)[order], bool)
+
+        self.match_offsets = freeze_array(_offsets(self.match_ids, nr_matches), np.int64)
+        self.player_order = freeze_array(np.argsort(self.player_ids, kind="mergesort"), np.int64)
+        self.player_offsets = freeze_array(_offsets(self.player_ids, len(self.players)), np.int64)
+
+        self.dates = freeze_array(dates, "datetime64[ns]")
+        self.games = freeze_array(games, object)
+        self.versions = freeze_array(versions, object)
+        self.nr_players = freeze_array(nr_players, np.int32)
+
+        self.has_score = freeze_array(np.bincount(self.match_ids, weights=self.scores != 0, minlength=nr_matches) > 0, bool)
+        self.has_winner = freeze_array(np.bincount(self.match_ids, weights=self.won, minlength=nr_matches) > 0, bool)
+
+    @classmethod
+    def from_records(cls,
+                     players: List[str],
+                     dates: np.ndarray,
+                     games: np.ndarray,
+                     versions: np.ndarray,
+                     nr_players: np.ndarray,
+                     score_records: pd.DataFrame,
+                     winner_records: pd.DataFrame,
+                     played_records: pd.DataFrame) -> "MatchStore":
+        """ Create the store from records of (Row, Player) as created in preprocessing
+
+        Parameters:
+        -----------
+
+        players : list of str
+            List of players, records of other players are ignored
+
+        dates, games, versions, nr_players : numpy.ndarray
+            Information per match
+
+        score_records : pandas.core.frame.DataFrame
+            Records with a Row, Player and Score
+
+        winner_records, played_records : pandas.core.frame.DataFrame
+            Records with a Row and Player
+
+        Returns:
+        --------
+
+        store : MatchStore
+        """
+        winner_records = winner_records.assign(Won=True)
+        played_records = played_records.assign(Played=True)
+        records = (score_records.loc[:, ["Row", "Player", "Score"]]
+                   .merge(winner_records, on=["Row", "Player"], how="outer")
+                   .merge(played_records, on=["Row", "Player"], how="outer"))
+
+        player_ids = records.Player.map(pd.Series(np.arange(len(players)), index=players))
+        records = records.loc[player_ids.notnull(), :]
+
+        return cls(players=players,
+                   match_ids=records.Row.to_numpy(),
+                   player_ids=player_ids[player_ids.notnull()].to_numpy().astype(int),
+                   scores=records.Score.fillna(0).to_numpy(),
+                   won=records.Won.fillna(False).to_numpy(),
+                   played=records.Played.fillna(False).to_numpy(),
+                   dates=dates,
+                   games=games,
+                   versions=versions,
+                   nr_players=nr_players)
+
+    @classmethod
+    def from_matrix(cls, matrix: MatchMatrix) -> "MatchStore":
+        """ Convert a dense MatchMatrix into a sparse MatchStore """
+        match_ids, player_ids = np.nonzero((matrix.scores != 0) | matrix.won | matrix.played)
+        return cls(players=matrix.players,
+                   match_ids=match_ids,
+                   player_ids=player_ids,
+                   scores=matrix.scores[match_ids, player_ids],
+                   won=matrix.won[match_ids, player_ids],
+                   played=matrix.played[match_ids, player_ids],
+                   dates=matrix.dates,
+                   games=matrix.games,
+                   versions=matrix.versions,
+                   nr_players=matrix.nr_players)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def append(self, other: "MatchStore") -> "MatchStore":
+        """ Append the matches of another store, for example newly played matches
+
+        Parameters:
+        -----------
+
+        other : MatchStore
+            The matches to append after the matches of this store
+
+        Returns:
+        --------
+
+        store : MatchStore
+            All matches with the players of both stores
+        """
+        players = sorted(set(self.players) | set(other.players))
+        player_index = {player: idx for idx, player in enumerate(players)}
+        own_ids = np.array([player_index[player] for player in self.players], dtype=np.int32)
+        other_ids = np.array([player_index[player] for player in other.players], dtype=np.int32)
+
+        return MatchStore(players=players,
+                          match_ids=np.concatenate([self.match_ids, other.match_ids + len(self)]),
+                          player_ids=np.concatenate([own_ids[self.player_ids], other_ids[other.player_ids]]),
+                          scores=np.concatenate([self.scores, other.scores]),
+                          won=np.concatenate([self.won, other.won]),
+                          played=np.concatenate([self.played, other.played]),
+                          dates=np.concatenate([self.dates, other.dates]),
+                          games=np.concatenate([self.games, other.games]),
+                          versions=np.concatenate([self.versions, other.versions]),
+                          nr_players=np.concatenate([self.nr_players, other.nr_players]))
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes used by the arrays of the store """
+        return sum(values.nbytes for values in vars(self).values() if isinstance(values, np.ndarray))
+
+    def column(self, player: str) -> int:
+        """ Player id of a player """
+        return self.player_index[player]
+
+    def player_records(self, player: str) -> np.ndarray:
+        """ Indices of the records of a player, in order of the matches """
+        idx = self.player_index[player]
+        return self.player_order[self.player_offsets[idx]:self.player_offsets[idx + 1]]
+
+    def player_scores(self, player: str) -> np.ndarray:
+        """ Scores of a single player for every match """
+        return self._player_values(player, self.scores)
+
+    def player_won(self, player: str) -> np.ndarray:
+        """ Whether a single player won for every match """
+        return self._player_values(player, self.won)
+
+    def player_played(self, player: str) -> np.ndarray:
+        """ Whether a single player played for every match """
+        return self._player_values(player, self.played)
+
+    def take(self, rows: np.ndarray, players: List[str] = None) -> MatchMatrix:
+        """ Select a subset of matches as a dense MatchMatrix
+
+        Only the players that played in the selected matches get a column, such
+        that selecting the matches of a game or player stays small when there are
+        many players.
+
+        Parameters:
+        -----------
+
+        rows : numpy.ndarray
+            Row positions or a boolean mask of the matches to select.
+            A pandas index of the preprocessed data can also be used
+            as its labels correspond to the row positions.
+
+        players : list of str
+            Players that also get a column if they did not play in the selected
+            matches, such as the player whose matches were selected
+
+        Returns:
+        --------
+
+        matrix : MatchMatrix
+            The selected matches
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+
+        # Gather the records of all selected matches
+        starts = self.match_offsets[rows]
+        lengths = self.match_offsets[rows + 1] - starts
+        local_rows = np.repeat(np.arange(len(rows)), lengths)
+        records = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+        # Columns of only the players in the selected matches and the requested players
+        kept = np.array([self.player_index[player] for player in players or [] if player in self.player_index],
+                        dtype=np.int64)
+        columns, local_players = np.unique(np.concatenate([self.player_ids[records].astype(np.int64), kept]),
+                                           return_inverse=True)
+        local_players = local_players.ravel()[:len(records)]
+
+        shape = (len(rows), len(columns))
+        scores, won, played = np.zeros(shape, np.int32), np.zeros(shape, bool), np.zeros(shape, bool)
+        scores[local_rows, local_players] = self.scores[records]
+        won[local_rows, local_players] = self.won[records]
+        played[local_rows, local_players] = self.played[records]
+
+        return MatchMatrix(players=[self.players[column] for column in columns],
+                           scores=scores,
+                           won=won,
+                           played=played,
+                           dates=self.dates[rows],
+                           games=self.games[rows],
+                           versions=self.versions[rows],
+                           nr_players=self.nr_players[rows])
+
+    def _player_values(self, player: str, values: np.ndarray) -> np.ndarray:
+        """ Scatter the values of a player's records into an array over all matches """
+        records = self.player_records(player)
+        result = np.zeros(len(self), dtype=values.dtype)
+        result[self.match_ids[records]] = values[records]
+        return result
+
+
+def _offsets(ids: np.ndarray, size: int) -> np.ndarray:
+    """ CSR offsets of the records per id, i.e. where each id starts after sorting """
+    return np.concatenate([[0], np.cumsum(np.bincount(ids, minlength=size))])
+
+
+# Pages can run on both the dense and sparse representation
+MatchData = Union[MatchMatrix, MatchStore]
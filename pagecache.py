@@ -0,0 +1,218 @@
+""" Bounded in-memory memoization of the computations of the pages
+
+Streamlit reruns a page on every change of a widget. Functions decorated with
+`memoize` return their previous result when they are called again with the
+same loaded data and the same selections, for example when switching back to a
+player or game that was already shown.
+
+Results are keyed by the name of the function and its arguments. Strings,
+numbers and other hashable values (the widget selections) are used as they are.
+The loaded data (DataFrames, MatchMatrix, MatchIndex, ...) is never hashed: it is
+read-only, so each object is given a fingerprint once, by identity, and the
+results of an object are dropped when it is garbage collected.
+
+The cache is bounded by the total number of bytes of the results, after which
+the least recently used results are removed, and optionally by the age of the
+results. The counters of hits, misses and evictions are available with
+`PAGE_CACHE.stats()`.
+"""
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+import pandas as pd
+
+MAX_MEMO_BYTES = int(os.environ.get("BOARDGAME_MEMO_BYTES", 64 * 1024 ** 2))
+MEMO_TTL = float(os.environ.get("BOARDGAME_MEMO_TTL", 0)) or None
+
+
+class PageCache:
+    """ Least recently used cache of results with a budget of bytes
+
+    Parameters:
+    -----------
+
+    max_bytes : int
+        Maximum number of bytes of all results together
+
+    ttl : float | None
+        Number of seconds after which a result is computed again, never if None
+    """
+
+    def __init__(self, max_bytes: int = MAX_MEMO_BYTES, ttl: float = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        self._counter = itertools.count()
+        self._collected = []
+
+    def get(self, key: Hashable) -> Any:
+        """ The result of a key, raises KeyError if it is not (or no longer) cached """
+        with self._lock:
+            self._forget_collected()
+            if key in self.entries:
+                value, nbytes, created = self.entries[key]
+                if self.ttl is None or time.monotonic() - created < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+                self.evictions += 1
+            self.misses += 1
+        raise KeyError(key)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """ Cache a result and evict the least recently used results over the budget """
+        nbytes = _nbytes(value)
+        with self._lock:
+            self._forget_collected()
+            if key in self.entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                return
+            self.entries[key] = (value, nbytes, time.monotonic())
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """ Remove all results, the counters are kept """
+        with self._lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """ Counters of the cache """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self.entries), "bytes": self.nbytes}
+
+    def fingerprint(self, value: Any) -> Hashable:
+        """ Part of a key for an argument
+
+        Values that are hashable by their value are used as they are, and lists
+        and tuples by their items. Other objects, the loaded data, are identified
+        by a number that is given to them the first time they are seen.
+        """
+        if isinstance(value, (list, tuple)):
+            return tuple(self.fingerprint(item) for item in value)
+        if value is None or type(value).__hash__ not in (None, object.__hash__):
+            try:
+                hash(value)
+                return value
+            except TypeError:
+                pass
+
+        with self._lock:
+            self._forget_collected()
+            if id(value) not in self._fingerprints:
+                self._fingerprints[id(value)] = DataFingerprint(next(self._counter))
+                weakref.finalize(value, self._collected.append, id(value))
+            return self._fingerprints[id(value)]
+
+    def _forget_collected(self) -> None:
+        """ Remove the results of the objects that were garbage collected
+
+        The finalizers only register the objects, since they can run at any
+        moment, also while the lock is held. Since they run as soon as an object
+        is collected, this happens before its id can be given to another object.
+        """
+        while self._collected:
+            fingerprint = self._fingerprints.pop(self._collected.pop(), None)
+            for key in [key for key in self.entries if _contains(key, fingerprint)]:
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        _, nbytes, _ = self.entries.pop(key)
+        self.nbytes -= nbytes
+
+
+class DataFingerprint:
+    """ Identifier of an object of loaded data in a key, never equal to a selection """
+    __slots__ = ("number",)
+
+    def __init__(self, number: int):
+        self.number = number
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is DataFingerprint and other.number == self.number
+
+    def __hash__(self) -> int:
+        return hash((DataFingerprint, self.number))
+
+    def __repr__(self) -> str:
+        return "DataFingerprint({})".format(self.number)
+
+
+PAGE_CACHE = PageCache(ttl=MEMO_TTL)
+
+
+def memoize(function: Callable = None, cache: PageCache = PAGE_CACHE) -> Callable:
+    """ Return the previous result of a function for the same loaded data and selections
+
+    The results are shared between reruns and sessions, and should therefore
+    not be changed by the caller.
+
+    Parameters:
+    -----------
+
+    function : Callable
+        The function to memoize, such that it can be used as `@memoize`
+
+    cache : PageCache
+        The cache in which the results are stored
+
+    Returns:
+    --------
+
+    memoized : Callable
+        The memoized function, the original is available as `memoized.__wrapped__`
+    """
+    if function is None:
+        return functools.partial(memoize, cache=cache)
+
+    @functools.wraps(function)
+    def memoized(*args, **kwargs):
+        arguments = tuple(cache.fingerprint(value) for value in args)
+        arguments += tuple((name, cache.fingerprint(kwargs[name])) for name in sorted(kwargs))
+        key = (function.__module__ + "." + function.__qualname__, arguments)
+        try:
+            return cache.get(key)
+        except KeyError:
+            value = function(*args, **kwargs)
+            cache.put(key, value)
+            return value
+
+    return memoized
+
+
+def _contains(key: Hashable, fingerprint: DataFingerprint) -> bool:
+    """ Whether a key contains the fingerprint """
+    if isinstance(key, tuple):
+        return any(_contains(item, fingerprint) for item in key)
+    return key == fingerprint
+
+
+def _nbytes(value: Any) -> int:
+    """ Approximate number of bytes of a result """
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(item) for item in value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
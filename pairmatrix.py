@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+from typing import TYPE_CHECKING, List, Tuple
+
+from matchstore import MatchData, MatchStore
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+
+class PairMatrix:
+    """ Two player matches played, won and tied by every pair of players, overall and per game
+
+    With P the sparse matrix of two player matches x players that indicates who played
+    and W the same matrix of who won, all pairs are computed at once:
+
+        played = P.T @ P    matches in which player i and j played against each other
+        wins = W.T @ P      matches in which player i won against player j
+        ties = W.T @ W      matches in which both player i and j won
+
+    The diagonals hold the totals of each player, e.g. `played[i, i]` is the number
+    of two player matches of player i. For the statistics per game the columns
+    are first offset by game such that player i in game g is column `g * nr_players + i`.
+    Since a match belongs to a single game, this gives one (games * players) square
+    matrix in which each game is a block on the diagonal.
+
+    Attributes:
+    -----------
+
+    players : list of str
+        Sorted list of players
+
+    player_index : dict
+        Mapping of player to player id
+
+    games : list of str
+        Sorted list of games
+
+    game_index : dict
+        Mapping of game to game id
+
+    played, wins, ties : scipy.sparse.csr_matrix
+        Matrices of players x players
+
+    game_played, game_wins, game_ties : scipy.sparse.csr_matrix
+        Matrices of (games * players) x (games * players)
+    """
+
+    def __init__(self,
+                 players: List[str],
+                 match_ids: np.ndarray,
+                 player_ids: np.ndarray,
+                 won: np.ndarray,
+                 games: np.ndarray):
+        self.players = list(players)
+        self.player_index = {player: idx for idx, player in enumerate(self.players)}
+        game_ids, games = pd.factorize(games, sort=True)
+        self.games = list(games)
+        self.game_index = {game: idx for idx, game in enumerate(self.games)}
+
+        nr_matches, nr_players = len(game_ids), len(self.players)
+        self.played, self.wins, self.ties = _pair_products(match_ids, player_ids, won,
+                                                           shape=(nr_matches, nr_players))
+
+        columns = game_ids[match_ids] * nr_players + player_ids
+        self.game_played, self.game_wins, self.game_ties = _pair_products(match_ids, columns, won,
+                                                                          shape=(nr_matches,
+                                                                                 len(self.games) * nr_players))
+
+    @classmethod
+    def from_data(cls, matrix: MatchData) -> "PairMatrix":
+        """ Create the matrices from the two player matches of a MatchMatrix or MatchStore
+
+        Parameters:
+        -----------
+
+        matrix : MatchMatrix | MatchStore
+            Scores, winners and players per match
+
+        Returns:
+        --------
+
+        pairs : PairMatrix
+        """
+        if isinstance(matrix, MatchStore):
+            match_ids, player_ids = matrix.match_ids[matrix.played], matrix.player_ids[matrix.played]
+            won = matrix.won[matrix.played]
+        else:
+            match_ids, player_ids = np.nonzero(matrix.played)
+            won = matrix.won[match_ids, player_ids]
+
+        two_players = matrix.nr_players[match_ids] == 2
+        return cls(players=matrix.players,
+                   match_ids=match_ids[two_players],
+                   player_ids=player_ids[two_players],
+                   won=won[two_players],
+                   games=matrix.games)
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes used by the sparse matrices """
+        matrices = [self.played, self.wins, self.ties, self.game_played, self.game_wins, self.game_ties]
+        return sum(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes for m in matrices)
+
+    def record(self,
+               player_one: str,
+               player_two: str,
+               game: str = None) -> Tuple[int, int, int, int]:
+        """ The two player matches between two players
+
+        Parameters:
+        -----------
+
+        player_one : str
+            One of the players
+
+        player_two : str
+            One of the players
+
+        game : str
+            If given, only the matches of this game are counted
+
+        Returns:
+        --------
+
+        played : int
+            Number of matches played against each other
+
+        player_one_won, player_two_won : int
+            Number of those matches won by each player, including ties
+
+        tied : int
+            Number of those matches won by both players
+        """
+        if player_one not in self.player_index or player_two not in self.player_index or player_one == player_two:
+            return 0, 0, 0, 0
+        if game is not None and game not in self.game_index:
+            return 0, 0, 0, 0
+
+        one, two = self.player_index[player_one], self.player_index[player_two]
+        if game is None:
+            played, wins, ties = self.played, self.wins, self.ties
+        else:
+            played, wins, ties = self.game_played, self.game_wins, self.game_ties
+            one, two = self.game_index[game] * len(self.players) + one, self.game_index[game] * len(self.players) + two
+
+        return int(played[one, two]), int(wins[one, two]), int(wins[two, one]), int(ties[one, two])
+
+    def league_table(self) -> pd.DataFrame:
+        """ Results of every player in two player matches
+
+        Returns:
+        --------
+
+        table : pandas.core.frame.DataFrame
+            The number of two player matches Played, Won, Lost and Tied and the
+            percentage won of every player that played a two player match,
+            sorted by the percentage won
+        """
+        played = self.played.diagonal()
+        tied = np.asarray(self.ties.sum(axis=1)).ravel() - self.ties.diagonal()
+        won = self.wins.diagonal() - tied
+        lost = np.asarray(self.wins.sum(axis=0)).ravel() - self.wins.diagonal() - tied
+
+        table = pd.DataFrame({"Player": self.players, "Played": played, "Won": won, "Lost": lost, "Tied": tied},
+                             columns=["Player", "Played", "Won", "Lost", "Tied"])
+        table = table.loc[table.Played > 0, :]
+        table["Win %"] = (table.Won / table.Played * 100).round(1)
+        return table.sort_values(["Win %", "Played"], ascending=False).reset_index(drop=True)
+
+    def win_percentages(self, players: List[str]) -> pd.DataFrame:
+        """ Percentage of the two player matches that each player won against each other player
+
+        Parameters:
+        -----------
+
+        players : list of str
+            The players to compare
+
+        Returns:
+        --------
+
+        percentages : pandas.core.frame.DataFrame
+            The Player, Opponent, number of matches Played and the Win % of Player
+            for each pair that played against each other
+        """
+        ids = [self.player_index[player] for player in players]
+        played = self.played[ids][:, ids].toarray()
+        wins = self.wins[ids][:, ids].toarray()
+
+        one, two = np.nonzero(played)
+        one, two = one[one != two], two[one != two]
+        return pd.DataFrame({"Player": np.array(players, dtype=object)[one],
+                             "Opponent": np.array(players, dtype=object)[two],
+                             "Played": played[one, two],
+                             "Win %": (wins[one, two] / played[one, two] * 100).round(1)},
+                            columns=["Player", "Opponent", "Played", "Win %"])
+
+
+def _pair_products(match_ids: np.ndarray,
+                   columns: np.ndarray,
+                   won: np.ndarray,
+                   shape: Tuple[int, int]) -> Tuple["sparse.csr_matrix", "sparse.csr_matrix", "sparse.csr_matrix"]:
+    """ Played, wins and ties of all pairs of columns, see PairMatrix """
+    # scipy.sparse takes long to import, it is only imported once the matrices are built
+    from scipy import sparse
+
+    played = sparse.csr_matrix((np.ones(len(match_ids), dtype=np.int32), (match_ids, columns)), shape=shape)
+    winners = sparse.csr_matrix((np.asarray(won, dtype=np.int32), (match_ids, columns)), shape=shape)
+    winners.eliminate_zeros()
+    return (played.T @ played).tocsr(), (winners.T @ played).tocsr(), (winners.T @ winners).tocsr()
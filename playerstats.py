@@ -2,15 +2,29 @@ import numpy as np
 import pandas as pd
 import altair as alt
 import streamlit as st
-from scipy.stats import wilcoxon
 from typing import List, Tuple
 
+import downsample
+from matchindex import MatchIndex
+from matchmatrix import MatchMatrix
+from matchstore import MatchData
+from pagecache import memoize
+from ratings import INITIAL_RATING, RatingEngine
+from rollingform import RollingForm
+from statscube import StatsCube
+
 SPACES = '&nbsp;' * 10
 SPACES_NO_EMOJI = '&nbsp;' * 15
 
 
 def load_page(df: pd.DataFrame,
-              player_list: List[str]) -> None:
+              player_list: List[str],
+              matrix: MatchData,
+              index: MatchIndex,
+              cube: StatsCube,
+              tests: pd.DataFrame,
+              ratings: RatingEngine,
+              form: RollingForm) -> None:
     """ The Player Statistics Page
 
     After filtering for a player, it includes the following sections:
@@ -24,6 +38,10 @@ def load_page(df: pd.DataFrame,
         * Performance
             * This section describes the performance of the player based on how
             frequently this person has won a game.
+        * Rating
+            * The Elo rating of the player over time and per game
+        * Over- and Underperformers
+            * All players that score significantly different from the others in a game
 
     Parameters:
     -----------
@@ -33,20 +51,45 @@ def load_page(df: pd.DataFrame,
 
     player_list : list of str
         List of players that participated in the board games
+
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
+
+    cube : StatsCube
+        Summary statistics of the scores per player, game and version
+
+    tests : pandas.core.frame.DataFrame
+        Wilcoxon signed-rank tests of every player and game, see `significance.test_all`
+
+    ratings : RatingEngine
+        Elo ratings of every player, overall and per game
+
+    form : RollingForm
+        Moving average score, win rate and form of every player in every game
     """
 
     # Prepare layout
     selected_player = prepare_layout(player_list)
-    player_selection_df, grouped_per_game_df = score_per_player(df, selected_player)
+    player_selection_df, grouped_per_game_df = score_per_player(df, selected_player, matrix, index)
 
     # Visualizations
     plot_average_score_per_game(grouped_per_game_df, selected_player)
-    calculate_stats_per_game(player_selection_df, selected_player)
-    calculate_performance(player_selection_df, selected_player)
+    calculate_stats_per_game(player_selection_df, selected_player, matrix, index, cube, tests, form)
+    calculate_performance(player_matches(matrix, index, selected_player), selected_player)
+    show_rating(ratings, selected_player)
+    show_significant_players(tests)
 
 
 def calculate_stats_per_game(selection_df: pd.DataFrame,
-                             selected_player: str) -> None:
+                             selected_player: str,
+                             matrix: MatchData,
+                             index: MatchIndex,
+                             cube: StatsCube,
+                             tests: pd.DataFrame,
+                             form: RollingForm) -> None:
     """ The Player Statistics for a specific game
 
     Parameters:
@@ -58,6 +101,21 @@ def calculate_stats_per_game(selection_df: pd.DataFrame,
 
     player : str
         The selected player
+
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
+
+    cube : StatsCube
+        Summary statistics of the scores per player, game and version
+
+    tests : pandas.core.frame.DataFrame
+        Wilcoxon signed-rank tests of every player and game, see `significance.test_all`
+
+    form : RollingForm
+        Moving average score, win rate and form of every player in every game
     """
 
     # Prepare layout
@@ -68,16 +126,19 @@ def calculate_stats_per_game(selection_df: pd.DataFrame,
     games = list(selection_df.Game.unique())
     games.sort()
     selected_game = st.selectbox("Select a game to explore.", games)
-    selected_game_df = selection_df.loc[(selection_df.Game == selected_game), :]
+    selected_matrix = player_matches(matrix, index, selected_player, selected_game)
 
     # Create visualizations
-    plot_general_stats(selected_game_df, selected_player)
-    plot_scores_over_time(selected_game_df, selected_player)
-    calculate_statistical_difference(selected_game_df, selected_player)
+    plot_general_stats(cube, selected_player, selected_game)
+    history = form.history(selected_player, selected_game)
+    plot_scores_over_time(selected_matrix, selected_player, history)
+    show_recent_form(history, selected_player, form.window)
+    calculate_statistical_difference(tests, selected_player, selected_game)
 
 
-def plot_scores_over_time(selected_game_df: pd.DataFrame,
-                          selected_player: str) -> None:
+def plot_scores_over_time(selected_matrix: MatchMatrix,
+                          selected_player: str,
+                          history: pd.DataFrame) -> None:
     """ Create a visualization allowing for scores to be shown over time
 
     Note that the x-axis does not show any time since it is based merely
@@ -89,21 +150,28 @@ def plot_scores_over_time(selected_game_df: pd.DataFrame,
     Parameters:
     -----------
 
-    selected_game_df : pandas.core.frame.DataFrame
-        Data for the selected game
+    selected_matrix : MatchMatrix
+        Matches of the selected player for the selected game
 
     selected_player : str
         The selected player
+
+    history : pandas.core.frame.DataFrame
+        The moving Average score after each of these matches, see `RollingForm.history`
     """
 
-    game_scores = selected_game_df[selected_player + '_score'].values
+    game_scores = selected_matrix.player_scores(selected_player)
     to_plot = pd.DataFrame(np.array([game_scores, np.arange(len(game_scores))]).T, columns=['Score', 'Player'])
+    to_plot["Average"] = history.Average.to_numpy()
+    to_plot = downsample.downsample_lines(to_plot, x="Player", y="Score", name="Scores over time")
 
-    chart = alt.Chart(to_plot,
-                      title="Scores over time").mark_line(color='#4db6ac').encode(
+    scores = alt.Chart(to_plot,
+                       title="Scores over time").mark_line(color='#4db6ac').encode(
         alt.X('Player', axis=None, scale=alt.Scale(domain=(0, max(to_plot.Player)))),
         y='Score'
-    ).configure_axis(
+    )
+    average = scores.mark_line(color='#FF5722', strokeDash=[4, 2]).encode(y='Average')
+    chart = alt.layer(scores, average).configure_axis(
         grid=False
     ).configure_view(
         strokeOpacity=0
@@ -112,85 +180,109 @@ def plot_scores_over_time(selected_game_df: pd.DataFrame,
     st.altair_chart(chart)
 
 
-def calculate_statistical_difference(selection: pd.DataFrame,
-                                     selected_player: str) -> None:
-    """ Calculate, for one board game, if there is a significant difference
+def show_recent_form(history: pd.DataFrame,
+                     selected_player: str,
+                     window: int) -> None:
+    """ Show the moving average score, win rate and form of a player after its last match of a game
+
+    Parameters:
+    -----------
+
+    history : pandas.core.frame.DataFrame
+        The statistics of the player after each match of the game, see `RollingForm.history`
+
+    selected_player : str
+        The selected player
+
+    window : int
+        Number of matches over which the statistics are computed
+    """
+
+    current = history.iloc[-1]
+    st.write("The dashed line is the average score over the last {} matches.".format(window))
+    st.markdown("{}🔹 Over the last {} match(es), **{}** scored **{:.1f}** on average and won **{:.0f}** percent "
+                "of them. That is **{:.1f}** points {} the average of all matches.".format(
+                    SPACES, min(len(history), window), selected_player, current.Average,
+                    current["Win rate"] * 100, abs(current.Form), "above" if current.Form >= 0 else "below"))
+
+
+def calculate_statistical_difference(tests: pd.DataFrame,
+                                     selected_player: str,
+                                     selected_game: str) -> None:
+    """ Show, for one board game, if there is a significant difference
     between the average score (excluded the selected player) and all scores of a player
     across all matches of the selected board game.
 
     This was calculated using the Wilcoxon signed rank test due to the expectation
-    of non-normally distributed data.
+    of non-normally distributed data. The tests of all players and games are run
+    beforehand, see `significance.test_all`.
 
     Parameters:
     -----------
 
-    selected_game_df : pandas.core.frame.DataFrame
-        Data for the selected game
+    tests : pandas.core.frame.DataFrame
+        Wilcoxon signed-rank tests of every player and game, see `significance.test_all`
 
     selected_player : str
         The selected player
+
+    selected_game : str
+        The selected game
     """
 
     st.header("**♟** Statistical Difference **♟**")
     st.markdown("Here, you can see if there is a statistical difference between the scores"
                 "of the selected person and the selected game, and the average score of all other "
                 "players for the same game.")
-    # Extract average score of game without player and player values for game
-    score_selection = selection.loc[:, [column for column in selection.columns
-                                        if (('score' in column) &
-                                            ('has_score' not in column) &
-                                            (selected_player + '_score' not in column))]]
-    score_selection = score_selection.to_numpy()
-    average_score = np.mean(score_selection[np.nonzero(score_selection)])
-    player_values = selection[selected_player + "_score"].values
-
-    # Use an one-sample Wilcoxon signed-rank test if sufficient n
-    if len(player_values) > 15:
-        p = wilcoxon(player_values-average_score)
-        if p[1] < 0.05:
+    # The one-sample Wilcoxon signed-rank test was only run if sufficient n
+    if (selected_player, selected_game) in tests.index:
+        test = tests.loc[(selected_player, selected_game), :]
+        if test.P < 0.05:
             st.write("{}🔹 According to a **one-sample Wilcoxon signed-rank test**".format(SPACES))
             st.write("{}🔹 there **is** a significant difference between the scores of **{}** "
-                     "(mean score of {}) ".format(SPACES, selected_player, round(np.mean(player_values), 2)))
-            st.write("{}🔹 and the average (score of {}).".format(SPACES, round(average_score, 2)))
+                     "(mean score of {}) ".format(SPACES, selected_player, round(test.Mean, 2)))
+            st.write("{}🔹 and the average (score of {}).".format(SPACES, round(test.Average, 2)))
 
         else:
             st.write("{}🔹 According to an one-sample Wilcoxon signed-rank test there "
                      "is no significant difference between the scores of {} (mean score "
                      "of {}) and the average (score of {}).".format(SPACES,
                                                                     selected_player,
-                                                                    round(np.mean(player_values), 2),
-                                                                    round(average_score, 2)))
+                                                                    round(test.Mean, 2),
+                                                                    round(test.Average, 2)))
+        st.write("{}🔹 Corrected for the {} tests of all players and games, the p-value is {}.".format(
+            SPACES, len(tests), round(test.P_adjusted, 4)))
     else:
         st.write("{}🔹 Insufficient data to run statistical test. A minimum of "
                  "**15** matches is necessary.".format(SPACES))
     st.write(" ")
 
 
-def plot_general_stats(selected_game_df: pd.DataFrame,
-                       selected_player: str) -> None:
+def plot_general_stats(cube: StatsCube,
+                       selected_player: str,
+                       selected_game: str) -> None:
     """ Plot several statistics for the selected board game
 
     Parameters:
     -----------
 
-    selected_game_df : pandas.core.frame.DataFrame
-        Data for the selected game
+    cube : StatsCube
+        Summary statistics of the scores per player, game and version
 
     selected_player : str
         The selected player
+
+    selected_game : str
+        The selected game
     """
 
     # Prepare statistics
-    min_score = selected_game_df[selected_player+"_score"].min()
-    max_score = selected_game_df[selected_player+"_score"].max()
-    mean_score = selected_game_df[selected_player + "_score"].mean()
-    median_score = selected_game_df[selected_player + "_score"].median()
-    nr_played = len(selected_game_df)
-    to_plot = pd.DataFrame([[min_score, 'Minimum score'],
-                            [max_score, 'Maximum score'],
-                            [mean_score, 'Mean score'],
-                            [median_score, 'Median score'],
-                            [nr_played, 'Times played']], columns=['Score', 'Name'])
+    stats = cube.player_game(selected_player, selected_game)
+    to_plot = pd.DataFrame([[stats.Min, 'Minimum score'],
+                            [stats.Max, 'Maximum score'],
+                            [stats.Sum / stats.Count, 'Mean score'],
+                            [stats.Median, 'Median score'],
+                            [stats.Count, 'Times played']], columns=['Score', 'Name'])
 
     # Visualize results
     st.write("Below you can see general statistisc for the selected game.")
@@ -211,19 +303,70 @@ def plot_general_stats(selected_game_df: pd.DataFrame,
     st.altair_chart(bars + text)
 
 
+def scored_rows(matrix: MatchData,
+                index: MatchIndex,
+                selected_player: str) -> np.ndarray:
+    """ Row positions of the matches of a player that have a score and a winner """
+    rows = index.player(selected_player)
+    return rows[matrix.has_score[rows] & matrix.has_winner[rows]]
+
+
+@memoize
+def player_matches(matrix: MatchData,
+                   index: MatchIndex,
+                   selected_player: str,
+                   selected_game: str = None) -> MatchMatrix:
+    """ Matches of a player that have a score and a winner, optionally of only one game
+
+    Parameters:
+    -----------
+
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
+
+    selected_player : str
+        The selected player
+
+    selected_game : str
+        The selected game, None for all games
+
+    Returns:
+    --------
+
+    player_matrix : MatchMatrix
+        The selected matches
+    """
+    rows = scored_rows(matrix, index, selected_player)
+    if selected_game is not None:
+        rows = index.intersect(rows, index.game(selected_game))
+    return matrix.take(rows, players=[selected_player])
+
+
+@memoize
 def score_per_player(df: pd.DataFrame,
-                     selected_player: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+                     selected_player: str,
+                     matrix: MatchData,
+                     index: MatchIndex) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """Plot score per player
 
     Parameters:
     -----------
 
-    selected_game_df : pandas.core.frame.DataFrame
-        Data for the selected game
+    df : pandas.core.frame.DataFrame
+        The data to be used for the analyses of played board game matches.
 
     selected_player : str
         The selected player
 
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    index : MatchIndex
+        Matches per player, game, game and version, and pair of players
+
     Returns:
     --------
 
@@ -235,12 +378,11 @@ def score_per_player(df: pd.DataFrame,
         per game were extracted
     """
 
-    st.header("**♟** Average Score per Game **♟**")
-    st.write("The graph below shows you the average score per game for a single player. ")
-    player_selection_df = df.loc[(df.has_score == 1) &
-                                 (df.has_winner == 1) &
-                                 (df[selected_player + "_played"] == 1), :]
-    grouped_per_game_df = player_selection_df.groupby("Game").mean()[[selected_player + '_score']]
+    rows = scored_rows(matrix, index, selected_player)
+    player_selection_df = df.iloc[rows]
+    scores = matrix.player_scores(selected_player)[rows]
+    grouped_per_game_df = pd.DataFrame({"Game": player_selection_df.Game.to_numpy(),
+                                        selected_player + '_score': scores}).groupby("Game").mean()
 
     return player_selection_df, grouped_per_game_df
 
@@ -292,6 +434,8 @@ def plot_average_score_per_game(grouped_per_game_df: pd.DataFrame,
         The selected player
     """
 
+    st.header("**♟** Average Score per Game **♟**")
+    st.write("The graph below shows you the average score per game for a single player. ")
     grouped_per_game_df = grouped_per_game_df.reset_index()
     bars = alt.Chart(grouped_per_game_df,
                      height=100 + (20 * len(grouped_per_game_df)),
@@ -311,25 +455,96 @@ def plot_average_score_per_game(grouped_per_game_df: pd.DataFrame,
     st.altair_chart(bars + text)
 
 
-def calculate_performance(player_selection_df: pd.DataFrame,
+def calculate_performance(player_matrix: MatchMatrix,
                           selected_player: str) -> None:
     """ Calculate the performance of a player
 
     Parameters:
     -----------
 
-    player_selection_df : pandas.core.frame.DataFrame
-        Data for the selected player that has a score and a winner
+    player_matrix : MatchMatrix
+        Matches of the selected player that have a score and a winner
 
     selected_player : str
         The selected player
     """
 
-    played = len(player_selection_df)
-    won = len(player_selection_df.loc[player_selection_df[selected_player + '_winner'] == 1, :])
+    played = len(player_matrix)
+    won = player_matrix.player_won(selected_player).sum()
     percentage = round(won / played * 100, 1)
     st.header("**♟** Performance **♟**")
     st.write("This section describes the performance of the player based on "
              "how frequently this person has won a game.")
     st.markdown("{}🔹 Player **{}** has won **{}** out of **{}** "
                 "games which is **{}** percent of games".format(SPACES, selected_player, won, played, percentage))
+
+
+def show_rating(ratings: RatingEngine,
+                selected_player: str) -> None:
+    """ Show the Elo rating of a player, its rating over time and its rating per game
+
+    Parameters:
+    -----------
+
+    ratings : RatingEngine
+        Elo ratings of every player, overall and per game
+
+    selected_player : str
+        The selected player
+    """
+
+    st.header("**♟** Rating **♟**")
+    st.write("Every player starts with an Elo rating of {:.0f} which is updated after every match with a "
+             "score or a winner, based on the place of the player and the ratings of the other "
+             "players.".format(INITIAL_RATING))
+
+    table = ratings.table()
+    if selected_player not in set(table.Player):
+        st.write("{}🔹 Player **{}** has not played any rated matches.".format(SPACES, selected_player))
+        return
+
+    rank = table.index[table.Player == selected_player][0]
+    st.markdown("{}🔹 Player **{}** has a rating of **{:.0f}** which ranks **{}** out of **{}** "
+                "players".format(SPACES, selected_player, table.Rating[rank], rank + 1, len(table)))
+
+    history = ratings.history(selected_player)
+    chart = alt.Chart(history, title="Rating over time").mark_line(color='#4db6ac').encode(
+        x='Date:T',
+        y=alt.Y('Rating:Q', scale=alt.Scale(zero=False)),
+        tooltip=['Date:T', 'Game:N', alt.Tooltip('Rating:Q', format='.0f')]
+    ).configure_axis(
+        grid=False
+    ).configure_view(
+        strokeOpacity=0
+    )
+    st.altair_chart(chart)
+
+    per_game = history.Game.value_counts().rename("Matches").rename_axis("Game").to_frame()
+    per_game.insert(0, "Rating", [ratings.game_ratings[ratings.game_index[game], ratings.player_index[selected_player]]
+                                  for game in per_game.index])
+    st.table(per_game.round({"Rating": 0}).sort_values(["Rating", "Matches"], ascending=False))
+
+
+def show_significant_players(tests: pd.DataFrame) -> None:
+    """ Show all players that score significantly higher or lower than the others in a game
+
+    Parameters:
+    -----------
+
+    tests : pandas.core.frame.DataFrame
+        Wilcoxon signed-rank tests of every player and game, see `significance.test_all`
+    """
+
+    st.header("**♟** Over- and Underperformers **♟**")
+    st.write("The same test was run for every player and game with sufficient matches. Below are all "
+             "players whose scores differ significantly from the average of the other players, after "
+             "correcting for running {} tests (Benjamini-Hochberg).".format(len(tests)))
+
+    significant = tests.loc[tests.Significant, :].reset_index()
+    if len(significant) == 0:
+        st.write("{}🔹 No player scores significantly different from the others in any game.".format(SPACES))
+        return
+
+    significant["Scores"] = np.where(significant.Mean > significant.Average, "Higher", "Lower")
+    significant = significant.sort_values(["Scores", "P_adjusted"]).round({"Mean": 2, "Average": 2, "P_adjusted": 4})
+    st.table(significant.loc[:, ["Player", "Game", "Scores", "Matches", "Mean", "Average", "P_adjusted"]])
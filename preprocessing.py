@@ -1,17 +1,44 @@
-import re
+import datetime
+import io
+import os
+import urllib.parse
+import urllib.request
 import numpy as np
 import pandas as pd
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, IO, Iterator, List, Tuple, Union
 
+import scoreparser
+from matchstore import MatchStore
 
-def prepare_data(link: str) -> Tuple[pd.DataFrame, List[str]]:
+SCHEMA_COLUMNS = ["Date", "Players", "Game", "Scores", "Winner", "Version"]
+CATEGORICAL_COLUMNS = ["Game", "Version", "Players", "Winner"]
+FLAG_COLUMNS = ["has_score", "has_winner", "Nr_players"]
+
+# Number of rows that are read and preprocessed at once
+CHUNK_SIZE = 100000
+FILE_FORMATS = {".xlsx": "excel", ".xlsm": "excel", ".xls": "xls",
+                ".csv": "csv", ".txt": "csv",
+                ".jsonl": "jsonl", ".ndjson": "jsonl",
+                ".parquet": "parquet", ".pq": "parquet"}
+# Types of the values of excel cells, anything else is treated as empty
+EXCEL_TYPES = (str, int, float, bool, datetime.datetime, datetime.date, datetime.time, datetime.timedelta)
+
+
+def prepare_data(link: str,
+                 workers: int = 1) -> Tuple[pd.DataFrame, List[str]]:
     """ Load and prepare/preprocess the data
 
+    All columns are derived in a single vectorized pass over the data instead of
+    walking every row with ``df.apply``. The result is stored with compact dtypes,
+    see `compact_dtypes`.
+
     Parameters:
     -----------
 
     link : str
-        Link to the dataset, which should be in excel and of the following format:
+        Link to the dataset, which should be in excel, csv, jsonl or parquet
+        (see `load_data`) and of the following format:
 
         |  Date        |  Players          |  Game        |  Scores                  |  Winner     | Version    |
         |  2018-11-18  |  Peter+Mike       |  Qwixx       |  Peter77+Mike77          |  Peter+Mike | Normal     |
@@ -19,6 +46,9 @@ def prepare_data(link: str) -> Tuple[pd.DataFrame, List[str]]:
         |  2018-11-22  |  Mike+Chris       |  Jaipur      |  Mike84+Chris91          |  Chris      | Normal     |
         |  2018-11-30  |  Peter+Chris+Mike |  Kingdomino  |  Chris43+Mike37+Peter35  |  Chris      | 5x5        |
 
+    workers : int
+        Number of processes over which the rows are preprocessed, see `preprocess`
+
     Returns:
     --------
 
@@ -29,27 +59,594 @@ def prepare_data(link: str) -> Tuple[pd.DataFrame, List[str]]:
         List of players
     """
 
-    df = pd.read_excel(link)
+    return preprocess(load_data(link), workers=workers)
+
+
+def preprocess(df: pd.DataFrame,
+               player_list: List[str] = None,
+               workers: int = 1) -> Tuple[pd.DataFrame, List[str]]:
+    """ Preprocess the raw data, see `prepare_data`
+
+    With more than one worker, the rows are partitioned across a process pool in
+    which the Players, Scores and Winner strings are parsed, see `parse_records`.
+    Each process returns records that only refer to the players that occur in its
+    partition, which are mapped to the columns of all players when the partitions
+    are concatenated.
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The raw data of played board game matches as loaded by `load_data`
+
+    player_list : list of str
+        List of players for which to create columns. If None, the players
+        are extracted from the data.
+
+    workers : int
+        Number of processes over which the rows are preprocessed
+
+    Returns:
+    --------
+
+    df : pandas.core.frame.DataFrame
+        The preprocessed data
+
+    player_list : list of str
+        List of players
+    """
+
+    if player_list is None:
+        player_list = extract_players(df)
+        player_list.sort()
+
+    # Rows are preprocessed in chunks such that the intermediate matrices of
+    # matches x players are only ever created for a single chunk
+    chunk_size = max(min(CHUNK_SIZE, -(-len(df) // workers)), 1)
+    chunks = [df.iloc[start:start + chunk_size] for start in range(0, max(len(df), 1), chunk_size)]
+
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            player_df = pd.concat([records_to_frame(records, chunk.index, player_list)
+                                   for chunk, records in zip(chunks, executor.map(parse_records, chunks))])
+    else:
+        player_df = pd.concat([preprocess_chunk(chunk, player_list) for chunk in chunks])
+
+    df = pd.concat([df, player_df], axis=1)
+    df = compact_dtypes(df, player_list)
+
+    return df, player_list
+
+
+def preprocess_chunk(df: pd.DataFrame,
+                     player_list: List[str]) -> pd.DataFrame:
+    """ Create the _score, _winner and _played columns of each player and the
+    has_score, has_winner and Nr_players columns for a chunk of the raw data
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        A chunk of the raw data of played board game matches
+
+    player_list : list of str
+        List of players
+
+    Returns:
+    --------
+
+    player_df : pandas.core.frame.DataFrame
+        The created columns with compact dtypes
+    """
+
+    return records_to_frame(parse_records(df), df.index, player_list)
+
+
+def parse_records(df: pd.DataFrame) -> Dict[str, Union[pd.DataFrame, np.ndarray]]:
+    """ Parse the Scores, Winner and Players strings of the raw data into records
+
+    The players in the records are categorical with only the players that occur
+    in df as categories, such that the records are cheap to send between processes.
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The raw data of played board game matches
+
+    Returns:
+    --------
+
+    records : dict
+        The score records ("scores", see `extract_score_records`), the winner and
+        player records ("winners" and "played", see `extract_records`) and
+        the number of players per match ("nr_players")
+    """
+
+    records = {"scores": extract_score_records(df),
+               "winners": extract_records(df.Winner),
+               "played": extract_records(df.Players)}
+    for name in records:
+        records[name] = records[name].astype({"Row": np.int32, "Player": "category"})
+    records["nr_players"] = extract_nr_players(df)
+    return records
+
+
+def records_to_frame(records: Dict[str, Union[pd.DataFrame, np.ndarray]],
+                     index: pd.Index,
+                     player_list: List[str]) -> pd.DataFrame:
+    """ Create the columns of `preprocess_chunk` from the records of `parse_records`
+
+    Parameters:
+    -----------
+
+    records : dict
+        The records of a chunk of the raw data
+
+    index : pandas.core.indexes.base.Index
+        The index of the chunk
+
+    player_list : list of str
+        List of players
+
+    Returns:
+    --------
+
+    player_df : pandas.core.frame.DataFrame
+        The created columns with compact dtypes
+    """
+
+    scores = _to_matrix(records["scores"], len(index), player_list, values=records["scores"].Score.to_numpy())
+    winners = _to_matrix(records["winners"], len(index), player_list)
+    played = _to_matrix(records["played"], len(index), player_list)
+
+    # Interleave the matrices such that each player gets a _score, _winner and _played column
+    columns = player_columns(player_list)
+    values = np.stack([scores, winners, played], axis=2).reshape(len(index), 3 * len(player_list))
+    player_df = pd.DataFrame(values, columns=columns, index=index)
+    player_df['has_score'] = (scores != 0).any(axis=1).astype(int)
+    player_df['has_winner'] = winners.any(axis=1).astype(int)
+    player_df['Nr_players'] = records["nr_players"]
+
+    return compact_dtypes(player_df, player_list)
+
+
+def prepare_sparse_data(link: str) -> Tuple[pd.DataFrame, List[str], MatchStore]:
+    """ Load and prepare/preprocess the data into a sparse MatchStore
+
+    Instead of adding a _score, _winner and _played column for every player,
+    only the players that participated in a match are stored. This makes memory
+    grow with the number of participations instead of matches x players which
+    matters for groups with many distinct players.
+
+    Parameters:
+    -----------
+
+    link : str
+        Link to the dataset, see `prepare_data` for its format
+
+    Returns:
+    --------
+
+    df : pandas.core.frame.DataFrame
+        The data of played board game matches including the has_score, has_winner
+        and Nr_players columns, but without any columns per player.
+
+    player_list : list of str
+        List of players
+
+    store : MatchStore
+        Sparse scores, winners and players per match
+    """
+
+    return preprocess_sparse(load_data(link))
+
+
+def preprocess_sparse(df: pd.DataFrame,
+                      player_list: List[str] = None) -> Tuple[pd.DataFrame, List[str], MatchStore]:
+    """ Preprocess the raw data into a sparse MatchStore, see `prepare_sparse_data`
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The raw data of played board game matches as loaded by `load_data`
+
+    player_list : list of str
+        List of players to store. If None, the players are extracted from the data.
+
+    Returns:
+    --------
+
+    df : pandas.core.frame.DataFrame
+        The data including the has_score, has_winner and Nr_players columns
+
+    player_list : list of str
+        List of players
+
+    store : MatchStore
+        Sparse scores, winners and players per match
+    """
+
+    if player_list is None:
+        player_list = extract_players(df)
+        player_list.sort()
+
+    store = MatchStore.from_records(players=player_list,
+                                    dates=df.Date.to_numpy(),
+                                    games=df.Game.to_numpy(),
+                                    versions=df.Version.to_numpy(),
+                                    nr_players=extract_nr_players(df),
+                                    score_records=extract_score_records(df),
+                                    winner_records=extract_records(df.Winner),
+                                    played_records=extract_records(df.Players))
+
+    df['has_score'] = store.has_score
+    df['has_winner'] = store.has_winner
+    df['Nr_players'] = store.nr_players
+    df = compact_dtypes(df, player_list)
+
+    return df, player_list, store
+
+
+def append_data(df: pd.DataFrame,
+                player_list: List[str],
+                new_df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+    """ Append new raw matches to already preprocessed data
+
+    Only the new matches are preprocessed. Columns are added for players that
+    did not play before. The result is the same as preprocessing all matches at once.
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The preprocessed data
+
+    player_list : list of str
+        List of players in the preprocessed data
+
+    new_df : pandas.core.frame.DataFrame
+        The raw data of the new matches as loaded by `load_data`
+
+    Returns:
+    --------
+
+    df : pandas.core.frame.DataFrame
+        The preprocessed data of all matches
+
+    player_list : list of str
+        List of all players
+    """
+
+    if len(new_df) == 0:
+        return df, player_list
+
+    player_list = sorted(set(player_list) | set(extract_players(new_df)))
+    new_df, _ = preprocess(new_df.reset_index(drop=True), player_list)
+
+    # Players that are new have no values in the earlier matches
+    df = pd.concat([df, new_df], ignore_index=True, sort=False).loc[:, new_df.columns]
+    df = df.fillna({column: 0 for column in player_columns(player_list)})
+    return compact_dtypes(df, player_list), player_list
+
+
+def append_sparse_data(df: pd.DataFrame,
+                       player_list: List[str],
+                       store: MatchStore,
+                       new_df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str], MatchStore]:
+    """ Append new raw matches to already preprocessed sparse data, see `append_data`
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The preprocessed data
+
+    player_list : list of str
+        List of players in the preprocessed data
+
+    store : MatchStore
+        Sparse scores, winners and players of the preprocessed data
+
+    new_df : pandas.core.frame.DataFrame
+        The raw data of the new matches as loaded by `load_data`
+
+    Returns:
+    --------
+
+    df : pandas.core.frame.DataFrame
+        The preprocessed data of all matches
+
+    player_list : list of str
+        List of all players
+
+    store : MatchStore
+        Sparse scores, winners and players of all matches
+    """
+
+    if len(new_df) == 0:
+        return df, player_list, store
+
+    player_list = sorted(set(player_list) | set(extract_players(new_df)))
+    new_df, _, new_store = preprocess_sparse(new_df.reset_index(drop=True), player_list)
+
+    df = pd.concat([df, new_df], ignore_index=True, sort=False).loc[:, new_df.columns]
+    return compact_dtypes(df, player_list), player_list, store.append(new_store)
+
+
+def row_fingerprints(df: pd.DataFrame) -> np.ndarray:
+    """ Hash each row of the raw data such that edited or new rows can be detected
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The raw data of played board game matches as loaded by `load_data`
+
+    Returns:
+    --------
+
+    fingerprints : numpy.ndarray of uint64
+        One hash per row
+    """
+    return pd.util.hash_pandas_object(df.loc[:, SCHEMA_COLUMNS], index=False).to_numpy()
+
+
+def player_columns(player_list: List[str]) -> List[str]:
+    """ The _score, _winner and _played columns of each player """
+    return [player + suffix for player in player_list for suffix in ["_score", "_winner", "_played"]]
+
+
+def load_data(link: Union[str, IO[bytes]],
+              file_format: str = None) -> pd.DataFrame:
+    """ Load the raw data from a link, parse its dates and make sure all scores are strings
+
+    Parameters:
+    -----------
+
+    link : str | file-like object
+        Link or path to the data or an opened binary file
+
+    file_format : str
+        One of "excel", "xls", "csv", "jsonl" or "parquet". If None, it is detected
+        from the extension of the link or otherwise from the content, see `detect_format`.
+        Excel (xlsx), csv and jsonl files are read in chunks, which are concatenated
+        since the players are only known once all rows are read. For all formats
+        only the columns Date/Players/Game/Scores/Winner/Version are kept and
+        rows that are empty in all of them are skipped.
+
+    Returns:
+    --------
+
+    df : pandas.core.frame.DataFrame
+        The raw data of played board game matches
+    """
+
+    if file_format is None:
+        file_format = detect_format(link)
+
+    # openpyxl only opens local files, so remote workbooks are downloaded first
+    if file_format == "excel" and isinstance(link, str) and not os.path.exists(link):
+        with urllib.request.urlopen(link) as response:
+            link = io.BytesIO(response.read())
+
+    if file_format == "csv":
+        chunks = pd.read_csv(link, usecols=lambda column: column in SCHEMA_COLUMNS,
+                             dtype={column: object for column in SCHEMA_COLUMNS}, chunksize=CHUNK_SIZE)
+        df = _concat_chunks(chunks)
+    elif file_format == "jsonl":
+        chunks = pd.read_json(link, lines=True, dtype=False, convert_dates=False, chunksize=CHUNK_SIZE)
+        df = _concat_chunks(chunk.loc[:, [column for column in SCHEMA_COLUMNS if column in chunk.columns]]
+                            for chunk in chunks)
+    elif file_format == "parquet":
+        df = pd.read_parquet(link, columns=SCHEMA_COLUMNS)
+    elif file_format == "xls":
+        df = pd.read_excel(link).loc[:, SCHEMA_COLUMNS]
+    else:
+        df = _concat_chunks(iter_excel_chunks(link))
+
+    if df.isnull().all(axis=1).any():
+        df = df.dropna(how="all").reset_index(drop=True)
     df.Date = pd.to_datetime(df.Date)
+    df.Scores = df.Scores.where(df.Scores.isnull(), df.Scores.astype(str))
+    return df
+
+
+def detect_format(link: Union[str, IO[bytes]], raw: bytes = None) -> str:
+    """ Detect the file format of the data
+
+    The extension of the link (ignoring any query such as ?raw=true) is used
+    if it is known, otherwise the first bytes of the data are inspected.
+
+    Parameters:
+    -----------
+
+    link : str | file-like object
+        Link or path to the data or an opened binary file
+
+    raw : bytes
+        The (first) bytes of the data if they were already loaded
+
+    Returns:
+    --------
+
+    file_format : str
+        One of "excel", "xls", "csv", "jsonl" or "parquet"
+    """
+
+    if isinstance(link, str):
+        extension = os.path.splitext(urllib.parse.urlparse(link).path)[1].lower()
+        if extension in FILE_FORMATS:
+            return FILE_FORMATS[extension]
+
+    if raw is None:
+        if isinstance(link, str) and os.path.isfile(link):
+            with open(link, "rb") as f:
+                raw = f.read(8)
+        elif isinstance(link, str):
+            return "excel"
+        else:
+            position = link.tell()
+            raw = link.read(8)
+            link.seek(position)
+
+    raw = raw[:8]
+    if raw.startswith(b"PK\x03\x04"):
+        return "excel"
+    elif raw.startswith(b"\xd0\xcf\x11\xe0"):
+        return "xls"
+    elif raw.startswith(b"PAR1"):
+        return "parquet"
+    elif raw.lstrip().startswith(b"{"):
+        return "jsonl"
+    return "csv"
+
+
+def iter_excel_chunks(link: Union[str, IO[bytes]],
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """ Stream the first sheet of an xlsx file in chunks of rows
+
+    The workbook is opened in read-only mode such that rows are parsed one by one
+    instead of loading the entire workbook. Only the columns Date/Players/Game/Scores/
+    Winner/Version are kept, as object dtype without inferring types cell by cell.
+    Rows that are empty in all of those columns are skipped. Like `pd.read_excel`,
+    whole numbers are returned as int and empty cells as NaN.
+
+    Parameters:
+    -----------
+
+    link : str | file-like object
+        Path to the xlsx file or an opened binary file
+
+    chunk_size : int
+        Maximum number of rows per chunk
+
+    Returns:
+    --------
+
+    chunks : iterator of pandas.core.frame.DataFrame
+        The raw data in chunks of at most chunk_size rows. At least one,
+        possibly empty, chunk is returned.
+    """
+
+    # openpyxl takes long to import and is only needed for excel files
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(link, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        missing = [column for column in SCHEMA_COLUMNS if column not in header]
+        if missing:
+            raise ValueError("The data is missing the columns: {}".format(missing))
+        indices = [header.index(column) for column in SCHEMA_COLUMNS]
+
+        chunk = []
+        nr_chunks = 0
+        for row in rows:
+            values = [_excel_value(row[idx]) if idx < len(row) else None for idx in indices]
+            if any(value is not None for value in values):
+                chunk.append([np.nan if value is None else value for value in values])
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame(chunk, columns=SCHEMA_COLUMNS, dtype=object)
+                chunk = []
+                nr_chunks += 1
+
+        if chunk or nr_chunks == 0:
+            yield pd.DataFrame(chunk, columns=SCHEMA_COLUMNS, dtype=object)
+    finally:
+        workbook.close()
+
+
+def _excel_value(value):
+    """ Convert a cell value the same way `pd.read_excel` does
+
+    Empty cells are None. Some versions of openpyxl return the cell itself instead
+    of its value for the empty rows at the end of a sheet, those are None as well.
+    """
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    elif isinstance(value, EXCEL_TYPES):
+        return value
+    return None
+
+
+def _concat_chunks(chunks) -> pd.DataFrame:
+    """ Concatenate chunks of a streaming reader into a single DataFrame """
+    return pd.concat(list(chunks), ignore_index=True, sort=False)
+
+
+def compact_dtypes(df: pd.DataFrame,
+                   player_list: List[str]) -> pd.DataFrame:
+    """ Store the preprocessed data with compact dtypes
 
-    player_list = extract_players(df)
-    player_list.sort()
+    * Scores are stored as int32 instead of int64
+    * The _winner, _played, has_score and has_winner flags are stored as bool
+    * Nr_players is stored as int16
+    * Game, Version, Players and Winner are categorical such that each distinct
+      value is stored once and every row only holds a code
 
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The preprocessed data of played board game matches
+
+    player_list : list of str
+        List of players
+
+    Returns:
+    --------
+
+    df : pandas.core.frame.DataFrame
+        The preprocessed data with compact dtypes
+    """
+
+    dtypes = {"has_score": bool, "has_winner": bool, "Nr_players": np.int16}
     for player in player_list:
-        df[player + "_score"] = 0
-        df[player + "_winner"] = 0
-        df[player + "_played"] = 0
-    df['has_score'] = 0
-    df['has_winner'] = 0
-
-    df = df.apply(lambda row: extract_score(row), 1)
-    df = df.apply(lambda row: extract_winner(row, player_list), 1)
-    df = df.apply(lambda row: extract_has_score(row, player_list), 1)
-    df = df.apply(lambda row: extract_has_winner(row, player_list), 1)
-    df = df.apply(lambda row: extract_has_played(row, player_list), 1)
-    df['Nr_players'] = df.apply(lambda row: len(str(row.Players).split("+")), 1)
+        dtypes.update({player + "_score": np.int32, player + "_winner": bool, player + "_played": bool})
+    dtypes.update({column: "category" for column in CATEGORICAL_COLUMNS})
 
-    return df, player_list
+    return df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns})
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """ Print the number of bytes per column before and after `compact_dtypes`
+
+    The bytes before are calculated by converting the columns back to the dtypes
+    that were used before, namely int64 for numbers and flags and Python strings
+    for categorical columns.
+
+    Parameters:
+    -----------
+
+    df : pandas.core.frame.DataFrame
+        The preprocessed data of played board game matches
+
+    Returns:
+    --------
+
+    report : pandas.core.frame.DataFrame
+        Bytes per column before and after, including a Total row
+    """
+
+    expanded_dtypes = {}
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.api.types.CategoricalDtype):
+            expanded_dtypes[column] = object
+        elif pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+            expanded_dtypes[column] = np.int64
+    before = df.astype(expanded_dtypes).memory_usage(index=False, deep=True)
+    after = df.memory_usage(index=False, deep=True)
+
+    report = pd.DataFrame({"Before": before, "After": after}, columns=["Before", "After"])
+    report.loc["Total", :] = report.sum()
+    report = report.astype(int)
+    report["Reduction"] = (1 - report.After / report.Before).round(2)
+
+    print(report.to_string())
+    return report
 
 
 def extract_players(df: pd.DataFrame) -> List[str]:
@@ -72,72 +669,130 @@ def extract_players(df: pd.DataFrame) -> List[str]:
     return player_list
 
 
-def extract_score(row: np.array) -> np.array:
+def extract_nr_players(df: pd.DataFrame) -> np.ndarray:
+    """ Extract the number of players per match """
+    return df.Players.astype(str).str.count(r"\+").to_numpy() + 1
+
+
+def extract_score_records(df: pd.DataFrame,
+                          errors: List[Tuple[int, str]] = None) -> pd.DataFrame:
     """ Extract the score per person by checking whether there are multiple players in the
     game which are connected with a + symbol
-    """
-    scores = str(row.Scores)
 
-    if ("+" in scores) and (re.findall("\d+", scores)):
-        scores = scores.split("+")
+    Each score (e.g., Peter77) is split into the name and the score, see
+    `scoreparser.parse_scores`. If any score of a match cannot be read, none
+    of the scores of that match are used and the match is reported in errors.
 
-        scores_dict = {re.findall("[a-zA-Z]+", score)[0]:
-                           re.findall("\d+", score)[0] for score in scores}
+    Parameters:
+    -----------
+    df : pandas.core.frame.DataFrame
+        The raw data of played board game matches
 
-        for player in scores_dict.keys():
-            row[player + '_score'] = int(scores_dict[player])
+    errors : list
+        If given, the row position and error message of every match
+        whose scores could not be read is appended to it
 
-    return row
+    Returns:
+    --------
+    score_records : pandas.core.frame.DataFrame
+        One record per score with the row position of the match (Row),
+        the Player and its Score. If a player has multiple scores in a match,
+        only the last one is kept.
+    """
 
+    rows, names, points = [], [], []
+    for row, (scores, players) in enumerate(zip(df.Scores.to_numpy(), df.Players.astype(str).to_numpy())):
+        if not scoreparser.has_scores(scores):
+            continue
+        try:
+            parsed = scoreparser.parse_scores(scores, players.split("+"))
+        except ValueError as error:
+            if errors is not None:
+                errors.append((row, str(error)))
+            continue
+        rows.extend([row] * len(parsed))
+        names.extend(name for name, _ in parsed)
+        points.extend(score for _, score in parsed)
 
-def extract_winner(row: np.array,
-                   player_list: List[str]) -> np.array:
-    """ Extract the winner(s) per game
-    """
+    score_records = pd.DataFrame({"Row": np.array(rows, dtype=int),
+                                  "Player": np.array(names, dtype=object),
+                                  "Score": np.array(points, dtype=int)})
+    return score_records.drop_duplicates(["Row", "Player"], keep="last")
 
-    winners = str(row.Winner).split("+")
 
-    for winner in winners:
-        if winner in player_list:
-            row[winner + "_winner"] = 1
+def score_errors(df: pd.DataFrame) -> pd.DataFrame:
+    """ Report the matches whose scores could not be read
 
-    return row
+    These matches are loaded without scores, so only matches without
+    a score in the preprocessed data are checked again.
 
+    Parameters:
+    -----------
+    df : pandas.core.frame.DataFrame
+        The preprocessed data of played board game matches
 
-def extract_has_score(row: np.array,
-                      player_list: List[str]) -> np.array:
-    """Check whether the game actually has a score"""
+    Returns:
+    --------
+    errors : pandas.core.frame.DataFrame
+        The Date, Game, Scores and Error of every match whose scores
+        could not be read, indexed like df
+    """
 
-    scores = 0
+    selection = df.loc[~df.has_score.astype(bool), ["Date", "Game", "Players", "Scores"]]
+    errors = []
+    extract_score_records(selection, errors)
 
-    for player in player_list:
-        scores += row[player + "_score"]
+    report = selection.iloc[[row for row, _ in errors]].loc[:, ["Date", "Game", "Scores"]]
+    report["Error"] = [error for _, error in errors]
+    return report
 
-    if scores > 0:
-        row['has_score'] = 1
 
-    return row
+def extract_records(column: pd.Series) -> pd.DataFrame:
+    """ Convert a column of players connected with a + symbol (e.g., Peter+Mike)
+    into one record per player with the row position of the match (Row) and the Player
+    """
+    tokens = column.reset_index(drop=True).astype(str).str.split("+").explode()
+    records = pd.DataFrame({"Row": tokens.index.to_numpy(), "Player": tokens.to_numpy()})
+    return records.drop_duplicates()
+
 
+def extract_scores(df: pd.DataFrame,
+                   player_list: List[str]) -> np.ndarray:
+    """ Extract the scores as a matrix of matches x players with 0 if no score was registered
+    """
+    records = extract_score_records(df)
+    return _to_matrix(records, len(df), player_list, values=records.Score.to_numpy())
 
-def extract_has_winner(row: np.array,
-                       player_list: List[str]) -> np.array:
-    """Check whether the game actually has a score"""
 
-    for player in player_list:
-        if row[player + "_winner"] == 1:
-            row['has_winner'] = 1
-            return row
+def extract_winners(df: pd.DataFrame,
+                    player_list: List[str]) -> np.ndarray:
+    """ Extract the winner(s) per game as a matrix of matches x players
+    """
+    return _to_matrix(extract_records(df.Winner), len(df), player_list)
+
 
-    return row
+def extract_played(df: pd.DataFrame,
+                   player_list: List[str]) -> np.ndarray:
+    """ Extract whether a person played in the game as a matrix of matches x players
+    """
+    return _to_matrix(extract_records(df.Players), len(df), player_list)
 
 
-def extract_has_played(row: np.array,
-                       player_list: List[str]) -> np.array:
-    """Check whether a person played in the game"""
-    played = str(row.Players).split("+")
+def _to_matrix(records: pd.DataFrame,
+               nr_rows: int,
+               player_list: List[str],
+               values: np.ndarray = None) -> np.ndarray:
+    """ Scatter records into a matrix of matches x players. Players that
+    are not in player_list are ignored. If no values are given, the matrix
+    indicates which records exist.
+    """
+    player_idx = pd.Series(np.arange(len(player_list)), index=player_list)
+    columns = records.Player.map(player_idx)
+    known = columns.notnull().to_numpy()
 
-    for player in played:
-        if player in player_list:
-            row[player + "_played"] = 1
+    rows = records.Row.to_numpy()[known]
+    columns = columns.to_numpy()[known].astype(int)
 
-    return row
+    matrix = np.zeros((nr_rows, len(player_list)), dtype=int)
+    matrix[rows, columns] = 1 if values is None else values[known]
+    return matrix
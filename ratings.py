@@ -0,0 +1,345 @@
+""" Elo ratings of the players, overall and per game
+
+Matches are rated in order of their date. In a match with k players, every
+player is compared with the other k - 1 players: the result of a player is the
+fraction of the other players it placed above, where winners place above
+non-winners and otherwise the higher score places higher (equal places count as
+half). The expected result follows from the difference between the rating of the
+player and the average rating of the other players:
+
+    expected = 1 / (1 + 10 ** ((average_other - rating) / 400))
+    rating += K_FACTOR * (result - expected)
+
+Matches without a score and without a winner, and matches with a single player,
+are not rated.
+
+The engine keeps its state such that new matches are rated on top of it without
+rating the earlier matches again. Since the rating of a player only depends on
+the earlier matches of that player, matches that have no players in common are
+rated at once: every match is placed in the first wave after the waves of the
+earlier matches of its players, and each wave is a single vectorized update.
+This gives the same ratings as rating the matches one by one.
+"""
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+
+from matchstore import MatchData, MatchStore
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+
+HISTORY_ARRAYS = ["match_ids", "player_ids", "game_ids", "dates", "scores", "won", "rating", "game_rating"]
+
+
+class RatingEngine:
+    """ Elo ratings of the players, overall and per game, and their history
+
+    Attributes:
+    -----------
+
+    players : list of str
+        Players in the order they were first rated
+
+    games : list of str
+        Games in the order they were first rated
+
+    ratings : numpy.ndarray of float64
+        Current rating of each player
+
+    game_ratings : numpy.ndarray of float64
+        Current rating of each game x player
+
+    nr_matches : int
+        Number of matches (rows of the data) that have been processed
+
+    match_ids, player_ids, game_ids, dates, scores, won : numpy.ndarray
+        One record per player per rated match, in the order they were rated
+
+    rating, game_rating : numpy.ndarray of float64
+        The overall and game rating of the player after each record
+    """
+
+    def __init__(self):
+        self.players = []
+        self.player_index = {}
+        self.games = []
+        self.game_index = {}
+        self.ratings = np.array([], dtype=np.float64)
+        self.game_ratings = np.zeros((0, 0), dtype=np.float64)
+        self.nr_matches = 0
+
+        self.match_ids = np.array([], dtype=np.int64)
+        self.player_ids = np.array([], dtype=np.int64)
+        self.game_ids = np.array([], dtype=np.int64)
+        self.dates = np.array([], dtype="datetime64[ns]")
+        self.scores = np.array([], dtype=np.int64)
+        self.won = np.array([], dtype=bool)
+        self.rating = np.array([], dtype=np.float64)
+        self.game_rating = np.array([], dtype=np.float64)
+
+    @classmethod
+    def from_data(cls, matrix: MatchData, checkpoint: "RatingEngine" = None) -> "RatingEngine":
+        """ Rate the matches of a MatchMatrix or MatchStore
+
+        Parameters:
+        -----------
+
+        matrix : MatchMatrix | MatchStore
+            Scores, winners and players per match
+
+        checkpoint : RatingEngine
+            A previous state. If the matches it rated are unchanged, only the
+            matches after them are rated on top of it. Otherwise, or if it is
+            None, all matches are rated again.
+
+        Returns:
+        --------
+
+        engine : RatingEngine
+        """
+        engine = checkpoint if checkpoint is not None and checkpoint.is_prefix_of(matrix) else cls()
+        engine.rate(matrix, start=engine.nr_matches)
+        return engine
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes used by the ratings and their history """
+        return self.ratings.nbytes + self.game_ratings.nbytes + sum(getattr(self, name).nbytes
+                                                                    for name in HISTORY_ARRAYS)
+
+    def rate(self, matrix: MatchData, start: int = 0) -> None:
+        """ Rate the matches from row start onwards in order of their date
+
+        Parameters:
+        -----------
+
+        matrix : MatchMatrix | MatchStore
+            Scores, winners and players per match
+
+        start : int
+            First row to rate, all earlier rows should already have been rated
+        """
+        match_ids, player_ids, scores, won = _records(matrix, start, len(matrix))
+        self.nr_matches = len(matrix)
+        if len(match_ids) == 0:
+            return
+
+        # Ids of the engine, new players and games are added at the end
+        names = np.array(matrix.players, dtype=object)[player_ids]
+        player_ids = self._add_ids(names, self.players, self.player_index)
+        game_ids = self._add_ids(matrix.games[match_ids], self.games, self.game_index)
+        self._grow()
+
+        results, sizes = _results(match_ids, scores, won)
+
+        # Order the records by the date of their match, then by wave
+        dates = np.asarray(matrix.dates, dtype="datetime64[ns]")[match_ids]
+        order = np.lexsort((player_ids, match_ids, dates))
+        waves = _waves(match_ids[order], player_ids[order])
+        order = order[np.argsort(waves, kind="mergesort")]
+        waves = np.sort(waves, kind="mergesort")
+
+        match_ids, player_ids, game_ids = match_ids[order], player_ids[order], game_ids[order]
+        results, sizes = results[order], sizes[order]
+        rating = np.empty((2, len(order)))
+
+        match_starts = np.flatnonzero(np.r_[True, match_ids[1:] != match_ids[:-1]])
+        wave_bounds = np.searchsorted(waves, np.arange(waves[-1] + 2))
+        for begin, end in zip(wave_bounds[:-1], wave_bounds[1:]):
+            players, games = player_ids[begin:end], game_ids[begin:end]
+            starts = match_starts[np.searchsorted(match_starts, begin):np.searchsorted(match_starts, end)] - begin
+
+            current = np.stack([self.ratings[players], self.game_ratings[games, players]])
+            rating[:, begin:end] = _update(current, results[begin:end], sizes[begin:end], starts)
+            self.ratings[players] = rating[0, begin:end]
+            self.game_ratings[games, players] = rating[1, begin:end]
+
+        history = {"match_ids": match_ids, "player_ids": player_ids, "game_ids": game_ids,
+                   "dates": dates[order], "scores": scores[order], "won": won[order],
+                   "rating": rating[0], "game_rating": rating[1]}
+        for name in HISTORY_ARRAYS:
+            setattr(self, name, np.concatenate([getattr(self, name), history[name]]))
+
+    def is_prefix_of(self, matrix: MatchData) -> bool:
+        """ Whether the matches that were rated are unchanged in matrix """
+        if self.nr_matches > len(matrix):
+            return False
+
+        match_ids, player_ids, scores, won = _records(matrix, 0, self.nr_matches)
+        if len(match_ids) != len(self.match_ids):
+            return False
+
+        # Compare the records sorted by match and player name
+        names = np.array(matrix.players, dtype=object)[player_ids]
+        order = np.lexsort((names, match_ids))
+        own_names = np.array(self.players, dtype=object)[self.player_ids]
+        own_order = np.lexsort((own_names, self.match_ids))
+        return (np.array_equal(match_ids[order], self.match_ids[own_order])
+                and np.array_equal(names[order], own_names[own_order])
+                and np.array_equal(scores[order], self.scores[own_order])
+                and np.array_equal(won[order], self.won[own_order])
+                and np.array_equal(np.asarray(matrix.dates, dtype="datetime64[ns]")[match_ids[order]],
+                                   self.dates[own_order])
+                and np.array_equal(matrix.games[match_ids[order]],
+                                   np.array(self.games, dtype=object)[self.game_ids[own_order]]))
+
+    def table(self, game: str = None) -> pd.DataFrame:
+        """ Current ratings of all rated players, optionally in one game
+
+        Returns:
+        --------
+
+        table : pandas.core.frame.DataFrame
+            The Player, its Rating and number of rated Matches, sorted by Rating
+        """
+        if game is None:
+            ratings, matches = self.ratings, np.bincount(self.player_ids, minlength=len(self.players))
+        elif game in self.game_index:
+            idx = self.game_index[game]
+            ratings = self.game_ratings[idx]
+            matches = np.bincount(self.player_ids[self.game_ids == idx], minlength=len(self.players))
+        else:
+            ratings, matches = np.full(len(self.players), INITIAL_RATING), np.zeros(len(self.players), dtype=int)
+
+        table = pd.DataFrame({"Player": self.players, "Rating": ratings.round(0), "Matches": matches},
+                             columns=["Player", "Rating", "Matches"])
+        table = table.loc[table.Matches > 0, :]
+        return table.sort_values(["Rating", "Player"], ascending=[False, True]).reset_index(drop=True)
+
+    def history(self, player: str, game: str = None) -> pd.DataFrame:
+        """ Ratings of a player after each of its rated matches, optionally only in one game
+
+        Returns:
+        --------
+
+        history : pandas.core.frame.DataFrame
+            The Date of each match, the Game and the overall Rating after it, and
+            the Game rating if a game was given
+        """
+        if player not in self.player_index or (game is not None and game not in self.game_index):
+            return pd.DataFrame(columns=["Date", "Game", "Rating"] + ([] if game is None else ["Game rating"]))
+
+        selected = self.player_ids == self.player_index[player]
+        if game is not None:
+            selected &= self.game_ids == self.game_index[game]
+        history = pd.DataFrame({"Date": self.dates[selected],
+                                "Game": np.array(self.games, dtype=object)[self.game_ids[selected]],
+                                "Rating": self.rating[selected]},
+                               columns=["Date", "Game", "Rating"])
+        if game is not None:
+            history["Game rating"] = self.game_rating[selected]
+        return history
+
+    def save(self, path: str) -> None:
+        """ Atomically write the state of the engine to path """
+        arrays = {name: getattr(self, name) for name in HISTORY_ARRAYS}
+        arrays.update({"players": np.array(self.players, dtype=str), "games": np.array(self.games, dtype=str),
+                       "ratings": self.ratings, "game_ratings": self.game_ratings,
+                       "nr_matches": np.array(self.nr_matches)})
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A unique temporary file, such that concurrent saves to the same path do not collide
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "RatingEngine":
+        """ Read the state of an engine written by `save` """
+        with np.load(path, allow_pickle=False) as arrays:
+            arrays = dict(arrays)
+
+        engine = cls()
+        engine.players, engine.games = list(arrays["players"]), list(arrays["games"])
+        engine.player_index = {player: idx for idx, player in enumerate(engine.players)}
+        engine.game_index = {game: idx for idx, game in enumerate(engine.games)}
+        engine.ratings, engine.game_ratings = arrays["ratings"], arrays["game_ratings"]
+        engine.nr_matches = int(arrays["nr_matches"])
+        for name in HISTORY_ARRAYS:
+            setattr(engine, name, arrays[name])
+        return engine
+
+    @staticmethod
+    def _add_ids(names: np.ndarray, known: List[str], index: dict) -> np.ndarray:
+        """ Ids of names, adding the names that are not known yet """
+        for name in pd.unique(names):
+            if name not in index:
+                index[name] = len(known)
+                known.append(name)
+        return pd.Index(known).get_indexer(names).astype(np.int64)
+
+    def _grow(self) -> None:
+        """ Start new players and games at the initial rating """
+        nr_games, nr_players = len(self.games), len(self.players)
+        self.ratings = np.append(self.ratings, np.full(nr_players - len(self.ratings), INITIAL_RATING))
+        game_ratings = np.full((nr_games, nr_players), INITIAL_RATING)
+        game_ratings[:self.game_ratings.shape[0], :self.game_ratings.shape[1]] = self.game_ratings
+        self.game_ratings = game_ratings
+
+
+def _records(matrix: MatchData, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ The match, player, score and won of each player in the rated matches between rows start and stop """
+    if isinstance(matrix, MatchStore):
+        records = np.arange(matrix.match_offsets[start], matrix.match_offsets[stop])
+        records = records[matrix.played[records]]
+        match_ids, player_ids = matrix.match_ids[records].astype(np.int64), matrix.player_ids[records].astype(np.int64)
+        scores, won = matrix.scores[records].astype(np.int64), matrix.won[records]
+    else:
+        match_ids, player_ids = np.nonzero(matrix.played[start:stop])
+        match_ids = match_ids + start
+        scores, won = matrix.scores[match_ids, player_ids].astype(np.int64), matrix.won[match_ids, player_ids]
+
+    nr_players = np.bincount(match_ids - start, minlength=stop - start)[match_ids - start]
+    rated = (nr_players > 1) & (matrix.has_score[match_ids] | matrix.has_winner[match_ids])
+    return match_ids[rated], player_ids[rated], scores[rated], won[rated]
+
+
+def _results(match_ids: np.ndarray, scores: np.ndarray, won: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Fraction of the other players that each record placed above and the number of players in its match """
+    order = np.lexsort((scores, won, match_ids))
+    match_ids, scores, won = match_ids[order], scores[order], won[order]
+    new_match = np.r_[True, match_ids[1:] != match_ids[:-1]]
+    new_place = new_match | np.r_[True, (won[1:] != won[:-1]) | (scores[1:] != scores[:-1])]
+
+    match_start = np.flatnonzero(new_match)[np.cumsum(new_match) - 1]
+    place_start = np.flatnonzero(new_place)[np.cumsum(new_place) - 1]
+    sizes = np.diff(np.append(np.flatnonzero(new_match), len(match_ids)))[np.cumsum(new_match) - 1]
+    ties = np.diff(np.append(np.flatnonzero(new_place), len(match_ids)))[np.cumsum(new_place) - 1] - 1
+
+    results, nr_players = np.empty(len(order)), np.empty(len(order), dtype=np.int64)
+    results[order] = (place_start - match_start + 0.5 * ties) / (sizes - 1)
+    nr_players[order] = sizes
+    return results, nr_players
+
+
+def _waves(match_ids: np.ndarray, player_ids: np.ndarray) -> np.ndarray:
+    """ Wave of each record (ordered by match) such that matches of a wave have no players in common
+    and every match comes after the earlier matches of its players """
+    starts = np.flatnonzero(np.r_[True, match_ids[1:] != match_ids[:-1]])
+    bounds = np.append(starts, len(match_ids)).tolist()
+    players = player_ids.tolist()
+    last_wave = {}
+    waves = np.empty(len(starts), dtype=np.int64)
+    for idx in range(len(starts)):
+        match_players = players[bounds[idx]:bounds[idx + 1]]
+        wave = max(last_wave.get(player, -1) for player in match_players) + 1
+        for player in match_players:
+            last_wave[player] = wave
+        waves[idx] = wave
+    return np.repeat(waves, np.diff(bounds))
+
+
+def _update(ratings: np.ndarray, results: np.ndarray, sizes: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """ New ratings (overall and game x records) of the records of matches that start at starts """
+    totals = np.repeat(np.add.reduceat(ratings, starts, axis=1), sizes[starts], axis=1)
+    others = (totals - ratings) / (sizes - 1)
+    expected = 1 / (1 + 10 ** ((others - ratings) / 400))
+    return ratings + K_FACTOR * (results - expected)
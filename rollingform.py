@@ -0,0 +1,280 @@
+""" Rolling statistics over the last matches of every player in every game
+
+For each player and game, the matches that have a score and a winner are taken
+in the order of the data, the same sequence as the "Scores over time" charts.
+After each match the following is kept over the last `window` matches:
+
+    * Average: the moving average of the score
+    * Win rate: the fraction of matches that were won
+    * Form: the moving average minus the average of all matches so far,
+      positive if the player scored better than usual in its last matches
+
+The windows slide with running sums: per player and game only the number of
+matches, the total score and the last `window` scores and wins are kept, such
+that new matches are added with `update` without going over the earlier
+matches again. `from_data` continues from a previous form if its matches are
+unchanged, as when matches were appended to the data.
+"""
+import copy
+import numpy as np
+import pandas as pd
+from typing import Tuple
+
+from matchstore import MatchData, MatchStore
+
+WINDOW = 5
+COLUMNS = ["Average", "Win rate", "Form"]
+
+
+class RollingForm:
+    """ Moving average score, win rate and form of every player in every game
+
+    Parameters:
+    -----------
+
+    window : int
+        Number of matches over which the statistics are computed
+
+    Attributes:
+    -----------
+
+    groups : list of (str, str)
+        The (player, game) of each group in the order they were first seen
+
+    nr_matches : int
+        Number of matches (rows of the data) that have been processed
+
+    match_ids, group_ids : numpy.ndarray of int64
+        One record per player per match with a score and a winner, in order of the rows
+
+    scores : numpy.ndarray of int64
+        Score of each record
+
+    won : numpy.ndarray of bool
+        Whether each record was won
+
+    average, win_rate, form : numpy.ndarray of float64
+        The statistics after each record
+    """
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self.groups = []
+        self.group_index = {}
+        self.nr_matches = 0
+
+        # Running state per group, the last scores and wins are right-aligned
+        self.counts = np.array([], dtype=np.int64)
+        self.totals = np.array([], dtype=np.int64)
+        self.last_scores = np.zeros((0, window), dtype=np.int64)
+        self.last_won = np.zeros((0, window), dtype=np.int64)
+
+        self.match_ids = np.array([], dtype=np.int64)
+        self.group_ids = np.array([], dtype=np.int64)
+        self.scores = np.array([], dtype=np.int64)
+        self.won = np.array([], dtype=bool)
+        self.average = np.array([], dtype=np.float64)
+        self.win_rate = np.array([], dtype=np.float64)
+        self.form = np.array([], dtype=np.float64)
+
+    @classmethod
+    def from_data(cls, matrix: MatchData, window: int = WINDOW, previous: "RollingForm" = None) -> "RollingForm":
+        """ Compute the statistics of all matches of a MatchMatrix or MatchStore
+
+        Parameters:
+        -----------
+
+        matrix : MatchMatrix | MatchStore
+            Scores, winners and players per match
+
+        window : int
+            Number of matches over which the statistics are computed
+
+        previous : RollingForm
+            The form of earlier data, which is not changed. If the matches it added
+            are unchanged, only the matches after them are added to a copy of it.
+            Otherwise, or if it is None, all matches are added again.
+
+        Returns:
+        --------
+
+        form : RollingForm
+        """
+        if previous is not None and previous.window == window and previous.is_prefix_of(matrix):
+            form = previous.copy()
+        else:
+            form = cls(window)
+        form.update(matrix, start=form.nr_matches)
+        return form
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes used by the statistics and the running state """
+        return sum(getattr(self, name).nbytes for name in ["counts", "totals", "last_scores", "last_won", "match_ids",
+                                                           "group_ids", "scores", "won", "average", "win_rate",
+                                                           "form"])
+
+    def copy(self) -> "RollingForm":
+        """ A copy that can be updated without changing this form
+
+        The statistics per record are shared, since `update` replaces them instead
+        of changing them, only the groups and the running state are copied.
+        """
+        form = copy.copy(self)
+        form.groups, form.group_index = list(self.groups), dict(self.group_index)
+        for name in ["counts", "totals", "last_scores", "last_won"]:
+            setattr(form, name, getattr(self, name).copy())
+        return form
+
+    def is_prefix_of(self, matrix: MatchData) -> bool:
+        """ Whether the matches that were added are unchanged in matrix """
+        if self.nr_matches > len(matrix):
+            return False
+
+        match_ids, player_ids, scores, won = _records(matrix, 0, self.nr_matches)
+        if len(match_ids) != len(self.match_ids):
+            return False
+
+        # Both are in order of the rows, compare the records sorted by match and (player, game)
+        keys = pd.MultiIndex.from_arrays([np.array(matrix.players, dtype=object)[player_ids], matrix.games[match_ids]])
+        own_keys = pd.MultiIndex.from_tuples(self.groups)[self.group_ids] if len(self.groups) else keys[:0]
+        order = np.lexsort((keys.get_level_values(0).astype(str), match_ids))
+        own_order = np.lexsort((own_keys.get_level_values(0).astype(str), self.match_ids))
+        return (np.array_equal(match_ids[order], self.match_ids[own_order])
+                and keys[order].equals(own_keys[own_order])
+                and np.array_equal(scores[order], self.scores[own_order])
+                and np.array_equal(won[order].astype(bool), self.won[own_order]))
+
+    def update(self, matrix: MatchData, start: int = None) -> None:
+        """ Add the matches from row start onwards
+
+        Parameters:
+        -----------
+
+        matrix : MatchMatrix | MatchStore
+            Scores, winners and players per match, of which the rows before
+            start are the matches that were already added
+
+        start : int
+            First row to add, by default the first row that was not added yet
+        """
+        start = self.nr_matches if start is None else start
+        match_ids, player_ids, scores, won = _records(matrix, start, len(matrix))
+        self.nr_matches = len(matrix)
+        if len(match_ids) == 0:
+            return
+
+        group_ids = self._add_groups(np.array(matrix.players, dtype=object)[player_ids], matrix.games[match_ids])
+
+        # Sequence of every touched group: its last scores and wins followed by the new matches
+        order = np.argsort(group_ids, kind="mergesort")
+        touched, first, new_counts = np.unique(group_ids[order], return_index=True, return_counts=True)
+        kept = np.minimum(self.counts[touched], self.window)
+        offsets = np.concatenate([[0], np.cumsum(kept + new_counts)])
+
+        columns = np.arange(self.window)
+        in_tail = columns >= self.window - kept[:, None]
+        tail_positions = (offsets[:-1, None] + columns - (self.window - kept[:, None]))[in_tail]
+        ranks = np.arange(len(order)) - np.repeat(first, new_counts)
+        positions = np.repeat(offsets[:-1] + kept, new_counts) + ranks
+
+        sequence_scores = np.zeros(offsets[-1], dtype=np.int64)
+        sequence_won = np.zeros(offsets[-1], dtype=np.int64)
+        sequence_scores[tail_positions] = self.last_scores[touched][in_tail]
+        sequence_won[tail_positions] = self.last_won[touched][in_tail]
+        sequence_scores[positions] = scores[order]
+        sequence_won[positions] = won[order]
+
+        # Sums over the window from running sums, limited to the start of the group
+        score_sums = np.concatenate([[0], np.cumsum(sequence_scores)])
+        won_sums = np.concatenate([[0], np.cumsum(sequence_won)])
+        window_starts = np.maximum(positions + 1 - self.window, np.repeat(offsets[:-1], new_counts))
+        sizes = positions + 1 - window_starts
+        average = (score_sums[positions + 1] - score_sums[window_starts]) / sizes
+        win_rate = (won_sums[positions + 1] - won_sums[window_starts]) / sizes
+
+        group_totals = np.repeat(self.totals[touched], new_counts) \
+            + score_sums[positions + 1] - score_sums[np.repeat(offsets[:-1] + kept, new_counts)]
+        group_counts = np.repeat(self.counts[touched], new_counts) + ranks + 1
+        form = average - group_totals / group_counts
+
+        # Running state of the touched groups
+        ends = offsets[1:]
+        last_positions = ends[:, None] - self.window + columns
+        in_window = last_positions >= offsets[:-1, None]
+        last_scores, last_won = np.zeros((len(touched), self.window), dtype=np.int64), \
+            np.zeros((len(touched), self.window), dtype=np.int64)
+        last_scores[in_window] = sequence_scores[last_positions[in_window]]
+        last_won[in_window] = sequence_won[last_positions[in_window]]
+        self.last_scores[touched], self.last_won[touched] = last_scores, last_won
+        self.totals[touched] += np.add.reduceat(scores[order], first)
+        self.counts[touched] += new_counts
+
+        # Records are kept in order of the rows
+        unsorted = np.empty(len(order), dtype=np.int64)
+        unsorted[order] = np.arange(len(order))
+        self.match_ids = np.concatenate([self.match_ids, match_ids])
+        self.group_ids = np.concatenate([self.group_ids, group_ids])
+        self.scores = np.concatenate([self.scores, scores])
+        self.won = np.concatenate([self.won, won.astype(bool)])
+        self.average = np.concatenate([self.average, average[unsorted]])
+        self.win_rate = np.concatenate([self.win_rate, win_rate[unsorted]])
+        self.form = np.concatenate([self.form, form[unsorted]])
+
+    def history(self, player: str, game: str) -> pd.DataFrame:
+        """ Statistics of a player in a game after each of its matches
+
+        Returns:
+        --------
+
+        history : pandas.core.frame.DataFrame
+            The Score of each match and the Average, Win rate and Form after it
+        """
+        if (player, game) not in self.group_index:
+            return pd.DataFrame(columns=["Score"] + COLUMNS)
+
+        selected = self.group_ids == self.group_index[(player, game)]
+        return pd.DataFrame({"Score": self.scores[selected], "Average": self.average[selected],
+                             "Win rate": self.win_rate[selected], "Form": self.form[selected]},
+                            columns=["Score"] + COLUMNS)
+
+    def current(self, player: str, game: str) -> pd.Series:
+        """ Statistics of a player in a game after its last match, NaN if it has none """
+        if (player, game) not in self.group_index:
+            return pd.Series(np.nan, index=COLUMNS)
+
+        last = np.flatnonzero(self.group_ids == self.group_index[(player, game)])[-1]
+        return pd.Series([self.average[last], self.win_rate[last], self.form[last]], index=COLUMNS)
+
+    def _add_groups(self, players: np.ndarray, games: np.ndarray) -> np.ndarray:
+        """ Ids of the (player, game) of each record, adding the groups that are new """
+        keys = pd.MultiIndex.from_arrays([players, games])
+        for key in keys.unique():
+            if key not in self.group_index:
+                self.group_index[key] = len(self.groups)
+                self.groups.append(key)
+
+        nr_new = len(self.groups) - len(self.counts)
+        self.counts = np.append(self.counts, np.zeros(nr_new, dtype=np.int64))
+        self.totals = np.append(self.totals, np.zeros(nr_new, dtype=np.int64))
+        self.last_scores = np.vstack([self.last_scores, np.zeros((nr_new, self.window), dtype=np.int64)])
+        self.last_won = np.vstack([self.last_won, np.zeros((nr_new, self.window), dtype=np.int64)])
+        return pd.MultiIndex.from_tuples(self.groups).get_indexer(keys).astype(np.int64)
+
+
+def _records(matrix: MatchData, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ The match, player, score and won of each player in the matches with a score and
+    a winner between rows start and stop, in order of the rows """
+    if isinstance(matrix, MatchStore):
+        records = np.arange(matrix.match_offsets[start], matrix.match_offsets[stop])
+        records = records[matrix.played[records]]
+        match_ids, player_ids = matrix.match_ids[records].astype(np.int64), matrix.player_ids[records].astype(np.int64)
+        scores, won = matrix.scores[records].astype(np.int64), matrix.won[records].astype(np.int64)
+    else:
+        match_ids, player_ids = np.nonzero(matrix.played[start:stop])
+        match_ids = match_ids + start
+        scores = matrix.scores[match_ids, player_ids].astype(np.int64)
+        won = matrix.won[match_ids, player_ids].astype(np.int64)
+
+    kept = matrix.has_score[match_ids] & matrix.has_winner[match_ids]
+    return match_ids[kept], player_ids[kept], scores[kept], won[kept]
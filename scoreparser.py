@@ -0,0 +1,80 @@
+""" Tokenizer of the Scores strings of the raw data
+
+A Scores string contains the score of each player connected with a + symbol,
+for example Peter77+Mike-5+Mary Ann 12+R2D2 40. Each token is read as a player
+name followed by an, optionally negative, integer score. Names may contain
+digits, spaces and hyphens. When the name would be ambiguous, for example
+R2D240, the longest player of the match that the token starts with is used.
+"""
+import re
+from typing import List, Sequence, Tuple
+
+SCORE_TOKEN = re.compile(r"\s*(?P<player>.*?)\s*(?P<score>-?\d+)\s*")
+SCORE_TOKENS = re.compile(r"([^+]*?)\s*(-?\d+)\s*(?:\+|$)")
+SCORE = re.compile(r"\s*(-?\d+)\s*")
+DIGIT = re.compile(r"\d")
+
+
+def has_scores(scores: str) -> bool:
+    """ Whether a Scores string contains scores of multiple players """
+    return isinstance(scores, str) and "+" in scores and DIGIT.search(scores) is not None
+
+
+def parse_scores(scores: str,
+                 players: Sequence[str] = ()) -> List[Tuple[str, int]]:
+    """ Parse a Scores string in a single pass over its tokens
+
+    Parameters:
+    -----------
+
+    scores : str
+        Scores of a match, e.g. Peter77+Mike-5
+
+    players : sequence of str
+        The players of the match, used to split names that end with digits
+
+    Returns:
+    --------
+
+    scores : list of (str, int)
+        The player and score of each token
+
+    Raises:
+    -------
+
+    ValueError
+        If a token does not end with a score or has no player name
+    """
+
+    # A token can only match from its start, so every token matched if there are as many matches as tokens
+    tokens = SCORE_TOKENS.findall(scores)
+    if len(tokens) != scores.count("+") + 1:
+        for token in scores.split("+"):
+            if SCORE_TOKEN.fullmatch(token) is None:
+                raise ValueError("Could not extract a player and score from: {!r}".format(token))
+        raise ValueError("Could not extract a player and score from: {!r}".format(scores))
+
+    parsed = []
+    longest_first = None
+    for player, score in tokens:
+        player = player.strip()
+        if not player:
+            raise ValueError("Could not extract a player and score from: {!r}".format(score))
+        if player not in players:
+            longest_first = longest_first or sorted(players, key=len, reverse=True)
+            player, score = _split_on_player(player + score, longest_first) or (player, score)
+        parsed.append((player, int(score)))
+
+    return parsed
+
+
+def _split_on_player(token: str,
+                     longest_first: Sequence[str]) -> Tuple[str, str]:
+    """ Split a token into the first player, sorted from long to short,
+    it starts with and its score, or return None if no player fits """
+    for player in longest_first:
+        if player and token.startswith(player):
+            match = SCORE.fullmatch(token[len(player):])
+            if match is not None:
+                return player, match.group(1)
+    return None
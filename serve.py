@@ -0,0 +1,18 @@
+""" Start the server and build the data of the default link right away
+
+    python serve.py [options of streamlit run]
+
+The data is built in a background thread of the server process, see `warmup`,
+such that the first visitor after a deploy or restart waits for the build that
+is already running instead of starting it.
+"""
+import sys
+
+from streamlit import cli
+
+import warmup
+
+if __name__ == "__main__":
+    warmup.start(warmup.DEFAULT_LINK)
+    sys.argv = ["streamlit", "run", "app.py"] + sys.argv[1:]
+    sys.exit(cli.main())
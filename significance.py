@@ -0,0 +1,141 @@
+""" One-sample Wilcoxon signed-rank tests of every player in every game
+
+For each player and game with more than MIN_MATCHES matches (that have a score
+and a winner), the scores of the player are tested against the average non-zero
+score of all other players in those matches, the same test as on the Player
+Statistics page. Since hundreds of tests are run at once, the p-values are also
+adjusted for the false discovery rate with the Benjamini-Hochberg procedure.
+
+The tests can be run over several processes:
+
+    table = significance.test_all(matrix, workers=4)
+"""
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from matchstore import MatchData, MatchStore
+
+MIN_MATCHES = 15
+ALPHA = 0.05
+COLUMNS = ["Matches", "Mean", "Average", "Statistic", "P", "P_adjusted", "Significant"]
+
+
+def test_all(matrix: MatchData, workers: int = 1) -> pd.DataFrame:
+    """ Test the scores of every player in every game against the average of the other players
+
+    Parameters:
+    -----------
+
+    matrix : MatchMatrix | MatchStore
+        Scores, winners and players per match
+
+    workers : int
+        Number of processes over which the tests are run
+
+    Returns:
+    --------
+
+    table : pandas.core.frame.DataFrame
+        Indexed by the sorted Player and Game, the number of Matches, the Mean
+        score of the player, the Average non-zero score of the other players in
+        those matches, the Statistic and P-value of the test, the P_adjusted
+        value and whether it is Significant after adjusting
+    """
+    if isinstance(matrix, MatchStore):
+        nonzero_sum = np.bincount(matrix.match_ids, weights=matrix.scores, minlength=len(matrix))
+        nonzero_count = np.bincount(matrix.match_ids, weights=matrix.scores != 0, minlength=len(matrix))
+        match_ids, player_ids = matrix.match_ids[matrix.played], matrix.player_ids[matrix.played]
+        scores = matrix.scores[matrix.played]
+    else:
+        nonzero_sum = matrix.scores.sum(axis=1, dtype=np.int64)
+        nonzero_count = (matrix.scores != 0).sum(axis=1)
+        match_ids, player_ids = np.nonzero(matrix.played)
+        scores = matrix.scores[match_ids, player_ids]
+
+    # Matches of the players that have a score and a winner
+    keep = matrix.has_score[match_ids] & matrix.has_winner[match_ids]
+    match_ids, player_ids, scores = match_ids[keep], player_ids[keep], scores[keep].astype(np.int64)
+    game_ids, games = pd.factorize(matrix.games[match_ids], sort=True)
+
+    # Non-zero scores of the other players in the same match
+    other_sum = nonzero_sum[match_ids] - scores
+    other_count = nonzero_count[match_ids] - (scores != 0)
+
+    # Group the records per player and game, and keep the groups with enough matches
+    order = np.lexsort((match_ids, game_ids, player_ids))
+    nr_games = max(len(games), 1)
+    group_ids = player_ids[order] * nr_games + game_ids[order]
+    _, group_index, sizes = np.unique(group_ids, return_inverse=True, return_counts=True)
+    tested = (sizes > MIN_MATCHES)[group_index]
+    records = order[tested]
+    groups, group_index, sizes = np.unique(group_ids[tested], return_inverse=True, return_counts=True)
+
+    player_scores = scores[records]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages = np.bincount(group_index, weights=other_sum[records], minlength=len(groups)) \
+            / np.bincount(group_index, weights=other_count[records], minlength=len(groups))
+        means = np.bincount(group_index, weights=player_scores, minlength=len(groups)) / sizes
+    differences = np.split(player_scores - averages[group_index], np.cumsum(sizes)[:-1]) if len(groups) else []
+
+    results = run_tests(differences, workers)
+    statistics = np.array([statistic for statistic, _ in results], dtype=float)
+    p_values = np.array([p_value for _, p_value in results], dtype=float)
+    p_adjusted = benjamini_hochberg(p_values)
+
+    table = pd.DataFrame({"Player": np.array(matrix.players, dtype=object)[groups // nr_games],
+                          "Game": np.asarray(games, dtype=object)[groups % nr_games],
+                          "Matches": sizes,
+                          "Mean": means,
+                          "Average": averages,
+                          "Statistic": statistics,
+                          "P": p_values,
+                          "P_adjusted": p_adjusted,
+                          "Significant": p_adjusted < ALPHA})
+    return table.set_index(["Player", "Game"]).sort_index().loc[:, COLUMNS]
+
+
+def run_tests(differences: List[np.ndarray], workers: int = 1) -> List[Tuple[float, float]]:
+    """ Run `wilcoxon_test` on each array of differences, over several processes if workers > 1 """
+    if workers > 1 and len(differences) > 1:
+        chunk_size = -(-len(differences) // workers)
+        chunks = [differences[start:start + chunk_size] for start in range(0, len(differences), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return [result for results in executor.map(_run_chunk, chunks) for result in results]
+    return _run_chunk(differences)
+
+
+def _run_chunk(differences: List[np.ndarray]) -> List[Tuple[float, float]]:
+    return [wilcoxon_test(values) for values in differences]
+
+
+def wilcoxon_test(differences: np.ndarray) -> Tuple[float, float]:
+    """ One-sample Wilcoxon signed-rank test of the differences with an average,
+    NaN if the test cannot be run (e.g., all differences are zero) """
+    # scipy.stats takes long to import, it is only imported once the tests are run
+    from scipy.stats import wilcoxon
+
+    if not np.isfinite(differences).all():
+        return np.nan, np.nan
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            statistic, p_value = wilcoxon(differences)
+    except ValueError:
+        return np.nan, np.nan
+    return float(statistic), float(p_value)
+
+
+def benjamini_hochberg(p_values: np.ndarray) -> np.ndarray:
+    """ P-values adjusted for the false discovery rate, NaN values are ignored """
+    adjusted = np.full(len(p_values), np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    if len(valid) == 0:
+        return adjusted
+
+    order = valid[np.argsort(p_values[valid], kind="mergesort")]
+    ranked = p_values[order] * len(valid) / np.arange(1, len(valid) + 1)
+    adjusted[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1)
+    return adjusted
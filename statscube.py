@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+from typing import List
+
+from matchstore import MatchData, MatchStore
+
+SCORED_COLUMNS = ["Count", "Sum", "SumSq", "Min", "Max", "Median", "Wins"]
+NONZERO_COLUMNS = ["NonzeroCount", "NonzeroSum", "NonzeroMin", "NonzeroMax"]
+AGGREGATIONS = {"Count": "sum", "Sum": "sum", "SumSq": "sum", "Min": "min", "Max": "max", "Median": "median",
+                "Wins": "sum", "NonzeroCount": "sum", "NonzeroSum": "sum", "NonzeroMin": "min", "NonzeroMax": "max"}
+
+
+class StatsCube:
+    """ Summary statistics of the scores of each player per game and version
+
+    The statistics are computed with a single grouped pass over one record per
+    player per match and are kept for as long as the loaded data, such that pages
+    only look them up. There are two sets of statistics:
+
+    * Count, Sum, SumSq, Min, Max, Median and Wins of the scores in the matches that
+      the player played and that have a score and a winner (as on the Player
+      Statistics page).
+    * NonzeroCount, NonzeroSum, NonzeroMin and NonzeroMax of all non-zero scores
+      (as on the Game Statistics page, where 0 means that no score was registered).
+
+    Since medians cannot be combined, the statistics per game over all of its
+    versions are grouped separately.
+
+    Attributes:
+    -----------
+
+    by_version : pandas.core.frame.DataFrame
+        Statistics indexed by Game, Version and Player
+
+    by_game : pandas.core.frame.DataFrame
+        Statistics indexed by Game and Player
+    """
+
+    def __init__(self, records: pd.DataFrame):
+        self.by_version = _aggregate(records, ["Game", "Version", "Player"])
+        self.by_game = _aggregate(records, ["Game", "Player"])
+
+    @classmethod
+    def from_data(cls, matrix: MatchData) -> "StatsCube":
+        """ Create the statistics from a MatchMatrix or MatchStore
+
+        Parameters:
+        -----------
+
+        matrix : MatchMatrix | MatchStore
+            Scores, winners and players per match
+
+        Returns:
+        --------
+
+        cube : StatsCube
+        """
+        if isinstance(matrix, MatchStore):
+            keep = matrix.played | (matrix.scores != 0)
+            match_ids, player_ids = matrix.match_ids[keep], matrix.player_ids[keep]
+            scores, won, played = matrix.scores[keep], matrix.won[keep], matrix.played[keep]
+        else:
+            match_ids, player_ids = np.nonzero(matrix.played | (matrix.scores != 0))
+            scores = matrix.scores[match_ids, player_ids]
+            won = matrix.won[match_ids, player_ids]
+            played = matrix.played[match_ids, player_ids]
+
+        scores = scores.astype(np.int64)
+        scored = played & matrix.has_score[match_ids] & matrix.has_winner[match_ids]
+        nonzero = scores != 0
+        records = pd.DataFrame({"Player": np.array(matrix.players, dtype=object)[player_ids],
+                                "Game": matrix.games[match_ids],
+                                "Version": matrix.versions[match_ids],
+                                "Count": scored,
+                                "Sum": np.where(scored, scores, 0),
+                                "SumSq": np.where(scored, scores ** 2, 0),
+                                "Min": np.where(scored, scores, np.nan),
+                                "Max": np.where(scored, scores, np.nan),
+                                "Median": np.where(scored, scores, np.nan),
+                                "Wins": scored & won,
+                                "NonzeroCount": nonzero,
+                                "NonzeroSum": scores,
+                                "NonzeroMin": np.where(nonzero, scores, np.nan),
+                                "NonzeroMax": np.where(nonzero, scores, np.nan)})
+        return cls(records)
+
+    @property
+    def nbytes(self) -> int:
+        """ Number of bytes used by the statistics """
+        return int(self.by_version.memory_usage(deep=True).sum() + self.by_game.memory_usage(deep=True).sum())
+
+    def player_game(self, player: str, game: str, version: str = None) -> pd.Series:
+        """ Statistics of a player for a game, optionally of only one version of it
+
+        Returns:
+        --------
+
+        stats : pandas.Series
+            The statistics, with a Count of 0 if the player has no scores for the game
+        """
+        stats = self.game(game, version)
+        if player in stats.index:
+            return stats.loc[player, :]
+        return pd.Series(0, index=stats.columns)
+
+    def game(self, game: str, version: str = None) -> pd.DataFrame:
+        """ Statistics of all players with scores for a game, optionally of only
+        one version of it, indexed by the sorted players """
+        stats = self.by_game if version is None else self.by_version
+        key = game if version is None else (game, version)
+        try:
+            return stats.loc[key]
+        except KeyError:
+            return stats.iloc[:0].droplevel(list(range(stats.index.nlevels - 1)))
+
+    def extremes(self, game: str, version: str = None) -> pd.DataFrame:
+        """ The players with the highest and lowest non-zero score and average non-zero score of a game
+
+        Returns:
+        --------
+
+        extremes : pandas.core.frame.DataFrame
+            The Player and Score of the "Highest score", "Highest average", "Lowest score"
+            and "Lowest average", empty if the game has no non-zero scores
+        """
+        stats = self.game(game, version)
+        stats = stats.loc[stats.NonzeroCount > 0, :]
+        names = ["Highest score", "Highest average", "Lowest score", "Lowest average"]
+        if len(stats) == 0:
+            return pd.DataFrame(columns=["Player", "Score"], index=pd.Index([], name="Statistic"))
+
+        averages = stats.NonzeroSum / stats.NonzeroCount
+        players = [stats.NonzeroMax.idxmax(), averages.idxmax(), stats.NonzeroMin.idxmin(), averages.idxmin()]
+        scores = [stats.NonzeroMax[players[0]], averages[players[1]], stats.NonzeroMin[players[2]], averages[players[3]]]
+
+        # Object columns keep the integer scores apart from the float averages
+        return pd.DataFrame({"Player": players, "Score": scores}, columns=["Player", "Score"],
+                            index=pd.Index(names, name="Statistic"), dtype=object)
+
+
+def _aggregate(records: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """ Group the records by keys and use integers for all but the median """
+    stats = records.groupby(keys, sort=True).agg(AGGREGATIONS)
+    integers = [column for column in AGGREGATIONS if column != "Median"]
+    stats[integers] = stats[integers].fillna(0).astype(np.int64)
+    return stats.loc[:, SCORED_COLUMNS + NONZERO_COLUMNS]
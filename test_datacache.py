@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+import datacache
+import preprocessing
+from ratings import RatingEngine
+from test_preprocessing import assert_same_matches, new_matches, raw_matches
+
+
+def test_cache_round_trip(tmp_path):
+    fingerprints = preprocessing.row_fingerprints(raw_matches())
+
+    for sparse in [False, True]:
+        df, player_list, matrix = datacache.preprocess_incremental(raw_matches(), fingerprints, sparse)
+        path = str(tmp_path / "{}.npz".format(sparse))
+        datacache.write_cache(path, df, player_list, fingerprints, matrix if sparse else None)
+
+        cached_df, cached_players, cached, cached_fingerprints = datacache.read_cache(path, sparse)
+        pd.testing.assert_frame_equal(cached_df, df, check_categorical=False)
+        assert cached_players == player_list
+        np.testing.assert_array_equal(cached_fingerprints, fingerprints)
+        assert_same_matches(cached, matrix)
+
+
+def test_load_dataset_from_cache_and_appended_rows(tmp_path):
+    link, cache_dir = str(tmp_path / "matches.csv"), str(tmp_path / "cache")
+    all_matches = pd.concat([raw_matches(), new_matches()], ignore_index=True)
+
+    for sparse in [False, True]:
+        raw_matches().to_csv(link, index=False)
+        _, _, matrix = datacache.load_dataset(link, sparse, cache_dir=cache_dir)
+        _, _, cached = datacache.load_dataset(link, sparse, cache_dir=cache_dir)
+        assert_same_matches(cached, matrix)
+
+        # Only the appended rows are preprocessed, on top of the previous load
+        all_matches.to_csv(link, index=False)
+        _, player_list, matrix = datacache.load_dataset(link, sparse, cache_dir=cache_dir)
+        _, expected_players, expected = datacache.preprocess_incremental(
+            preprocessing.load_data(link), preprocessing.row_fingerprints(all_matches), sparse)
+        assert player_list == expected_players
+        assert_same_matches(matrix, expected)
+
+
+def test_load_ratings_continues_from_disk(tmp_path):
+    link, cache_dir = str(tmp_path / "matches.csv"), str(tmp_path / "cache")
+    all_matches = pd.concat([raw_matches(), new_matches()], ignore_index=True)
+    _, _, matrix = datacache.preprocess_incremental(raw_matches(), preprocessing.row_fingerprints(raw_matches()),
+                                                    sparse=False)
+    _, _, all_matrix = datacache.preprocess_incremental(all_matches, preprocessing.row_fingerprints(all_matches),
+                                                        sparse=False)
+
+    datacache.load_ratings(link, matrix, cache_dir=cache_dir)
+    ratings = datacache.load_ratings(link, all_matrix, cache_dir=cache_dir)
+
+    assert ratings.nr_matches == len(all_matrix)
+    pd.testing.assert_frame_equal(ratings.table(), RatingEngine.from_data(all_matrix).table())
@@ -0,0 +1,110 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+import preprocessing
+from matchmatrix import MatchMatrix
+from matchstore import MatchData
+
+
+def raw_matches() -> pd.DataFrame:
+    """ Matches with negative scores next to a regular match and a match without scores """
+    return pd.DataFrame({"Date": pd.to_datetime(["2019-01-01", "2019-01-02", "2019-01-03", "2019-01-04"]),
+                         "Players": ["Peter+Mike"] * 4,
+                         "Game": ["Qwixx"] * 4,
+                         "Scores": ["Peter-10+Mike5", "Peter-3+Mike-7", "Peter20+Mike10", np.nan],
+                         "Winner": ["Mike", "Peter", "Peter", "Mike"],
+                         "Version": ["Normal"] * 4})
+
+
+def new_matches() -> pd.DataFrame:
+    """ Matches to append, one of which has a player that did not play before """
+    return pd.DataFrame({"Date": pd.to_datetime(["2019-01-05", "2019-01-06"]),
+                         "Players": ["Peter+Anna", "Mike+Peter"],
+                         "Game": ["Jaipur", "Qwixx"],
+                         "Scores": ["Peter50+Anna70", "Mike12+Peter8"],
+                         "Winner": ["Anna", "Mike"],
+                         "Version": ["Normal"] * 2})
+
+
+def assert_same_matches(matrix: MatchData, expected: MatchData):
+    """ Assert that two MatchMatrix or MatchStore hold the same matches """
+    assert matrix.players == expected.players
+    np.testing.assert_array_equal(matrix.has_score, expected.has_score)
+    np.testing.assert_array_equal(matrix.has_winner, expected.has_winner)
+    np.testing.assert_array_equal(matrix.games, expected.games)
+    for player in expected.players:
+        np.testing.assert_array_equal(matrix.player_scores(player), expected.player_scores(player))
+        np.testing.assert_array_equal(matrix.player_won(player), expected.player_won(player))
+        np.testing.assert_array_equal(matrix.player_played(player), expected.player_played(player))
+
+
+def test_negative_scores_have_a_score():
+    df, player_list = preprocessing.preprocess(raw_matches())
+    matrix = MatchMatrix.from_frame(df, player_list)
+    _, _, store = preprocessing.preprocess_sparse(raw_matches())
+
+    expected = [True, True, True, False]
+    assert df.has_score.astype(bool).tolist() == expected
+    assert matrix.has_score.tolist() == expected
+    assert store.has_score.tolist() == expected
+    assert matrix.player_scores("Peter")[:2].tolist() == [-10, -3]
+    assert len(preprocessing.score_errors(df)) == 0
+
+
+def test_prepare_data_from_excel():
+    df, player_list = preprocessing.prepare_data("files/matches.xlsx")
+
+    assert len(df) > 0
+    assert df.Date.notnull().all()
+    assert df.Game.notnull().all()
+    assert set(preprocessing.player_columns(player_list)) <= set(df.columns)
+
+
+def test_csv_and_excel_skip_a_trailing_empty_row():
+    import openpyxl
+
+    csv = raw_matches().to_csv(index=False) + ",,,,,\n"
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(preprocessing.SCHEMA_COLUMNS)
+    for row in raw_matches().itertuples(index=False):
+        sheet.append([None if pd.isnull(value) else value for value in row])
+    # A formatted cell is written to the file even though it is empty
+    sheet.cell(row=sheet.max_row + 1, column=1).number_format = "0.00"
+    excel = io.BytesIO()
+    workbook.save(excel)
+
+    csv_df = preprocessing.load_data(io.BytesIO(csv.encode()), "csv")
+    excel_df = preprocessing.load_data(io.BytesIO(excel.getvalue()), "excel")
+
+    assert len(csv_df) == len(excel_df) == len(raw_matches())
+    pd.testing.assert_frame_equal(csv_df, excel_df)
+    assert preprocessing.detect_format("matches.csv?raw=true") == "csv"
+    assert preprocessing.detect_format("matches", excel.getvalue()) == "excel"
+
+
+def test_append_equals_full_rebuild():
+    all_matches = pd.concat([raw_matches(), new_matches()], ignore_index=True)
+    expected_df, expected_players = preprocessing.preprocess(all_matches)
+
+    df, player_list = preprocessing.preprocess(raw_matches())
+    df, player_list = preprocessing.append_data(df, player_list, new_matches())
+
+    assert player_list == expected_players
+    pd.testing.assert_frame_equal(df, expected_df, check_categorical=False)
+    assert_same_matches(MatchMatrix.from_frame(df, player_list),
+                        MatchMatrix.from_frame(expected_df, expected_players))
+
+
+def test_sparse_append_equals_full_rebuild():
+    all_matches = pd.concat([raw_matches(), new_matches()], ignore_index=True)
+    _, expected_players, expected_store = preprocessing.preprocess_sparse(all_matches)
+
+    df, player_list, store = preprocessing.preprocess_sparse(raw_matches())
+    df, player_list, store = preprocessing.append_sparse_data(df, player_list, store, new_matches())
+
+    assert player_list == expected_players
+    assert_same_matches(store, expected_store)
@@ -0,0 +1,233 @@
+""" Load the data and build all derived structures once, in a background thread
+
+Streamlit runs the app again for every session and every rerun. The data of a
+link is therefore built by a single background thread, see `DataBuilds`, and
+every run that needs it waits for that build instead of starting its own. The
+build continues when the run that started it is stopped, for example because
+the user changed a widget, and its step is shown while waiting.
+
+The build of the default link can be started before the first visitor arrives
+by starting the server with serve.py, which calls `start` before it runs the
+app in the same process.
+
+When the data of a link was checked more than REFRESH_SECONDS ago, the next run
+that needs it starts a new build in the background that first checks whether the
+data changed, see `datacache.fetch_if_changed`. The runs keep getting the data of the finished
+build until the new build is done and replaces it, or reuses it if the data
+did not change.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import TYPE_CHECKING, Callable
+
+# Custom packages, only imported by the build thread such that the app can
+# import this module, e.g., for DEFAULT_LINK, without importing them
+if TYPE_CHECKING:
+    from rollingform import RollingForm
+
+DEFAULT_LINK = os.environ.get("BOARDGAME_LINK",
+                              "https://github.com/MaartenGr/boardgame/blob/master/files/matches.xlsx?raw=true")
+
+# Number of processes used to preprocess new data and to run the significance tests
+WORKERS = int(os.environ.get("BOARDGAME_WORKERS", 1))
+
+# Age in seconds after which the data of a link is checked for changes
+REFRESH_SECONDS = float(os.environ.get("BOARDGAME_REFRESH_SECONDS", 300))
+
+STEPS = ["Loading data", "Indexing matches", "Counting head to head results", "Summarizing scores",
+         "Counting daily activity", "Running significance tests", "Rating players", "Computing form"]
+
+# The data of a build, see `build_data`
+Data = namedtuple("Data", ["df", "player_list", "matrix", "index", "pairs", "cube", "activity", "tests", "ratings",
+                           "form"])
+
+
+def build_data(link: str,
+               sparse: bool = False,
+               progress: Callable[[int], None] = None,
+               raw: bytes = None,
+               form: "RollingForm" = None) -> Data:
+    """ Load data from a link and build all structures that the pages look up
+
+    Parameters:
+    -----------
+
+    link : str
+        Link or path to the data
+
+    sparse : bool
+        Whether to store the scores, winners and players in a sparse MatchStore
+
+    progress : Callable[[int], None]
+        Called with the index in STEPS of each step before it starts
+
+    raw : bytes
+        The raw data of the link if it was already read
+
+    form : RollingForm
+        The form of the previous build of the link, which is continued with the
+        matches that were appended since, see `RollingForm.from_data`
+
+    Returns:
+    --------
+
+    data : Data
+        df, player_list, matrix, index, pairs, cube, activity, tests, ratings and form,
+        see `app.load_external_data`
+    """
+    import datacache
+    import significance
+    from dailyactivity import DailyActivity
+    from matchindex import MatchIndex
+    from pairmatrix import PairMatrix
+    from rollingform import RollingForm
+    from statscube import StatsCube
+
+    progress = progress if progress is not None else (lambda step: None)
+
+    progress(0)
+    df, player_list, matrix = datacache.load_dataset(link, sparse, workers=WORKERS, raw=raw)
+    data = [df, player_list, matrix]
+    builders = [MatchIndex.from_data, PairMatrix.from_data, StatsCube.from_data, DailyActivity.from_data,
+                lambda matrix: significance.test_all(matrix, workers=WORKERS),
+                lambda matrix: datacache.load_ratings(link, matrix, sparse),
+                lambda matrix: RollingForm.from_data(matrix, previous=form)]
+    for step, builder in enumerate(builders, start=1):
+        progress(step)
+        data.append(builder(matrix))
+    return Data(*data)
+
+
+class Build:
+    """ A build of the data of one link that runs in a background thread
+
+    Parameters:
+    -----------
+
+    link : str
+        Link or path to the data
+
+    sparse : bool
+        Whether to store the scores, winners and players in a sparse MatchStore
+
+    previous : Build
+        The finished build of the same link, of which the data is reused
+        if the data of the link did not change since
+
+    Attributes:
+    -----------
+
+    step : int
+        Index in STEPS of the step that is running, len(STEPS) when done
+
+    seconds : float
+        Duration of the build, None while it is running
+
+    data : Data
+        The result of `build_data`, None until it is done or if it failed
+
+    exception : Exception
+        The exception of a build that failed, None otherwise
+
+    validator : Dict[str, str]
+        Identifies the version of the data that was read, see `datacache.fetch_if_changed`
+    """
+
+    def __init__(self, link: str, sparse: bool, previous: "Build" = None):
+        self.step = 0
+        self.seconds = None
+        self.data = None
+        self.exception = None
+        self.validator = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(link, sparse, previous), daemon=True,
+                                        name="build-{}".format(link))
+        self._thread.start()
+
+    def _run(self, link: str, sparse: bool, previous: "Build") -> None:
+        start = time.perf_counter()
+        try:
+            import datacache
+
+            reusable = previous is not None and previous.data is not None
+            raw, self.validator = datacache.fetch_if_changed(link, previous.validator if reusable else None)
+            if raw is None:
+                self.data = previous.data
+            else:
+                form = previous.data.form if reusable else None
+                self.data = build_data(link, sparse, progress=self._set_step, raw=raw, form=form)
+        except Exception as exception:
+            self.exception = exception
+        finally:
+            self.step = len(STEPS)
+            self.seconds = time.perf_counter() - start
+            self._done.set()
+
+    def _set_step(self, step: int) -> None:
+        self.step = step
+
+    def wait(self, timeout: float = None) -> bool:
+        """ Wait until the build is done, returns whether it is done """
+        return self._done.wait(timeout)
+
+    def description(self) -> str:
+        """ The step that is running, e.g., "Rating players (7/8)" """
+        if self._done.is_set():
+            return "Done" if self.exception is None else "Failed"
+        return "{} ({}/{})".format(STEPS[self.step], self.step + 1, len(STEPS))
+
+
+class DataBuilds:
+    """ Builds of the data per link and storage type, each started only once
+
+    The finished builds are kept, also the ones that failed such that a broken
+    link is not downloaded again on every rerun, until they are refreshed.
+
+    Parameters:
+    -----------
+
+    refresh_seconds : float
+        Age of a build after which the next request starts a refresh
+    """
+
+    def __init__(self, refresh_seconds: float = REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.builds = {}
+        self.refreshes = {}
+        self.checked = {}
+        self._lock = threading.Lock()
+
+    def start(self, link: str, sparse: bool = False) -> Build:
+        """ The build of a link, started in a background thread if it was not started before
+
+        If the data was last checked more than refresh_seconds ago, the finished
+        build is returned as it is while a refresh is started in the background. The refresh replaces
+        it once it is done, unless it failed while the build did not.
+        """
+        key = (link, sparse)
+        with self._lock:
+            if key not in self.builds:
+                self.builds[key] = Build(link, sparse)
+                self.checked[key] = time.monotonic()
+                return self.builds[key]
+
+            build, refresh = self.builds[key], self.refreshes.get(key)
+            if refresh is not None:
+                if refresh.wait(0):
+                    del self.refreshes[key]
+                    if refresh.exception is None or build.exception is not None:
+                        self.builds[key] = build = refresh
+            elif build.wait(0) and time.monotonic() - self.checked[key] >= self.refresh_seconds:
+                self.refreshes[key] = Build(link, sparse, previous=build)
+                self.checked[key] = time.monotonic()
+            return build
+
+
+BUILDS = DataBuilds()
+
+
+def start(link: str = DEFAULT_LINK, sparse: bool = False) -> Build:
+    """ Start building the data of a link in the background, see `DataBuilds.start` """
+    return BUILDS.start(link, sparse)